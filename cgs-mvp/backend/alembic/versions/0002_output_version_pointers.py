@@ -0,0 +1,153 @@
+"""Output version pointers: root_output_id + latest_version_id.
+
+Resolving the latest version of an output used to walk the
+parent_output_id chain with one query per version. This migration
+denormalizes the chain so the lookup is a single indexed query:
+
+- outputs.root_output_id    → root of the edit chain (NULL on roots)
+- outputs.latest_version_id → most recent version (set on roots only)
+
+Both columns are maintained by triggers on INSERT, so application code
+never has to write them. Existing rows are backfilled.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ── Columns + index ──
+    op.execute(
+        """
+        ALTER TABLE public.outputs
+            ADD COLUMN IF NOT EXISTS root_output_id UUID REFERENCES public.outputs(id),
+            ADD COLUMN IF NOT EXISTS latest_version_id UUID REFERENCES public.outputs(id) ON DELETE SET NULL
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_outputs_root ON public.outputs(root_output_id) "
+        "WHERE root_output_id IS NOT NULL"
+    )
+
+    # ── Backfill existing chains ──
+    op.execute(
+        """
+        WITH RECURSIVE chain AS (
+            SELECT id, id AS root_id
+            FROM public.outputs
+            WHERE parent_output_id IS NULL
+            UNION ALL
+            SELECT o.id, c.root_id
+            FROM public.outputs o
+            JOIN chain c ON o.parent_output_id = c.id
+        )
+        UPDATE public.outputs o
+        SET root_output_id = c.root_id
+        FROM chain c
+        WHERE o.id = c.id AND c.id <> c.root_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE public.outputs r
+        SET latest_version_id = latest.id
+        FROM (
+            SELECT DISTINCT ON (root_output_id) root_output_id, id
+            FROM public.outputs
+            WHERE root_output_id IS NOT NULL
+            ORDER BY root_output_id, version DESC, created_at DESC
+        ) latest
+        WHERE r.id = latest.root_output_id
+        """
+    )
+
+    # ── Triggers: inherit root on insert, bump root's latest pointer ──
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.outputs_set_root()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF NEW.parent_output_id IS NOT NULL THEN
+                SELECT COALESCE(p.root_output_id, p.id)
+                INTO NEW.root_output_id
+                FROM public.outputs p
+                WHERE p.id = NEW.parent_output_id;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.outputs_bump_latest()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF NEW.root_output_id IS NOT NULL THEN
+                UPDATE public.outputs SET latest_version_id = NEW.id WHERE id = NEW.root_output_id;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER trg_outputs_set_root BEFORE INSERT ON public.outputs "
+        "FOR EACH ROW EXECUTE FUNCTION public.outputs_set_root()"
+    )
+    op.execute(
+        "CREATE TRIGGER trg_outputs_bump_latest AFTER INSERT ON public.outputs "
+        "FOR EACH ROW EXECUTE FUNCTION public.outputs_bump_latest()"
+    )
+
+    # ── RPC: single and bulk latest-version lookup ──
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.get_latest_output_version(p_output_id UUID)
+        RETURNS SETOF public.outputs
+        LANGUAGE sql STABLE
+        AS $$
+            SELECT o.*
+            FROM public.outputs s
+            JOIN public.outputs r ON r.id = COALESCE(s.root_output_id, s.id)
+            JOIN public.outputs o ON o.id = COALESCE(r.latest_version_id, r.id)
+            WHERE s.id = p_output_id;
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.get_latest_output_versions(p_output_ids UUID[])
+        RETURNS SETOF public.outputs
+        LANGUAGE sql STABLE
+        AS $$
+            SELECT DISTINCT o.*
+            FROM public.outputs s
+            JOIN public.outputs r ON r.id = COALESCE(s.root_output_id, s.id)
+            JOIN public.outputs o ON o.id = COALESCE(r.latest_version_id, r.id)
+            WHERE s.id = ANY(p_output_ids);
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.get_latest_output_versions(UUID[])")
+    op.execute("DROP FUNCTION IF EXISTS public.get_latest_output_version(UUID)")
+    op.execute("DROP TRIGGER IF EXISTS trg_outputs_bump_latest ON public.outputs")
+    op.execute("DROP TRIGGER IF EXISTS trg_outputs_set_root ON public.outputs")
+    op.execute("DROP FUNCTION IF EXISTS public.outputs_bump_latest()")
+    op.execute("DROP FUNCTION IF EXISTS public.outputs_set_root()")
+    op.execute("DROP INDEX IF EXISTS idx_outputs_root")
+    op.execute("ALTER TABLE public.outputs DROP COLUMN IF EXISTS latest_version_id")
+    op.execute("ALTER TABLE public.outputs DROP COLUMN IF EXISTS root_output_id")
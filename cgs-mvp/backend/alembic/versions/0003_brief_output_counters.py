@@ -0,0 +1,82 @@
+"""Per-brief output counters: atomic numbering on insert.
+
+Output numbers used to be computed in the app (SELECT max(number) + 1)
+and inserted in a separate call, so concurrent runs on the same brief
+could get duplicate numbers. Numbering now happens in the database:
+
+- brief_output_counters → one row per brief with the last assigned number
+- BEFORE INSERT trigger on outputs assigns NEW.number for root outputs
+  (parent_output_id IS NULL) when the caller leaves it NULL. The
+  INSERT ... ON CONFLICT DO UPDATE takes a row lock on the counter, so
+  parallel inserts on one brief are serialized and never collide.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS public.brief_output_counters (
+            brief_id UUID PRIMARY KEY REFERENCES public.briefs(id) ON DELETE CASCADE,
+            last_number INT NOT NULL DEFAULT 0
+        )
+        """
+    )
+    # Service-role only: no RLS policies, clients never read it directly
+    op.execute("ALTER TABLE public.brief_output_counters ENABLE ROW LEVEL SECURITY")
+
+    # Seed counters from existing root outputs
+    op.execute(
+        """
+        INSERT INTO public.brief_output_counters (brief_id, last_number)
+        SELECT brief_id, COALESCE(MAX(number), 0)
+        FROM public.outputs
+        WHERE brief_id IS NOT NULL AND parent_output_id IS NULL
+        GROUP BY brief_id
+        ON CONFLICT (brief_id) DO UPDATE SET last_number = EXCLUDED.last_number
+        """
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.outputs_assign_number()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF NEW.number IS NULL AND NEW.brief_id IS NOT NULL AND NEW.parent_output_id IS NULL THEN
+                INSERT INTO public.brief_output_counters AS c (brief_id, last_number)
+                VALUES (NEW.brief_id, 1)
+                ON CONFLICT (brief_id) DO UPDATE SET last_number = c.last_number + 1
+                RETURNING c.last_number INTO NEW.number;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER trg_outputs_assign_number BEFORE INSERT ON public.outputs "
+        "FOR EACH ROW EXECUTE FUNCTION public.outputs_assign_number()"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_outputs_brief_number ON public.outputs(brief_id, number DESC) "
+        "WHERE parent_output_id IS NULL"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_outputs_brief_number")
+    op.execute("DROP TRIGGER IF EXISTS trg_outputs_assign_number ON public.outputs")
+    op.execute("DROP FUNCTION IF EXISTS public.outputs_assign_number()")
+    op.execute("DROP TABLE IF EXISTS public.brief_output_counters")
@@ -0,0 +1,86 @@
+"""RPC delete_output_cascade: delete an output and its dependents in one call.
+
+OutputService.delete used to issue one DELETE per output id for
+chat_messages, then archive, then each child version, then the root:
+3N+2 sequential round trips with no transaction. This function does the
+whole cascade server-side; a plpgsql function body runs inside a single
+transaction, so a failure leaves no orphans.
+
+Returns the deleted output ids with their storage paths (so the caller
+can clean up files in the background) and their brief's context_id (so
+it can drop only that context's in-process archive index).
+
+Deleting a version nulls its root's latest_version_id (ON DELETE SET NULL);
+when other versions of the chain survive (e.g. a branch from an older
+version), the pointer is recomputed to the newest remaining one.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.delete_output_cascade(UUID, UUID)")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.delete_output_cascade(p_output_id UUID, p_user_id UUID)
+        RETURNS TABLE (deleted_id UUID, storage_path TEXT, context_id UUID)
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            v_ids UUID[];
+            v_root_ids UUID[];
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM public.outputs o WHERE o.id = p_output_id AND o.user_id = p_user_id
+            ) THEN
+                RETURN;
+            END IF;
+
+            -- The target + every descendant version in the edit chain
+            WITH RECURSIVE tree AS (
+                SELECT o.id FROM public.outputs o WHERE o.id = p_output_id
+                UNION ALL
+                SELECT o.id FROM public.outputs o JOIN tree t ON o.parent_output_id = t.id
+            )
+            SELECT array_agg(tree.id) INTO v_ids FROM tree;
+
+            -- Surviving roots whose chain loses versions
+            SELECT array_agg(DISTINCT o.root_output_id) INTO v_root_ids
+            FROM public.outputs o
+            WHERE o.id = ANY(v_ids) AND o.root_output_id IS NOT NULL AND NOT o.root_output_id = ANY(v_ids);
+
+            DELETE FROM public.chat_messages m WHERE m.output_id = ANY(v_ids);
+            DELETE FROM public.archive a WHERE a.output_id = ANY(v_ids);
+
+            RETURN QUERY
+                DELETE FROM public.outputs o
+                WHERE o.id = ANY(v_ids)
+                RETURNING o.id, o.file_path, (SELECT b.context_id FROM public.briefs b WHERE b.id = o.brief_id);
+
+            UPDATE public.outputs r
+            SET latest_version_id = (
+                SELECT v.id FROM public.outputs v
+                WHERE v.root_output_id = r.id
+                ORDER BY v.version DESC, v.created_at DESC
+                LIMIT 1
+            )
+            WHERE r.id = ANY(v_root_ids);
+        END;
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.delete_output_cascade(UUID, UUID)")
@@ -0,0 +1,65 @@
+"""RPC get_outputs_summary: per-brief output counters in one query.
+
+OutputService.get_summary used to load every root output of the user
+and count per brief in Python on every dashboard load. This function
+aggregates in SQL and returns one row per active brief with its pack,
+the root output count and whether any of them is still new.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.get_outputs_summary(p_user_id UUID, p_context_id UUID DEFAULT NULL)
+        RETURNS TABLE (
+            pack_id UUID,
+            pack_name TEXT,
+            pack_slug TEXT,
+            brief_id UUID,
+            brief_name TEXT,
+            brief_slug TEXT,
+            output_count BIGINT,
+            has_new BOOLEAN
+        )
+        LANGUAGE sql STABLE
+        AS $$
+            SELECT
+                b.pack_id,
+                COALESCE(p.name, ''),
+                COALESCE(p.slug, ''),
+                b.id,
+                b.name,
+                b.slug,
+                COUNT(o.id),
+                COALESCE(BOOL_OR(o.is_new), FALSE)
+            FROM public.briefs b
+            LEFT JOIN public.agent_packs p ON p.id = b.pack_id
+            LEFT JOIN public.outputs o
+                ON o.brief_id = b.id
+               AND o.user_id = p_user_id
+               AND o.parent_output_id IS NULL
+            WHERE b.user_id = p_user_id
+              AND b.status = 'active'
+              AND (p_context_id IS NULL OR b.context_id = p_context_id)
+            GROUP BY b.pack_id, p.name, p.slug, b.id, b.name, b.slug, b.created_at
+            ORDER BY b.pack_id, b.created_at DESC;
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.get_outputs_summary(UUID, UUID)")
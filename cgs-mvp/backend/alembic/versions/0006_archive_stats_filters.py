@@ -0,0 +1,87 @@
+"""get_archive_stats: optional context/brief filters.
+
+With a context_id or brief_id filter, ArchiveService.get_stats used to
+fetch every matching archive row (embedding included) and count in
+Python. The RPC now accepts both filters, so filtered stats are five
+integers from one indexed query.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+_STATS_V1 = """
+CREATE OR REPLACE FUNCTION public.get_archive_stats(p_user_id UUID)
+RETURNS TABLE (
+    total BIGINT,
+    approved BIGINT,
+    rejected BIGINT,
+    pending_count BIGINT,
+    references_count BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        COUNT(*),
+        COUNT(*) FILTER (WHERE review_status = 'approved'),
+        COUNT(*) FILTER (WHERE review_status = 'rejected'),
+        COUNT(*) FILTER (WHERE review_status = 'pending'),
+        COUNT(*) FILTER (WHERE is_reference = TRUE)
+    FROM public.archive
+    WHERE user_id = p_user_id;
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archive_user_scope ON public.archive(user_id, context_id, brief_id)"
+    )
+
+    # Signature changes → drop the old one so PostgREST doesn't see two overloads
+    op.execute("DROP FUNCTION IF EXISTS public.get_archive_stats(UUID)")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.get_archive_stats(
+            p_user_id UUID,
+            p_context_id UUID DEFAULT NULL,
+            p_brief_id UUID DEFAULT NULL
+        )
+        RETURNS TABLE (
+            total BIGINT,
+            approved BIGINT,
+            rejected BIGINT,
+            pending_count BIGINT,
+            references_count BIGINT
+        )
+        LANGUAGE sql STABLE
+        AS $$
+            SELECT
+                COUNT(*),
+                COUNT(*) FILTER (WHERE review_status = 'approved'),
+                COUNT(*) FILTER (WHERE review_status = 'rejected'),
+                COUNT(*) FILTER (WHERE review_status = 'pending'),
+                COUNT(*) FILTER (WHERE is_reference = TRUE)
+            FROM public.archive
+            WHERE user_id = p_user_id
+              AND (p_context_id IS NULL OR context_id = p_context_id)
+              AND (p_brief_id IS NULL OR brief_id = p_brief_id);
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.get_archive_stats(UUID, UUID, UUID)")
+    op.execute(_STATS_V1)
+    op.execute("DROP INDEX IF EXISTS idx_archive_user_scope")
@@ -0,0 +1,63 @@
+"""Composite indexes for keyset pagination on list endpoints.
+
+Each list endpoint pages on (created_at DESC, id DESC), or on
+(number DESC, id DESC) for outputs and (level, sort_order, id) for context
+items, scoped by its owning column. These indexes turn every page into a
+single index range scan (per-brief output pages use idx_outputs_brief_number
+from 0003).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archive_user_created "
+        "ON public.archive(user_id, created_at DESC, id DESC)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_outputs_user_number "
+        "ON public.outputs(user_id, number DESC, id DESC) WHERE parent_output_id IS NULL"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_briefs_user_created "
+        "ON public.briefs(user_id, created_at DESC, id DESC)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_context_docs_context_created "
+        "ON public.context_documents(context_id, created_at DESC, id DESC)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_brief_docs_brief_created "
+        "ON public.brief_documents(brief_id, created_at DESC, id DESC)"
+    )
+    # Supersedes idx_context_items_level (context_id, level, sort_order)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_context_items_order "
+        "ON public.context_items(context_id, level, sort_order, id)"
+    )
+    op.execute("DROP INDEX IF EXISTS idx_context_items_level")
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_context_items_level "
+        "ON public.context_items(context_id, level, sort_order)"
+    )
+    op.execute("DROP INDEX IF EXISTS idx_context_items_order")
+    op.execute("DROP INDEX IF EXISTS idx_brief_docs_brief_created")
+    op.execute("DROP INDEX IF EXISTS idx_context_docs_context_created")
+    op.execute("DROP INDEX IF EXISTS idx_briefs_user_created")
+    op.execute("DROP INDEX IF EXISTS idx_outputs_user_number")
+    op.execute("DROP INDEX IF EXISTS idx_archive_user_created")
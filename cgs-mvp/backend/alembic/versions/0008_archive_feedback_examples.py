@@ -0,0 +1,115 @@
+"""RPC get_feedback_examples: references + guardrails in one round trip.
+
+Each run used to call get_references and get_guardrails, each a
+brief-scoped query followed by a context-scoped fallback when empty: up
+to four sequential round trips, every one joining the full
+outputs.text_content although the prompt only uses 300 characters.
+
+This function returns both sets at once (kind = 'reference' | 'guardrail'),
+applies the brief-first fallback per set server-side and truncates the
+output excerpt in SQL.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archive_references "
+        "ON public.archive(context_id, brief_id, created_at DESC) WHERE is_reference = TRUE"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archive_guardrails "
+        "ON public.archive(context_id, brief_id, created_at DESC) WHERE review_status = 'rejected'"
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.get_feedback_examples(
+            p_context_id UUID,
+            p_brief_id UUID DEFAULT NULL,
+            p_limit INT DEFAULT 5,
+            p_excerpt_chars INT DEFAULT 300
+        )
+        RETURNS TABLE (
+            kind TEXT,
+            id UUID,
+            output_id UUID,
+            brief_id UUID,
+            topic TEXT,
+            review_status TEXT,
+            is_reference BOOLEAN,
+            reference_notes TEXT,
+            feedback TEXT,
+            feedback_categories JSONB,
+            created_at TIMESTAMPTZ,
+            excerpt TEXT,
+            brief_scoped BOOLEAN
+        )
+        LANGUAGE sql STABLE
+        AS $$
+            WITH matched AS (
+                SELECT
+                    'reference'::TEXT AS kind,
+                    a.id, a.output_id, a.brief_id, a.topic, a.review_status, a.is_reference,
+                    a.reference_notes, a.feedback, a.feedback_categories, a.created_at
+                FROM public.archive a
+                WHERE a.context_id = p_context_id AND a.is_reference = TRUE
+                UNION ALL
+                SELECT
+                    'guardrail'::TEXT AS kind,
+                    a.id, a.output_id, a.brief_id, a.topic, a.review_status, a.is_reference,
+                    a.reference_notes, a.feedback, a.feedback_categories, a.created_at
+                FROM public.archive a
+                WHERE a.context_id = p_context_id AND a.review_status = 'rejected'
+            ),
+            scoped AS (
+                SELECT
+                    m.*,
+                    COALESCE(m.brief_id = p_brief_id, FALSE) AS in_brief,
+                    -- Brief-first: when the brief has rows of this kind, use only those
+                    BOOL_OR(COALESCE(m.brief_id = p_brief_id, FALSE)) OVER (PARTITION BY m.kind) AS kind_has_brief
+                FROM matched m
+            ),
+            ranked AS (
+                SELECT s.*, ROW_NUMBER() OVER (PARTITION BY s.kind ORDER BY s.created_at DESC) AS rn
+                FROM scoped s
+                WHERE s.in_brief OR NOT s.kind_has_brief
+            )
+            SELECT
+                r.kind,
+                r.id,
+                r.output_id,
+                r.brief_id,
+                r.topic,
+                r.review_status,
+                r.is_reference,
+                r.reference_notes,
+                r.feedback,
+                r.feedback_categories,
+                r.created_at,
+                LEFT(o.text_content, p_excerpt_chars),
+                r.in_brief
+            FROM ranked r
+            LEFT JOIN public.outputs o ON o.id = r.output_id
+            WHERE r.rn <= p_limit
+            ORDER BY r.kind, r.created_at DESC;
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.get_feedback_examples(UUID, UUID, INT, INT)")
+    op.execute("DROP INDEX IF EXISTS idx_archive_guardrails")
+    op.execute("DROP INDEX IF EXISTS idx_archive_references")
@@ -0,0 +1,114 @@
+"""Archive embedding pipeline: bookkeeping columns, bulk update RPC, invalidation.
+
+Nothing wrote archive.embedding, so semantic search had nothing to match.
+EmbeddingService now embeds archive rows in the background after review.
+
+- embedding_hash / embedding_model / embedded_at record what was embedded;
+  a NULL hash (or a different model) marks the row for (re-)embedding.
+- set_archive_embeddings(JSONB) writes a whole batch in one round trip.
+- A trigger on outputs clears embedding_hash of the archive row when the
+  output text changes or a new version is added to its chain, so edited
+  content is re-embedded. The previous vector stays searchable meanwhile.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        ALTER TABLE public.archive
+            ADD COLUMN IF NOT EXISTS embedding_hash TEXT,
+            ADD COLUMN IF NOT EXISTS embedding_model TEXT,
+            ADD COLUMN IF NOT EXISTS embedded_at TIMESTAMPTZ
+        """
+    )
+    # Backfill scan: reviewed rows still waiting for an embedding
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archive_embedding_pending "
+        "ON public.archive(id) WHERE embedding_hash IS NULL AND review_status <> 'pending'"
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.set_archive_embeddings(p_items JSONB)
+        RETURNS INT
+        LANGUAGE sql
+        AS $$
+            -- p_items: [{"id": uuid, "embedding": [..1536 floats..], "hash": text, "model": text}]
+            WITH updated AS (
+                UPDATE public.archive a
+                SET embedding = (x->>'embedding')::vector,
+                    embedding_hash = x->>'hash',
+                    embedding_model = x->>'model',
+                    embedded_at = NOW()
+                FROM jsonb_array_elements(p_items) AS x
+                WHERE a.id = (x->>'id')::uuid
+                RETURNING 1
+            )
+            SELECT COUNT(*)::INT FROM updated;
+        $$
+        """
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.outputs_invalidate_embedding()
+        RETURNS TRIGGER
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            UPDATE public.archive
+            SET embedding_hash = NULL
+            WHERE output_id = COALESCE(NEW.root_output_id, NEW.id)
+              AND embedding_hash IS NOT NULL;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_outputs_invalidate_embedding_upd
+        AFTER UPDATE OF text_content ON public.outputs
+        FOR EACH ROW
+        WHEN (OLD.text_content IS DISTINCT FROM NEW.text_content)
+        EXECUTE FUNCTION public.outputs_invalidate_embedding()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_outputs_invalidate_embedding_ins
+        AFTER INSERT ON public.outputs
+        FOR EACH ROW
+        WHEN (NEW.root_output_id IS NOT NULL)
+        EXECUTE FUNCTION public.outputs_invalidate_embedding()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_outputs_invalidate_embedding_ins ON public.outputs")
+    op.execute("DROP TRIGGER IF EXISTS trg_outputs_invalidate_embedding_upd ON public.outputs")
+    op.execute("DROP FUNCTION IF EXISTS public.outputs_invalidate_embedding()")
+    op.execute("DROP FUNCTION IF EXISTS public.set_archive_embeddings(JSONB)")
+    op.execute("DROP INDEX IF EXISTS idx_archive_embedding_pending")
+    op.execute(
+        """
+        ALTER TABLE public.archive
+            DROP COLUMN IF EXISTS embedded_at,
+            DROP COLUMN IF EXISTS embedding_model,
+            DROP COLUMN IF EXISTS embedding_hash
+        """
+    )
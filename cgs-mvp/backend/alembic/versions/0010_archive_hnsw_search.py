@@ -0,0 +1,254 @@
+"""Archive vector search: HNSW index + filtered, brief-first match_archive RPC.
+
+- The ivfflat index (lists = 100) was built on an almost empty table and
+  loses recall as the archive grows unless it is rebuilt. HNSW needs no
+  training and keeps recall stable under inserts.
+- search_archive_by_embedding (migration 004/005) is called twice for
+  brief-first lookups and cannot filter on review status or references.
+  match_archive does the brief-first fallback in one call, accepts those
+  filters and sets hnsw.ef_search for the query (transaction-local).
+  The HNSW index is global, and pgvector filters its ef_search candidates
+  afterwards, so a small context in a large archive would get fewer than
+  match_count rows. Contexts with fewer than exact_scan_max embedded rows
+  are scanned exactly. Larger ones use iterative index scans
+  (hnsw.iterative_scan, pgvector >= 0.8).
+- get_feedback_examples gains an optional query embedding: when given,
+  references and guardrails are ranked by similarity to the new topic
+  instead of recency (rows without an embedding come last).
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+_FEEDBACK_EXAMPLES = """
+CREATE OR REPLACE FUNCTION public.get_feedback_examples(
+    p_context_id UUID,
+    p_brief_id UUID DEFAULT NULL,
+    p_limit INT DEFAULT 5,
+    p_excerpt_chars INT DEFAULT 300{extra_params}
+)
+RETURNS TABLE (
+    kind TEXT,
+    id UUID,
+    output_id UUID,
+    brief_id UUID,
+    topic TEXT,
+    review_status TEXT,
+    is_reference BOOLEAN,
+    reference_notes TEXT,
+    feedback TEXT,
+    feedback_categories JSONB,
+    created_at TIMESTAMPTZ,
+    excerpt TEXT,
+    brief_scoped BOOLEAN
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH matched AS (
+        SELECT
+            'reference'::TEXT AS kind,
+            a.id, a.output_id, a.brief_id, a.topic, a.review_status, a.is_reference,
+            a.reference_notes, a.feedback, a.feedback_categories, a.created_at, {distance} AS distance
+        FROM public.archive a
+        WHERE a.context_id = p_context_id AND a.is_reference = TRUE
+        UNION ALL
+        SELECT
+            'guardrail'::TEXT AS kind,
+            a.id, a.output_id, a.brief_id, a.topic, a.review_status, a.is_reference,
+            a.reference_notes, a.feedback, a.feedback_categories, a.created_at, {distance} AS distance
+        FROM public.archive a
+        WHERE a.context_id = p_context_id AND a.review_status = 'rejected'
+    ),
+    scoped AS (
+        SELECT
+            m.*,
+            COALESCE(m.brief_id = p_brief_id, FALSE) AS in_brief,
+            -- Brief-first: when the brief has rows of this kind, use only those
+            BOOL_OR(COALESCE(m.brief_id = p_brief_id, FALSE)) OVER (PARTITION BY m.kind) AS kind_has_brief
+        FROM matched m
+    ),
+    ranked AS (
+        SELECT
+            s.*,
+            ROW_NUMBER() OVER (PARTITION BY s.kind ORDER BY s.distance ASC NULLS LAST, s.created_at DESC) AS rn
+        FROM scoped s
+        WHERE s.in_brief OR NOT s.kind_has_brief
+    )
+    SELECT
+        r.kind,
+        r.id,
+        r.output_id,
+        r.brief_id,
+        r.topic,
+        r.review_status,
+        r.is_reference,
+        r.reference_notes,
+        r.feedback,
+        r.feedback_categories,
+        r.created_at,
+        LEFT(o.text_content, p_excerpt_chars),
+        r.in_brief
+    FROM ranked r
+    LEFT JOIN public.outputs o ON o.id = r.output_id
+    WHERE r.rn <= p_limit
+    ORDER BY r.kind, r.rn;
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_archive_embedding")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archive_embedding_hnsw ON public.archive "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.match_archive(
+            query_embedding VECTOR(1536),
+            match_context_id UUID,
+            match_count INT DEFAULT 5,
+            match_brief_id UUID DEFAULT NULL,
+            match_review_status TEXT DEFAULT NULL,
+            match_is_reference BOOLEAN DEFAULT NULL,
+            ef_search INT DEFAULT 80,
+            exact_scan_max INT DEFAULT 2000
+        )
+        RETURNS TABLE (
+            id UUID,
+            output_id UUID,
+            brief_id UUID,
+            topic TEXT,
+            content_type TEXT,
+            review_status TEXT,
+            is_reference BOOLEAN,
+            feedback TEXT,
+            similarity FLOAT,
+            brief_scoped BOOLEAN
+        )
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            v_context_rows INT;
+        BEGIN
+            -- Candidate list size for the HNSW scan (recall vs latency), this transaction only
+            PERFORM set_config('hnsw.ef_search', GREATEST(ef_search, match_count)::TEXT, TRUE);
+
+            IF match_brief_id IS NOT NULL THEN
+                -- A brief holds few rows: exact scan via idx_archive_brief. Post-filtering
+                -- an HNSW scan on brief_id would cut recall.
+                RETURN QUERY
+                    SELECT
+                        a.id, a.output_id, a.brief_id, a.topic, a.content_type,
+                        a.review_status, a.is_reference, a.feedback,
+                        1 - (a.embedding <=> query_embedding), TRUE
+                    FROM public.archive a
+                    WHERE a.brief_id = match_brief_id
+                      AND a.context_id = match_context_id
+                      AND a.embedding IS NOT NULL
+                      AND (match_review_status IS NULL OR a.review_status = match_review_status)
+                      AND (match_is_reference IS NULL OR a.is_reference = match_is_reference)
+                    ORDER BY a.embedding <=> query_embedding
+                    LIMIT match_count;
+                IF FOUND THEN
+                    RETURN;
+                END IF;
+            END IF;
+
+            -- Context-wide (or fallback when the brief has no match). The HNSW index spans
+            -- every context and its candidates are filtered afterwards: a small context
+            -- would get fewer than match_count rows, often none, so it is scanned exactly.
+            SELECT COUNT(*) INTO v_context_rows
+            FROM (
+                SELECT 1 FROM public.archive
+                WHERE context_id = match_context_id AND embedding IS NOT NULL
+                LIMIT exact_scan_max
+            ) s;
+
+            IF v_context_rows < exact_scan_max THEN
+                -- MATERIALIZED keeps the planner off the HNSW index: exact scan via idx_archive_context
+                RETURN QUERY
+                    WITH candidates AS MATERIALIZED (
+                        SELECT
+                            a.id, a.output_id, a.brief_id, a.topic, a.content_type,
+                            a.review_status, a.is_reference, a.feedback,
+                            a.embedding <=> query_embedding AS distance
+                        FROM public.archive a
+                        WHERE a.context_id = match_context_id
+                          AND a.embedding IS NOT NULL
+                          AND (match_review_status IS NULL OR a.review_status = match_review_status)
+                          AND (match_is_reference IS NULL OR a.is_reference = match_is_reference)
+                    )
+                    SELECT
+                        c.id, c.output_id, c.brief_id, c.topic, c.content_type,
+                        c.review_status, c.is_reference, c.feedback,
+                        1 - c.distance, FALSE
+                    FROM candidates c
+                    ORDER BY c.distance
+                    LIMIT match_count;
+                RETURN;
+            END IF;
+
+            -- Large context: keep scanning the index until enough rows pass the filters
+            BEGIN
+                PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', TRUE);
+            EXCEPTION WHEN OTHERS THEN
+                NULL;  -- pgvector < 0.8: plain post-filtered scan
+            END;
+            -- relaxed_order may return rows slightly out of order: re-sort them
+            RETURN QUERY
+                WITH matches AS MATERIALIZED (
+                    SELECT
+                        a.id, a.output_id, a.brief_id, a.topic, a.content_type,
+                        a.review_status, a.is_reference, a.feedback,
+                        a.embedding <=> query_embedding AS distance
+                    FROM public.archive a
+                    WHERE a.context_id = match_context_id
+                      AND a.embedding IS NOT NULL
+                      AND (match_review_status IS NULL OR a.review_status = match_review_status)
+                      AND (match_is_reference IS NULL OR a.is_reference = match_is_reference)
+                    ORDER BY a.embedding <=> query_embedding
+                    LIMIT match_count
+                )
+                SELECT
+                    m.id, m.output_id, m.brief_id, m.topic, m.content_type,
+                    m.review_status, m.is_reference, m.feedback,
+                    1 - m.distance, FALSE
+                FROM matches m
+                ORDER BY m.distance;
+        END;
+        $$
+        """
+    )
+
+    # New optional parameter → drop the old signature so PostgREST sees one function
+    op.execute("DROP FUNCTION IF EXISTS public.get_feedback_examples(UUID, UUID, INT, INT)")
+    op.execute(
+        _FEEDBACK_EXAMPLES.format(
+            extra_params=",\n    p_query_embedding VECTOR(1536) DEFAULT NULL",
+            distance="a.embedding <=> p_query_embedding",
+        )
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.get_feedback_examples(UUID, UUID, INT, INT, VECTOR)")
+    op.execute(_FEEDBACK_EXAMPLES.format(extra_params="", distance="NULL::FLOAT"))
+    op.execute("DROP FUNCTION IF EXISTS public.match_archive(VECTOR, UUID, INT, UUID, TEXT, BOOLEAN, INT, INT)")
+    op.execute("DROP INDEX IF EXISTS idx_archive_embedding_hnsw")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archive_embedding ON public.archive "
+        "USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100)"
+    )
@@ -0,0 +1,43 @@
+"""embedding_cache: persistent cache of query embeddings.
+
+Optional second level behind the in-process LRU of EmbeddingClient
+(enabled with EMBEDDING_CACHE_PERSISTENT=true): repeated archive searches
+and run topics survive restarts and are shared across workers instead of
+costing an embeddings API call each. Keyed by sha256(model + normalized
+query text). Rows expire after EMBEDDING_CACHE_PERSISTENT_TTL_SECONDS: they
+are ignored on read and pruned on write.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS public.embedding_cache (
+            key_hash TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            embedding VECTOR(1536) NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        )
+        """
+    )
+    # Service-role only: no RLS policies, clients never read it directly
+    op.execute("ALTER TABLE public.embedding_cache ENABLE ROW LEVEL SECURITY")
+    # EmbeddingClient prunes expired entries: DELETE ... WHERE created_at < NOW() - <ttl>
+    op.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_created ON public.embedding_cache(created_at)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS public.embedding_cache")
@@ -0,0 +1,131 @@
+"""Document ingestion: chunk table, ingestion status, chunk search RPC.
+
+Uploaded context/brief documents were stored but never read. The
+ingestion worker (DocumentIngestionService) now extracts their text,
+splits it into chunks and embeds them here, so runs can inject only the
+chunks relevant to the topic.
+
+- document_chunks: one row per chunk; exactly one of context_document_id /
+  brief_document_id is set (ON DELETE CASCADE with the document).
+  context_id is always set (a brief document inherits its brief's
+  context), brief_id only for brief documents.
+- ingestion_status / ingestion_error / chunk_count on both document tables.
+- match_document_chunks: HNSW search over a context's documents plus the
+  documents of one brief (other briefs' documents are excluded).
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ("context_documents", "brief_documents"):
+        op.execute(
+            f"""
+            ALTER TABLE public.{table}
+                ADD COLUMN IF NOT EXISTS ingestion_status TEXT NOT NULL DEFAULT 'pending'
+                    CHECK (ingestion_status IN ('pending', 'processing', 'ready', 'failed', 'skipped')),
+                ADD COLUMN IF NOT EXISTS ingestion_error TEXT,
+                ADD COLUMN IF NOT EXISTS chunk_count INT NOT NULL DEFAULT 0
+            """
+        )
+
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS public.document_chunks (
+            id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+            context_document_id UUID REFERENCES public.context_documents(id) ON DELETE CASCADE,
+            brief_document_id UUID REFERENCES public.brief_documents(id) ON DELETE CASCADE,
+            context_id UUID NOT NULL REFERENCES public.contexts(id) ON DELETE CASCADE,
+            brief_id UUID REFERENCES public.briefs(id) ON DELETE CASCADE,
+            user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+            chunk_index INT NOT NULL,
+            content TEXT NOT NULL,
+            token_count INT NOT NULL DEFAULT 0,
+            embedding VECTOR(1536),
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            CHECK ((context_document_id IS NULL) <> (brief_document_id IS NULL))
+        )
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_doc_chunks_context_doc "
+        "ON public.document_chunks(context_document_id, chunk_index) WHERE context_document_id IS NOT NULL"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_doc_chunks_brief_doc "
+        "ON public.document_chunks(brief_document_id, chunk_index) WHERE brief_document_id IS NOT NULL"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_doc_chunks_context ON public.document_chunks(context_id)")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_doc_chunks_embedding ON public.document_chunks "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+    op.execute("ALTER TABLE public.document_chunks ENABLE ROW LEVEL SECURITY")
+    op.execute('CREATE POLICY "own_document_chunks" ON public.document_chunks FOR ALL USING (auth.uid() = user_id)')
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.match_document_chunks(
+            query_embedding VECTOR(1536),
+            match_context_id UUID,
+            match_brief_id UUID DEFAULT NULL,
+            match_count INT DEFAULT 5,
+            ef_search INT DEFAULT 80
+        )
+        RETURNS TABLE (
+            id UUID,
+            document_id UUID,
+            file_name TEXT,
+            chunk_index INT,
+            content TEXT,
+            similarity FLOAT
+        )
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            PERFORM set_config('hnsw.ef_search', GREATEST(ef_search, match_count)::TEXT, TRUE);
+            RETURN QUERY
+                SELECT
+                    c.id,
+                    COALESCE(c.context_document_id, c.brief_document_id),
+                    COALESCE(cd.file_name, bd.file_name),
+                    c.chunk_index,
+                    c.content,
+                    1 - (c.embedding <=> query_embedding)
+                FROM public.document_chunks c
+                LEFT JOIN public.context_documents cd ON cd.id = c.context_document_id
+                LEFT JOIN public.brief_documents bd ON bd.id = c.brief_document_id
+                WHERE c.context_id = match_context_id
+                  AND (c.brief_id IS NULL OR c.brief_id = match_brief_id)
+                  AND c.embedding IS NOT NULL
+                ORDER BY c.embedding <=> query_embedding
+                LIMIT match_count;
+        END;
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.match_document_chunks(VECTOR, UUID, UUID, INT, INT)")
+    op.execute("DROP TABLE IF EXISTS public.document_chunks")
+    for table in ("brief_documents", "context_documents"):
+        op.execute(
+            f"""
+            ALTER TABLE public.{table}
+                DROP COLUMN IF EXISTS chunk_count,
+                DROP COLUMN IF EXISTS ingestion_error,
+                DROP COLUMN IF EXISTS ingestion_status
+            """
+        )
@@ -0,0 +1,284 @@
+"""Content-addressed document storage: shared blobs, ref counts, per-blob chunks.
+
+Identical files uploaded by a user to several contexts/briefs are stored
+once and referenced by content_hash from each document row. Blobs are
+scoped per user (key: user_id + sha256): files are never shared across
+tenants, so a document's path and ingestion never reveal another user's
+upload. Extraction and embedding run once per blob: document_chunks rows
+now belong either to a blob (content_hash) or, for documents not yet hashed,
+to the document as in 0012. The ingestion backfill hashes those documents
+and hands their existing chunks to the blob, so nothing is reset or
+re-embedded. match_document_chunks serves both kinds.
+
+- document_blobs: one row per (user, unique file) with storage path, size,
+  ref_count, ingestion state and extracted text. Service-only (RLS, no policies).
+- content_hash on context_documents / brief_documents, FK (user_id, content_hash);
+  ref_count kept by trigger on insert / delete / hash change, so cascaded
+  deletes count too. Blobs left at ref_count 0 are removed by DocumentService
+  (storage + row).
+- acquire_document_blob: insert-or-touch, tells the uploader whether its
+  bytes are new (move them into place) or already stored (discard them).
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS public.document_blobs (
+            user_id UUID NOT NULL,
+            sha256 TEXT NOT NULL,
+            storage_path TEXT NOT NULL,
+            size_bytes BIGINT NOT NULL,
+            mime_type TEXT,
+            ref_count INT NOT NULL DEFAULT 0,
+            ingestion_status TEXT NOT NULL DEFAULT 'pending'
+                CHECK (ingestion_status IN ('pending', 'processing', 'ready', 'failed', 'skipped')),
+            ingestion_error TEXT,
+            ingestion_started_at TIMESTAMPTZ,
+            chunk_count INT NOT NULL DEFAULT 0,
+            text_content TEXT,
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            last_used_at TIMESTAMPTZ DEFAULT NOW(),
+            PRIMARY KEY (user_id, sha256)
+        )
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_document_blobs_unreferenced "
+        "ON public.document_blobs(last_used_at) WHERE ref_count = 0"
+    )
+    op.execute("ALTER TABLE public.document_blobs ENABLE ROW LEVEL SECURITY")
+
+    for table in ("context_documents", "brief_documents"):
+        op.execute(f"ALTER TABLE public.{table} ADD COLUMN IF NOT EXISTS content_hash TEXT")
+        op.execute(
+            f"ALTER TABLE public.{table} ADD CONSTRAINT fk_{table}_blob "
+            "FOREIGN KEY (user_id, content_hash) REFERENCES public.document_blobs(user_id, sha256)"
+        )
+        op.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_content_hash ON public.{table}(user_id, content_hash)")
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.document_blob_refcount()
+        RETURNS TRIGGER
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.content_hash IS NOT NULL THEN
+                UPDATE public.document_blobs SET ref_count = ref_count - 1
+                WHERE user_id = OLD.user_id AND sha256 = OLD.content_hash;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.content_hash IS NOT NULL THEN
+                UPDATE public.document_blobs
+                SET ref_count = ref_count + 1, last_used_at = NOW()
+                WHERE user_id = NEW.user_id AND sha256 = NEW.content_hash;
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    for table in ("context_documents", "brief_documents"):
+        op.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_blob_refcount
+                AFTER INSERT OR DELETE OR UPDATE OF content_hash ON public.{table}
+                FOR EACH ROW
+                EXECUTE FUNCTION public.document_blob_refcount()
+            """
+        )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.acquire_document_blob(
+            p_user_id UUID,
+            p_sha256 TEXT,
+            p_storage_path TEXT,
+            p_size_bytes BIGINT,
+            p_mime_type TEXT
+        )
+        RETURNS TABLE (storage_path TEXT, created BOOLEAN)
+        LANGUAGE sql
+        AS $$
+            INSERT INTO public.document_blobs (user_id, sha256, storage_path, size_bytes, mime_type)
+            VALUES (p_user_id, p_sha256, p_storage_path, p_size_bytes, p_mime_type)
+            ON CONFLICT (user_id, sha256) DO UPDATE SET last_used_at = NOW()
+            RETURNING document_blobs.storage_path, (xmax = 0);
+        $$
+        """
+    )
+
+    # Chunks belong to the blob; rows from 0012 stay attached to their
+    # document until the backfill hashes it and moves them to the blob.
+    op.execute(
+        """
+        ALTER TABLE public.document_chunks
+            ADD COLUMN IF NOT EXISTS content_hash TEXT,
+            ALTER COLUMN context_id DROP NOT NULL,
+            DROP CONSTRAINT IF EXISTS document_chunks_check,
+            ADD CONSTRAINT document_chunks_owner_check CHECK (
+                CASE WHEN content_hash IS NULL
+                    THEN (context_document_id IS NULL) <> (brief_document_id IS NULL)
+                    ELSE context_document_id IS NULL AND brief_document_id IS NULL
+                END
+            ),
+            ADD CONSTRAINT fk_document_chunks_blob FOREIGN KEY (user_id, content_hash)
+                REFERENCES public.document_blobs(user_id, sha256) ON DELETE CASCADE
+        """
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_document_chunks_blob "
+        "ON public.document_chunks(user_id, content_hash, chunk_index) WHERE content_hash IS NOT NULL"
+    )
+    # Searches scan the chunks of a context's few blobs exactly: the HNSW graph is only write cost
+    op.execute("DROP INDEX IF EXISTS public.idx_doc_chunks_embedding")
+
+    op.execute("DROP FUNCTION IF EXISTS public.match_document_chunks(VECTOR, UUID, UUID, INT, INT)")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.match_document_chunks(
+            query_embedding VECTOR(1536),
+            match_context_id UUID,
+            match_brief_id UUID DEFAULT NULL,
+            match_count INT DEFAULT 5
+        )
+        RETURNS TABLE (
+            id UUID,
+            document_id UUID,
+            file_name TEXT,
+            chunk_index INT,
+            content TEXT,
+            similarity FLOAT
+        )
+        LANGUAGE sql
+        STABLE
+        AS $$
+            WITH context_docs AS (
+                SELECT user_id, content_hash, id, file_name, created_at
+                FROM public.context_documents
+                WHERE context_id = match_context_id
+            ),
+            brief_docs AS (
+                SELECT user_id, content_hash, id, file_name, created_at
+                FROM public.brief_documents
+                WHERE brief_id = match_brief_id
+            ),
+            blob_docs AS (
+                SELECT DISTINCT ON (d.user_id, d.content_hash) d.user_id, d.content_hash, d.id, d.file_name
+                FROM (SELECT * FROM context_docs UNION ALL SELECT * FROM brief_docs) d
+                WHERE d.content_hash IS NOT NULL
+                ORDER BY d.user_id, d.content_hash, d.created_at
+            ),
+            candidates AS (
+                SELECT c.id, d.id AS document_id, d.file_name, c.chunk_index, c.content, c.embedding
+                FROM blob_docs d
+                JOIN public.document_chunks c ON c.user_id = d.user_id AND c.content_hash = d.content_hash
+                UNION ALL
+                -- Documents not hashed yet keep their per-document chunks (0012)
+                SELECT c.id, d.id, d.file_name, c.chunk_index, c.content, c.embedding
+                FROM context_docs d
+                JOIN public.document_chunks c ON c.context_document_id = d.id
+                WHERE d.content_hash IS NULL
+                UNION ALL
+                SELECT c.id, d.id, d.file_name, c.chunk_index, c.content, c.embedding
+                FROM brief_docs d
+                JOIN public.document_chunks c ON c.brief_document_id = d.id
+                WHERE d.content_hash IS NULL
+            )
+            SELECT id, document_id, file_name, chunk_index, content, 1 - (embedding <=> query_embedding)
+            FROM candidates
+            WHERE embedding IS NOT NULL
+            ORDER BY embedding <=> query_embedding
+            LIMIT match_count;
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.match_document_chunks(VECTOR, UUID, UUID, INT)")
+    # Blob chunks have no per-document form: their documents are re-ingested after downgrade
+    for table in ("context_documents", "brief_documents"):
+        op.execute(
+            f"UPDATE public.{table} SET ingestion_status = 'pending', chunk_count = 0 WHERE content_hash IS NOT NULL"
+        )
+    op.execute("DELETE FROM public.document_chunks WHERE content_hash IS NOT NULL")
+    op.execute("DROP INDEX IF EXISTS public.uq_document_chunks_blob")
+    op.execute(
+        """
+        ALTER TABLE public.document_chunks
+            DROP CONSTRAINT IF EXISTS fk_document_chunks_blob,
+            DROP CONSTRAINT IF EXISTS document_chunks_owner_check,
+            DROP COLUMN IF EXISTS content_hash,
+            ALTER COLUMN context_id SET NOT NULL,
+            ADD CONSTRAINT document_chunks_check
+                CHECK ((context_document_id IS NULL) <> (brief_document_id IS NULL))
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_doc_chunks_embedding ON public.document_chunks "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.match_document_chunks(
+            query_embedding VECTOR(1536),
+            match_context_id UUID,
+            match_brief_id UUID DEFAULT NULL,
+            match_count INT DEFAULT 5,
+            ef_search INT DEFAULT 80
+        )
+        RETURNS TABLE (
+            id UUID,
+            document_id UUID,
+            file_name TEXT,
+            chunk_index INT,
+            content TEXT,
+            similarity FLOAT
+        )
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            PERFORM set_config('hnsw.ef_search', GREATEST(ef_search, match_count)::TEXT, TRUE);
+            RETURN QUERY
+                SELECT
+                    c.id,
+                    COALESCE(c.context_document_id, c.brief_document_id),
+                    COALESCE(cd.file_name, bd.file_name),
+                    c.chunk_index,
+                    c.content,
+                    1 - (c.embedding <=> query_embedding)
+                FROM public.document_chunks c
+                LEFT JOIN public.context_documents cd ON cd.id = c.context_document_id
+                LEFT JOIN public.brief_documents bd ON bd.id = c.brief_document_id
+                WHERE c.context_id = match_context_id
+                  AND (c.brief_id IS NULL OR c.brief_id = match_brief_id)
+                  AND c.embedding IS NOT NULL
+                ORDER BY c.embedding <=> query_embedding
+                LIMIT match_count;
+        END;
+        $$
+        """
+    )
+
+    op.execute("DROP FUNCTION IF EXISTS public.acquire_document_blob(UUID, TEXT, TEXT, BIGINT, TEXT)")
+    for table in ("brief_documents", "context_documents"):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_blob_refcount ON public.{table}")
+        op.execute(f"DROP INDEX IF EXISTS public.idx_{table}_content_hash")
+        op.execute(f"ALTER TABLE public.{table} DROP CONSTRAINT IF EXISTS fk_{table}_blob")
+        op.execute(f"ALTER TABLE public.{table} DROP COLUMN IF EXISTS content_hash")
+    op.execute("DROP FUNCTION IF EXISTS public.document_blob_refcount()")
+    op.execute("DROP TABLE IF EXISTS public.document_blobs")
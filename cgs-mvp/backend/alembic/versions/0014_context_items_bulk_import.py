@@ -0,0 +1,83 @@
+"""Bulk CSV import of context items: staging table + atomic swap RPC.
+
+The CSV import used to insert one row per node and update each leaf's
+content separately (thousands of round trips for a large file). The tree is
+now built in memory with client-generated UUIDs, written in large batches
+to context_item_imports, then swapped in by commit_context_items_import:
+delete the context's items and insert the staged tree in one transaction,
+so a failed import leaves the previous items untouched.
+
+- context_item_imports: UNLOGGED staging rows keyed by import_id.
+  Service-only (RLS, no policies). Rows of abandoned imports are pruned
+  by the next commit after a day.
+- commit_context_items_import(p_context_id, p_import_id) → rows inserted.
+  Locks the contexts row first, so concurrent imports into one context
+  apply one after the other (the last one wins).
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0014"
+down_revision: Union[str, None] = "0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS public.context_item_imports (
+            import_id UUID NOT NULL,
+            id UUID NOT NULL,
+            parent_id UUID,
+            level INT NOT NULL,
+            name TEXT NOT NULL,
+            content TEXT,
+            sort_order INT NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        )
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_context_item_imports_import ON public.context_item_imports(import_id)")
+    op.execute("ALTER TABLE public.context_item_imports ENABLE ROW LEVEL SECURITY")
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.commit_context_items_import(p_context_id UUID, p_import_id UUID)
+        RETURNS INT
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            inserted INT;
+        BEGIN
+            -- Serialize imports into one context: under READ COMMITTED a concurrent
+            -- import's DELETE would miss the rows inserted here and both trees survive
+            PERFORM 1 FROM public.contexts WHERE id = p_context_id FOR UPDATE;
+
+            DELETE FROM public.context_items WHERE context_id = p_context_id;
+
+            -- FK parent_id is checked at the end of the statement: row order does not matter
+            INSERT INTO public.context_items (id, context_id, parent_id, level, name, content, sort_order)
+            SELECT id, p_context_id, parent_id, level, name, content, sort_order
+            FROM public.context_item_imports
+            WHERE import_id = p_import_id;
+            GET DIAGNOSTICS inserted = ROW_COUNT;
+
+            DELETE FROM public.context_item_imports
+            WHERE import_id = p_import_id OR created_at < NOW() - INTERVAL '1 day';
+            RETURN inserted;
+        END;
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.commit_context_items_import(UUID, UUID)")
+    op.execute("DROP TABLE IF EXISTS public.context_item_imports")
@@ -0,0 +1,235 @@
+"""Materialized path for context items + per-context items version.
+
+get_tree and the run prompt rebuilt the whole parent/child tree in Python
+from every item of the context, and there was no way to fetch one branch.
+
+- context_items.path (COLLATE "C"): the ancestors' segments joined by "/",
+  one segment = sort_order (offset to 10 sortable digits) + id hex. Ordering
+  by path gives depth-first order with siblings by sort_order; a node's
+  subtree is the range [path, path || '0') ('/' sorts right before '0').
+- context_items.depth: 0 for roots (the CSV "level" can skip numbers).
+- Both are maintained by triggers: computed from the parent on insert and on
+  parent_id/sort_order updates, then propagated to the moved subtree.
+- contexts.items_version: bumped once per statement that writes the context's
+  items, so a serialized tree can be cached per (context_id, items_version).
+- commit_context_items_import inserts parents before children (ordered by
+  level), since the path trigger reads the parent's path.
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0015"
+down_revision: Union[str, None] = "0014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.context_item_path_segment(p_sort_order INT, p_id UUID)
+        RETURNS TEXT
+        LANGUAGE sql
+        IMMUTABLE
+        AS $$
+            SELECT lpad((COALESCE(p_sort_order, 0)::BIGINT + 2147483648)::TEXT, 10, '0')
+                || replace(p_id::TEXT, '-', '')
+        $$
+        """
+    )
+
+    op.execute('ALTER TABLE public.context_items ADD COLUMN IF NOT EXISTS path TEXT COLLATE "C"')
+    op.execute("ALTER TABLE public.context_items ADD COLUMN IF NOT EXISTS depth INT")
+    op.execute(
+        """
+        WITH RECURSIVE tree AS (
+            SELECT id, public.context_item_path_segment(sort_order, id) AS path, 0 AS depth
+            FROM public.context_items
+            WHERE parent_id IS NULL
+            UNION ALL
+            SELECT c.id, t.path || '/' || public.context_item_path_segment(c.sort_order, c.id), t.depth + 1
+            FROM public.context_items c
+            JOIN tree t ON c.parent_id = t.id
+        )
+        UPDATE public.context_items ci
+        SET path = tree.path, depth = tree.depth
+        FROM tree
+        WHERE ci.id = tree.id
+        """
+    )
+    op.execute("ALTER TABLE public.context_items ALTER COLUMN path SET NOT NULL")
+    op.execute("ALTER TABLE public.context_items ALTER COLUMN depth SET NOT NULL")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_context_items_path ON public.context_items(context_id, path)")
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.context_items_set_path()
+        RETURNS TRIGGER
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            parent_path TEXT;
+            parent_depth INT;
+        BEGIN
+            IF NEW.parent_id IS NOT NULL THEN
+                SELECT path, depth INTO parent_path, parent_depth
+                FROM public.context_items
+                WHERE id = NEW.parent_id;
+                IF parent_path IS NULL THEN
+                    RAISE EXCEPTION 'Parent context item % not found', NEW.parent_id
+                        USING ERRCODE = 'foreign_key_violation';
+                END IF;
+                IF TG_OP = 'UPDATE' AND (parent_path = OLD.path OR parent_path LIKE OLD.path || '/%') THEN
+                    RAISE EXCEPTION 'Context item % cannot be moved under its own subtree', NEW.id;
+                END IF;
+            END IF;
+
+            NEW.path := COALESCE(parent_path || '/', '') || public.context_item_path_segment(NEW.sort_order, NEW.id);
+            NEW.depth := COALESCE(parent_depth + 1, 0);
+            RETURN NEW;
+        END;
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_context_items_set_path
+            BEFORE INSERT OR UPDATE OF parent_id, sort_order ON public.context_items
+            FOR EACH ROW EXECUTE FUNCTION public.context_items_set_path()
+        """
+    )
+
+    # The descendants' UPDATE only sets path/depth, so it does not re-fire either trigger
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.context_items_move_subtree()
+        RETURNS TRIGGER
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            UPDATE public.context_items
+            SET path = NEW.path || substr(path, length(OLD.path) + 1),
+                depth = depth + NEW.depth - OLD.depth
+            WHERE context_id = OLD.context_id
+              AND path > OLD.path || '/'
+              AND path < OLD.path || '0';
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_context_items_move_subtree
+            AFTER UPDATE OF parent_id, sort_order ON public.context_items
+            FOR EACH ROW
+            WHEN (OLD.path IS DISTINCT FROM NEW.path)
+            EXECUTE FUNCTION public.context_items_move_subtree()
+        """
+    )
+
+    op.execute("ALTER TABLE public.contexts ADD COLUMN IF NOT EXISTS items_version BIGINT NOT NULL DEFAULT 0")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.bump_context_items_version()
+        RETURNS TRIGGER
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                UPDATE public.contexts SET items_version = items_version + 1
+                WHERE id IN (SELECT context_id FROM old_rows);
+            ELSE
+                UPDATE public.contexts SET items_version = items_version + 1
+                WHERE id IN (SELECT context_id FROM new_rows);
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    # Transition tables need one trigger per event
+    op.execute(
+        """
+        CREATE TRIGGER trg_context_items_version_insert
+            AFTER INSERT ON public.context_items
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION public.bump_context_items_version()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_context_items_version_update
+            AFTER UPDATE ON public.context_items
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION public.bump_context_items_version()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_context_items_version_delete
+            AFTER DELETE ON public.context_items
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION public.bump_context_items_version()
+        """
+    )
+
+    _create_import_function(ordered=True)
+
+
+def _create_import_function(ordered: bool) -> None:
+    # Row triggers see the rows inserted before them in the same statement:
+    # with parents first, each child finds its parent's path
+    order_by = "ORDER BY level, sort_order" if ordered else ""
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION public.commit_context_items_import(p_context_id UUID, p_import_id UUID)
+        RETURNS INT
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            inserted INT;
+        BEGIN
+            -- Serialize imports into one context: under READ COMMITTED a concurrent
+            -- import's DELETE would miss the rows inserted here and both trees survive
+            PERFORM 1 FROM public.contexts WHERE id = p_context_id FOR UPDATE;
+
+            DELETE FROM public.context_items WHERE context_id = p_context_id;
+
+            INSERT INTO public.context_items (id, context_id, parent_id, level, name, content, sort_order)
+            SELECT id, p_context_id, parent_id, level, name, content, sort_order
+            FROM public.context_item_imports
+            WHERE import_id = p_import_id
+            {order_by};
+            GET DIAGNOSTICS inserted = ROW_COUNT;
+
+            DELETE FROM public.context_item_imports
+            WHERE import_id = p_import_id OR created_at < NOW() - INTERVAL '1 day';
+            RETURN inserted;
+        END;
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    _create_import_function(ordered=False)
+    op.execute("DROP TRIGGER IF EXISTS trg_context_items_version_delete ON public.context_items")
+    op.execute("DROP TRIGGER IF EXISTS trg_context_items_version_update ON public.context_items")
+    op.execute("DROP TRIGGER IF EXISTS trg_context_items_version_insert ON public.context_items")
+    op.execute("DROP FUNCTION IF EXISTS public.bump_context_items_version()")
+    op.execute("ALTER TABLE public.contexts DROP COLUMN IF EXISTS items_version")
+    op.execute("DROP TRIGGER IF EXISTS trg_context_items_move_subtree ON public.context_items")
+    op.execute("DROP TRIGGER IF EXISTS trg_context_items_set_path ON public.context_items")
+    op.execute("DROP FUNCTION IF EXISTS public.context_items_move_subtree()")
+    op.execute("DROP FUNCTION IF EXISTS public.context_items_set_path()")
+    op.execute("DROP INDEX IF EXISTS public.idx_context_items_path")
+    op.execute("ALTER TABLE public.context_items DROP COLUMN IF EXISTS depth")
+    op.execute("ALTER TABLE public.context_items DROP COLUMN IF EXISTS path")
+    op.execute("DROP FUNCTION IF EXISTS public.context_item_path_segment(INT, UUID)")
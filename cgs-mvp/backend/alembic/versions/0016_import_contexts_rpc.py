@@ -0,0 +1,118 @@
+"""Atomic bulk creation of contexts with their cards.
+
+Template import read all the user's contexts to spot a duplicate brand_name
+in Python and then inserted cards one by one (as did onboarding), so a
+failure halfway left a context with only some of its cards.
+
+- uq_contexts_user_brand: UNIQUE (user_id, brand_name) replaces the Python
+  check. Existing duplicates keep the oldest context's name; the newer ones
+  get the first free " (2)", " (3)", ... suffix.
+- import_contexts(p_user_id, p_contexts): creates every context of
+  p_contexts ([{context: {...}, cards: [...]}]) with its cards in one
+  transaction and returns [{context, cards}]. A duplicate brand_name
+  aborts the whole call with unique_violation (23505) and a readable message.
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0016"
+down_revision: Union[str, None] = "0015"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One rename at a time: a suffix may itself be taken ("Acme", "Acme", "Acme (2)")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            r RECORD;
+            k INT;
+        BEGIN
+            FOR r IN
+                SELECT id, user_id, brand_name FROM (
+                    SELECT id, user_id, brand_name,
+                           row_number() OVER (PARTITION BY user_id, brand_name ORDER BY created_at, id) AS n
+                    FROM public.contexts
+                    WHERE brand_name IS NOT NULL
+                ) ranked
+                WHERE n > 1
+                ORDER BY user_id, brand_name, n
+            LOOP
+                k := 2;
+                WHILE EXISTS (
+                    SELECT 1 FROM public.contexts
+                    WHERE user_id = r.user_id AND brand_name = r.brand_name || ' (' || k || ')'
+                ) LOOP
+                    k := k + 1;
+                END LOOP;
+                UPDATE public.contexts SET brand_name = r.brand_name || ' (' || k || ')' WHERE id = r.id;
+            END LOOP;
+        END;
+        $$
+        """
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_contexts_user_brand ON public.contexts(user_id, brand_name)"
+    )
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.import_contexts(p_user_id UUID, p_contexts JSONB)
+        RETURNS JSONB
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            entry JSONB;
+            new_context public.contexts;
+            created JSONB := '[]'::JSONB;
+        BEGIN
+            FOR entry IN SELECT value FROM jsonb_array_elements(p_contexts) LOOP
+                BEGIN
+                    INSERT INTO public.contexts (
+                        user_id, name, brand_name, website, industry, company_info,
+                        audience_info, voice_info, goals_info, research_data, status
+                    )
+                    SELECT p_user_id, c.name, c.brand_name, c.website, c.industry,
+                           COALESCE(c.company_info, '{}'), COALESCE(c.audience_info, '{}'),
+                           COALESCE(c.voice_info, '{}'), COALESCE(c.goals_info, '{}'),
+                           COALESCE(c.research_data, '{}'), COALESCE(c.status, 'active')
+                    FROM jsonb_populate_record(NULL::public.contexts, entry->'context') c
+                    RETURNING * INTO new_context;
+                EXCEPTION WHEN unique_violation THEN
+                    RAISE EXCEPTION 'Context with brand_name ''%'' already exists', entry->'context'->>'brand_name'
+                        USING ERRCODE = 'unique_violation';
+                END;
+
+                INSERT INTO public.cards (context_id, card_type, title, subtitle, content, sort_order, is_visible)
+                SELECT new_context.id, c.card_type, c.title, c.subtitle, COALESCE(c.content, '{}'),
+                       COALESCE(c.sort_order, 0), COALESCE(c.is_visible, TRUE)
+                FROM jsonb_array_elements(COALESCE(entry->'cards', '[]')) AS e(card),
+                     jsonb_populate_record(NULL::public.cards, e.card) c;
+
+                created := created || jsonb_build_object(
+                    'context', to_jsonb(new_context),
+                    'cards', COALESCE(
+                        (SELECT jsonb_agg(to_jsonb(k) ORDER BY k.sort_order)
+                         FROM public.cards k WHERE k.context_id = new_context.id),
+                        '[]'::JSONB
+                    )
+                );
+            END LOOP;
+            RETURN created;
+        END;
+        $$
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS public.import_contexts(UUID, JSONB)")
+    op.execute("DROP INDEX IF EXISTS public.uq_contexts_user_brand")
@@ -0,0 +1,32 @@
+"""Onboarding progress for background jobs.
+
+Onboarding research and context generation now run as background jobs;
+clients follow them through GET /onboarding/{id}/events, which streams the
+session's state machine. Besides `state`, the job reports:
+
+- progress: 0-100 within the current phase
+- step: what it is doing (research, questions, profile, card:<type>, saving)
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0017"
+down_revision: Union[str, None] = "0016"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE public.onboarding_sessions ADD COLUMN IF NOT EXISTS progress INT NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE public.onboarding_sessions ADD COLUMN IF NOT EXISTS step TEXT")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE public.onboarding_sessions DROP COLUMN IF EXISTS step")
+    op.execute("ALTER TABLE public.onboarding_sessions DROP COLUMN IF EXISTS progress")
@@ -0,0 +1,48 @@
+"""onboarding_research_cache: company research reused across onboarding attempts.
+
+Every onboarding start ran the same Perplexity company research, including
+restarts after a failed generation. Results are now stored per normalized
+brand name + website domain (and per user when ONBOARDING_RESEARCH_CACHE_SHARED
+is off) and reused until ONBOARDING_RESEARCH_CACHE_TTL_SECONDS.
+
+key_hash = sha256(scope + brand_key + domain); scope is '' when shared.
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0018"
+down_revision: Union[str, None] = "0017"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS public.onboarding_research_cache (
+            key_hash TEXT PRIMARY KEY,
+            scope TEXT NOT NULL DEFAULT '',
+            brand_key TEXT NOT NULL,
+            domain TEXT NOT NULL DEFAULT '',
+            research TEXT NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        )
+        """
+    )
+    # Service-role only: no RLS policies, clients never read it directly
+    op.execute("ALTER TABLE public.onboarding_research_cache ENABLE ROW LEVEL SECURITY")
+    # ResearchCache.set() prunes expired entries: DELETE ... WHERE created_at < NOW() - <ttl>
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_onboarding_research_cache_created "
+        "ON public.onboarding_research_cache(created_at)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS public.onboarding_research_cache")
@@ -1,8 +1,9 @@
 from uuid import UUID
 
-from fastapi import Header, HTTPException
+from fastapi import Header, HTTPException, Query, Response
 
 from app.config.supabase import get_supabase_admin
+from app.db.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 
 
 async def get_current_user(authorization: str | None = Header(None)) -> UUID:
@@ -23,3 +24,29 @@ async def get_current_user(authorization: str | None = Header(None)) -> UUID:
 
 def get_db():
     return get_supabase_admin()
+
+
+class PageParams:
+    """Keyset pagination query params: ?limit=N&cursor=<X-Next-Cursor of the previous page>."""
+
+    def __init__(
+        self,
+        limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def get_fields(
+    fields: str | None = Query(None, description="Comma-separated heavy columns to include, e.g. text_content"),
+) -> list[str] | None:
+    """?fields=a,b → ["a", "b"]. List endpoints return summary columns unless asked for more."""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+
+def set_next_cursor(response: Response, next_cursor: str | None) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -1,8 +1,8 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
-from app.api.deps import get_current_user
+from app.api.deps import PageParams, get_current_user, get_fields, set_next_cursor
 from app.domain.models import ArchiveSearch
 from app.services.archive_service import ArchiveService
 
@@ -11,11 +11,16 @@ router = APIRouter()
 
 @router.get("")
 async def list_archive(
+    response: Response,
     context_id: UUID | None = None,
     brief_id: UUID | None = None,
+    page: PageParams = Depends(),
+    fields: list[str] | None = Depends(get_fields),
     user_id: UUID = Depends(get_current_user),
 ):
-    return ArchiveService().list(user_id, context_id, brief_id)
+    items, next_cursor = ArchiveService().list(user_id, context_id, brief_id, page.limit, page.cursor, fields)
+    set_next_cursor(response, next_cursor)
+    return items
 
 
 @router.get("/stats")
@@ -29,5 +34,15 @@ async def archive_stats(
 
 @router.post("/search")
 async def search_archive(data: ArchiveSearch, user_id: UUID = Depends(get_current_user)):
-    """Semantic search nell'archivio usando embeddings."""
-    return await ArchiveService().semantic_search(data.query, data.context_id, data.brief_id)
+    """Semantic search nell'archivio usando embeddings.
+
+    Filtri opzionali: brief_id (brief-first, fallback sul contesto), review_status, is_reference.
+    """
+    return await ArchiveService().semantic_search(
+        data.query,
+        data.context_id,
+        data.brief_id,
+        review_status=data.review_status.value if data.review_status else None,
+        is_reference=data.is_reference,
+        limit=data.limit,
+    )
@@ -1,8 +1,8 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
-from app.api.deps import get_current_user
+from app.api.deps import PageParams, get_current_user, get_fields, set_next_cursor
 from app.domain.models import BriefCreate, BriefUpdate
 from app.services.brief_service import BriefService
 
@@ -11,11 +11,16 @@ router = APIRouter()
 
 @router.get("")
 async def list_briefs(
+    response: Response,
     context_id: UUID | None = None,
     pack_id: UUID | None = None,
+    page: PageParams = Depends(),
+    fields: list[str] | None = Depends(get_fields),
     user_id: UUID = Depends(get_current_user),
 ):
-    return BriefService().list(user_id, context_id, pack_id)
+    items, next_cursor = BriefService().list(user_id, context_id, pack_id, page.limit, page.cursor, fields)
+    set_next_cursor(response, next_cursor)
+    return items
 
 
 @router.get("/by-slug/{slug}")
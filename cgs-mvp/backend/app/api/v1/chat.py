@@ -1,25 +1,64 @@
+import json
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
+from fastapi.responses import StreamingResponse
 
 from app.api.deps import get_current_user
 from app.domain.models import ChatRequest
 from app.middleware.rate_limit import limiter
 from app.services.chat_service import ChatService
+from app.services.embedding_service import EmbeddingService
 
 router = APIRouter()
 
 
+def _embed_edited_output(background_tasks: BackgroundTasks, result: dict) -> None:
+    """An edit_output turn adds a version, which clears the archive embedding: recompute it."""
+    updated = result.get("updated_output")
+    if updated:
+        root_id = updated.get("root_output_id") or updated["id"]
+        background_tasks.add_task(EmbeddingService().embed_outputs, [UUID(root_id)])
+
+
 @router.post("/outputs/{output_id}")
 @limiter.limit("20/minute")
 async def chat_with_output(
-    request: Request, output_id: UUID, req: ChatRequest, user_id: UUID = Depends(get_current_user)
+    request: Request,
+    output_id: UUID,
+    req: ChatRequest,
+    background_tasks: BackgroundTasks,
+    user_id: UUID = Depends(get_current_user),
 ):
     service = ChatService()
     result = await service.chat(output_id, user_id, req.message)
+    _embed_edited_output(background_tasks, result)
     return result
 
 
+@router.post("/outputs/{output_id}/stream")
+@limiter.limit("20/minute")
+async def stream_chat_with_output(
+    request: Request,
+    output_id: UUID,
+    req: ChatRequest,
+    background_tasks: BackgroundTasks,
+    user_id: UUID = Depends(get_current_user),
+):
+    """SSE: "message_delta" events while the reply is generated, then "completed" (or "error")."""
+    service = ChatService()
+    turn = service.start_turn(output_id, user_id, req.message)  # 404 before the stream starts
+
+    async def event_stream():
+        async for event in service.stream_turn(turn):
+            if event["type"] == "completed":
+                # FastAPI attaches background_tasks to the response: they run once the stream ends
+                _embed_edited_output(background_tasks, event["data"])
+            yield f"data: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @router.get("/outputs/{output_id}/history")
 async def get_chat_history(output_id: UUID, user_id: UUID = Depends(get_current_user)):
     service = ChatService()
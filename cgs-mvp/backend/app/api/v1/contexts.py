@@ -1,12 +1,13 @@
+import asyncio
 import json
 from uuid import UUID
 
 import structlog
 import yaml
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
 from pydantic import ValidationError
 
-from app.api.deps import get_current_user
+from app.api.deps import PageParams, get_current_user, get_fields, set_next_cursor
 from app.domain.models import ContextCreate, ContextImport, ContextUpdate
 from app.exceptions import ConflictException, NotFoundException
 from app.services.context_service import ContextService
@@ -14,6 +15,8 @@ from app.services.context_service import ContextService
 router = APIRouter()
 logger = structlog.get_logger("cgs-mvp.contexts")
 
+MAX_BUNDLE_TEMPLATES = 50
+
 
 @router.get("")
 async def list_contexts(user_id: UUID = Depends(get_current_user)):
@@ -56,6 +59,27 @@ async def get_context_summary(context_id: UUID, user_id: UUID = Depends(get_curr
     return ContextService().get_summary(context_id, user_id)
 
 
+def _parse_templates(filename: str | None, content: bytes) -> list:
+    """Documents of a .json (one object, or an array of them) or .yaml/.yml (one or more `---` documents) file."""
+    try:
+        if filename and filename.endswith(".json"):
+            data = json.loads(content)
+            return data if isinstance(data, list) else [data]
+        if filename and filename.endswith((".yaml", ".yml")):
+            return [doc for doc in yaml.safe_load_all(content) if doc is not None]
+    except (json.JSONDecodeError, yaml.YAMLError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid file format: {str(e)}")
+    raise HTTPException(status_code=400, detail="File must be .json, .yaml, or .yml")
+
+
+def _validate_template(template_data) -> dict:
+    try:
+        return ContextImport(**template_data).model_dump()
+    except (ValidationError, TypeError) as e:
+        errors = e.errors() if isinstance(e, ValidationError) else str(e)
+        raise HTTPException(status_code=422, detail=f"Template validation failed: {errors}")
+
+
 @router.post("/import")
 async def import_context(file: UploadFile = File(...), user_id: UUID = Depends(get_current_user)):
     """
@@ -69,29 +93,14 @@ async def import_context(file: UploadFile = File(...), user_id: UUID = Depends(g
     Returns:
         Created context with cards_count
     """
-    # Read file content
-    content = await file.read()
-
-    # Parse based on file extension
-    try:
-        if file.filename.endswith(".json"):
-            template_data = json.loads(content)
-        elif file.filename.endswith((".yaml", ".yml")):
-            template_data = yaml.safe_load(content)
-        else:
-            raise HTTPException(status_code=400, detail="File must be .json, .yaml, or .yml")
-    except (json.JSONDecodeError, yaml.YAMLError) as e:
-        raise HTTPException(status_code=400, detail=f"Invalid file format: {str(e)}")
-
-    # Validate with Pydantic
-    try:
-        validated = ContextImport(**template_data)
-    except ValidationError as e:
-        raise HTTPException(status_code=422, detail=f"Template validation failed: {e.errors()}")
+    templates = _parse_templates(file.filename, await file.read())
+    if len(templates) != 1:
+        raise HTTPException(status_code=400, detail="File must contain exactly one template (use /import-bundle)")
+    validated = _validate_template(templates[0])
 
     # Import context
     try:
-        result = ContextService().import_from_template(user_id, validated.model_dump())
+        result = ContextService().import_from_template(user_id, validated)
         return {
             "context_id": result["context"]["id"],
             "brand_name": result["context"]["brand_name"],
@@ -104,6 +113,39 @@ async def import_context(file: UploadFile = File(...), user_id: UUID = Depends(g
         raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
 
 
+@router.post("/import-bundle")
+async def import_context_bundle(file: UploadFile = File(...), user_id: UUID = Depends(get_current_user)):
+    """
+    Import many contexts from one file: a JSON array of templates or a
+    multi-document YAML (`---` between templates). All or nothing.
+    """
+    templates = _parse_templates(file.filename, await file.read())
+    if not templates:
+        raise HTTPException(status_code=400, detail="File contains no templates")
+    if len(templates) > MAX_BUNDLE_TEMPLATES:
+        raise HTTPException(status_code=400, detail=f"Too many templates (max {MAX_BUNDLE_TEMPLATES})")
+    validated = [_validate_template(t) for t in templates]
+
+    try:
+        results = ContextService().import_bundle(user_id, validated)
+    except ConflictException as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error("Context bundle import failed | user=%s error=%s", user_id, str(e))
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+    return {
+        "contexts_count": len(results),
+        "contexts": [
+            {
+                "context_id": r["context"]["id"],
+                "brand_name": r["context"]["brand_name"],
+                "cards_count": r["cards_count"],
+            }
+            for r in results
+        ],
+    }
+
+
 @router.get("/{context_id}/export")
 async def export_context(context_id: UUID, user_id: UUID = Depends(get_current_user)):
     """Export context as JSON template"""
@@ -140,15 +182,28 @@ async def export_context(context_id: UUID, user_id: UUID = Depends(get_current_u
 
 
 @router.get("/{context_id}/items")
-async def get_context_items(context_id: UUID, user_id: UUID = Depends(get_current_user)):
-    """Get all context items as a flat list."""
-    return ContextService().get_context_items(context_id, user_id)
+async def get_context_items(
+    context_id: UUID,
+    response: Response,
+    page: PageParams = Depends(),
+    fields: list[str] | None = Depends(get_fields),
+    user_id: UUID = Depends(get_current_user),
+):
+    """Get context items as a flat list (?limit=N&cursor=... for keyset pages)."""
+    items, next_cursor = ContextService().get_context_items(context_id, user_id, page.limit, page.cursor, fields)
+    set_next_cursor(response, next_cursor)
+    return items
 
 
 @router.get("/{context_id}/items/tree")
-async def get_context_items_tree(context_id: UUID, user_id: UUID = Depends(get_current_user)):
-    """Get context items as a nested tree structure."""
-    return ContextService().get_context_items_tree(context_id, user_id)
+async def get_context_items_tree(
+    context_id: UUID,
+    root_id: UUID | None = Query(None, description="Return only the subtree rooted at this item"),
+    max_depth: int | None = Query(None, ge=0, description="Levels below the root(s) to include"),
+    user_id: UUID = Depends(get_current_user),
+):
+    """Get context items as a nested tree structure (?root_id= for one branch, ?max_depth=N to cut it)."""
+    return ContextService().get_context_items_tree(context_id, user_id, root_id, max_depth)
 
 
 @router.post("/{context_id}/items")
@@ -192,23 +247,10 @@ async def import_context_items_csv(
     if not file.filename or not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a .csv")
 
-    content = await file.read()
-
-    # Prova diverse codifiche
-    csv_text = None
-    for encoding in ["utf-8-sig", "utf-8", "latin-1", "cp1252"]:
-        try:
-            csv_text = content.decode(encoding)
-            break
-        except UnicodeDecodeError:
-            continue
-
-    if csv_text is None:
-        raise HTTPException(status_code=400, detail="Cannot decode CSV file. Try saving it as UTF-8.")
-
     try:
-        items = ContextService().import_context_items_from_csv(context_id, user_id, csv_text)
-        return {"items_count": len(items), "message": f"Successfully imported {len(items)} context items"}
+        # Parsing e insert sono sincroni: fuori dall'event loop
+        count = await asyncio.to_thread(ContextService().import_context_items_from_csv, context_id, user_id, file.file)
+        return {"items_count": count, "message": f"Successfully imported {count} context items"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except NotFoundException as e:
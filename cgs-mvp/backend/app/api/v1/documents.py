@@ -4,9 +4,10 @@ Document API endpoints for uploading, listing, and managing documents.
 
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, Form, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, Response, UploadFile
 
-from app.api.deps import get_current_user
+from app.api.deps import PageParams, get_current_user, get_fields, set_next_cursor
+from app.services.document_ingestion import DocumentIngestionService
 from app.services.document_service import DocumentService
 
 router = APIRouter()
@@ -18,6 +19,7 @@ router = APIRouter()
 @router.post("/contexts/{context_id}")
 async def upload_context_document(
     context_id: UUID,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     description: str | None = Form(None),
     user_id: UUID = Depends(get_current_user),
@@ -28,21 +30,37 @@ async def upload_context_document(
     - **context_id**: UUID of the context
     - **file**: File to upload (PDF, DOCX, TXT, images)
     - **description**: Optional description
+
+    Text extraction and chunk embedding run in the background (`ingestion_status`).
     """
-    return await DocumentService().upload_context_document(context_id, user_id, file, description)
+    doc = await DocumentService().upload_context_document(context_id, user_id, file, description)
+    # Text extraction + chunk embeddings (RAG) after the response
+    background_tasks.add_task(DocumentIngestionService().ingest, "context_documents", UUID(doc["id"]))
+    return doc
 
 
 @router.get("/contexts/{context_id}")
 async def list_context_documents(
     context_id: UUID,
+    response: Response,
+    include_download_url: bool = False,
+    page: PageParams = Depends(),
+    fields: list[str] | None = Depends(get_fields),
     user_id: UUID = Depends(get_current_user),
 ):
     """
-    List all documents for a context.
+    List documents for a context.
 
     - **context_id**: UUID of the context
+    - **limit** / **cursor**: optional keyset pagination (next cursor in `X-Next-Cursor`)
+    - **fields**: optional heavy columns to include (`text_content`)
+    - **include_download_url**: add a signed `download_url` to each document (batch-signed)
     """
-    return DocumentService().list_context_documents(context_id, user_id)
+    items, next_cursor = await DocumentService().list_context_documents(
+        context_id, user_id, page.limit, page.cursor, fields, include_download_url
+    )
+    set_next_cursor(response, next_cursor)
+    return items
 
 
 @router.delete("/contexts/{doc_id}")
@@ -55,7 +73,7 @@ async def delete_context_document(
 
     - **doc_id**: UUID of the document
     """
-    DocumentService().delete_context_document(doc_id, user_id)
+    await DocumentService().delete_context_document(doc_id, user_id)
     return {"deleted": True}
 
 
@@ -69,7 +87,7 @@ async def download_context_document(
 
     - **doc_id**: UUID of the document
     """
-    return DocumentService().get_document_download_url(doc_id, user_id, "context")
+    return await DocumentService().get_document_download_url(doc_id, user_id, "context")
 
 
 # ==================== BRIEF DOCUMENTS ====================
@@ -78,6 +96,7 @@ async def download_context_document(
 @router.post("/briefs/{brief_id}")
 async def upload_brief_document(
     brief_id: UUID,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     description: str | None = Form(None),
     user_id: UUID = Depends(get_current_user),
@@ -88,21 +107,37 @@ async def upload_brief_document(
     - **brief_id**: UUID of the brief
     - **file**: File to upload (PDF, DOCX, TXT, images)
     - **description**: Optional description
+
+    Text extraction and chunk embedding run in the background (`ingestion_status`).
     """
-    return await DocumentService().upload_brief_document(brief_id, user_id, file, description)
+    doc = await DocumentService().upload_brief_document(brief_id, user_id, file, description)
+    # Text extraction + chunk embeddings (RAG) after the response
+    background_tasks.add_task(DocumentIngestionService().ingest, "brief_documents", UUID(doc["id"]))
+    return doc
 
 
 @router.get("/briefs/{brief_id}")
 async def list_brief_documents(
     brief_id: UUID,
+    response: Response,
+    include_download_url: bool = False,
+    page: PageParams = Depends(),
+    fields: list[str] | None = Depends(get_fields),
     user_id: UUID = Depends(get_current_user),
 ):
     """
-    List all documents for a brief.
+    List documents for a brief.
 
     - **brief_id**: UUID of the brief
+    - **limit** / **cursor**: optional keyset pagination (next cursor in `X-Next-Cursor`)
+    - **fields**: optional heavy columns to include (`text_content`)
+    - **include_download_url**: add a signed `download_url` to each document (batch-signed)
     """
-    return DocumentService().list_brief_documents(brief_id, user_id)
+    items, next_cursor = await DocumentService().list_brief_documents(
+        brief_id, user_id, page.limit, page.cursor, fields, include_download_url
+    )
+    set_next_cursor(response, next_cursor)
+    return items
 
 
 @router.delete("/briefs/{doc_id}")
@@ -115,7 +150,7 @@ async def delete_brief_document(
 
     - **doc_id**: UUID of the document
     """
-    DocumentService().delete_brief_document(doc_id, user_id)
+    await DocumentService().delete_brief_document(doc_id, user_id)
     return {"deleted": True}
 
 
@@ -129,4 +164,4 @@ async def download_brief_document(
 
     - **doc_id**: UUID of the document
     """
-    return DocumentService().get_document_download_url(doc_id, user_id, "brief")
+    return await DocumentService().get_document_download_url(doc_id, user_id, "brief")
@@ -4,7 +4,8 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user, get_db, get_fields
+from app.db.repositories.run_repo import RunRepository
 from app.domain.models import RunCreate
 from app.middleware.rate_limit import limiter
 from app.services.workflow_service import WorkflowService
@@ -42,8 +43,15 @@ async def start_execution(
 
 
 @router.get("/{run_id}")
-async def get_run(run_id: UUID, user_id: UUID = Depends(get_current_user), db=Depends(get_db)):
-    run = db.table("workflow_runs").select("*").eq("id", str(run_id)).eq("user_id", str(user_id)).single().execute()
+async def get_run(
+    run_id: UUID,
+    fields: list[str] | None = Depends(get_fields),
+    user_id: UUID = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """Stato del run (polling). task_outputs/final_output solo con ?fields=task_outputs,final_output."""
+    columns = RunRepository(db).projection(fields)
+    run = db.table("workflow_runs").select(columns).eq("id", str(run_id)).eq("user_id", str(user_id)).single().execute()
     if not run.data:
         raise HTTPException(404, "Run not found")
     return run.data
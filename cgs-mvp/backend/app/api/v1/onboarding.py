@@ -1,8 +1,10 @@
+import json
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi.responses import StreamingResponse
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user
 from app.domain.models import OnboardingStart
 from app.services.onboarding_service import OnboardingService
 
@@ -10,25 +12,41 @@ router = APIRouter()
 
 
 @router.post("/start")
-async def start_onboarding(data: OnboardingStart, user_id: UUID = Depends(get_current_user)):
+async def start_onboarding(
+    data: OnboardingStart, background_tasks: BackgroundTasks, user_id: UUID = Depends(get_current_user)
+):
+    """Create the session and research the company in the background (follow /{session_id}/events)."""
     service = OnboardingService()
-    return await service.start(user_id, data.model_dump())
+    payload = data.model_dump()
+    result = service.start(user_id, payload)
+    background_tasks.add_task(service.run_research, UUID(result["session_id"]), user_id, payload)
+    return result
 
 
 @router.get("/{session_id}/status")
-async def get_status(session_id: UUID, user_id: UUID = Depends(get_current_user), db=Depends(get_db)):
-    session = (
-        db.table("onboarding_sessions")
-        .select("*")
-        .eq("id", str(session_id))
-        .eq("user_id", str(user_id))
-        .single()
-        .execute()
-    )
-    return session.data
+async def get_status(session_id: UUID, user_id: UUID = Depends(get_current_user)):
+    return OnboardingService().get_session(session_id, user_id)
+
+
+@router.get("/{session_id}/events")
+async def stream_onboarding(session_id: UUID, user_id: UUID = Depends(get_current_user)):
+    """SSE progress of the running phase; ends with questions_ready, completed or error."""
+    service = OnboardingService()
+    service.get_session(session_id, user_id)  # 404 before the stream starts
+
+    async def event_stream():
+        async for event in service.watch(session_id, user_id):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
 @router.post("/{session_id}/answers")
-async def submit_answers(session_id: UUID, answers: dict, user_id: UUID = Depends(get_current_user)):
+async def submit_answers(
+    session_id: UUID, answers: dict, background_tasks: BackgroundTasks, user_id: UUID = Depends(get_current_user)
+):
+    """Store the answers and generate Context + Cards in the background (follow /{session_id}/events)."""
     service = OnboardingService()
-    return await service.process_answers(session_id, user_id, answers)
+    result = service.accept_answers(session_id, user_id, answers)
+    background_tasks.add_task(service.generate_context, session_id, user_id)
+    return result
@@ -1,9 +1,11 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, Response
 
-from app.api.deps import get_current_user
+from app.api.deps import PageParams, get_current_user, get_fields, set_next_cursor
 from app.domain.models import ReviewRequest
+from app.infrastructure.storage.supabase_storage import StorageService
+from app.services.embedding_service import EmbeddingService
 from app.services.output_service import OutputService
 
 router = APIRouter()
@@ -11,10 +13,26 @@ router = APIRouter()
 
 @router.get("")
 async def list_outputs(
-    brief_id: UUID | None = None, context_id: UUID | None = None, user_id: UUID = Depends(get_current_user)
+    response: Response,
+    brief_id: UUID | None = None,
+    context_id: UUID | None = None,
+    include_latest: bool = False,
+    include_download_url: bool = False,
+    page: PageParams = Depends(),
+    fields: list[str] | None = Depends(get_fields),
+    user_id: UUID = Depends(get_current_user),
 ):
-    """Lista outputs. ?brief_id=X filtra per brief, ?context_id=X filtra per contesto."""
-    return OutputService().list(user_id, brief_id, context_id)
+    """Lista outputs. ?brief_id=X filtra per brief, ?context_id=X filtra per contesto.
+
+    ?include_latest=true aggiunge `latest_version` (ultima versione della chain) a ogni output.
+    ?include_download_url=true aggiunge `download_url` (signed URL, firmate in batch) alle righe con file.
+    Le righe sono in proiezione summary (senza text_content/metadata): ?fields=text_content per includerli.
+    """
+    items, next_cursor = await OutputService().list(
+        user_id, brief_id, context_id, include_latest, page.limit, page.cursor, fields, include_download_url
+    )
+    set_next_cursor(response, next_cursor)
+    return items
 
 
 @router.get("/summary")
@@ -30,28 +48,44 @@ async def get_output(output_id: UUID, user_id: UUID = Depends(get_current_user))
 
 @router.get("/{output_id}/latest")
 async def get_latest_version(output_id: UUID, user_id: UUID = Depends(get_current_user)):
-    """Risale la chain di versioni e restituisce l'ultima versione dell'output."""
+    """Restituisce l'ultima versione della chain di editing (lookup O(1) via root_output_id)."""
     return OutputService().get_latest(output_id, user_id)
 
 
 @router.get("/{output_id}/download")
 async def download_output(output_id: UUID, user_id: UUID = Depends(get_current_user)):
-    return OutputService().get_download_url(output_id, user_id)
+    return await OutputService().get_download_url(output_id, user_id)
 
 
 @router.patch("/{output_id}")
-async def update_output(output_id: UUID, data: dict, user_id: UUID = Depends(get_current_user)):
-    """Per marcare contenuto come visto: {"is_new": false}."""
-    return OutputService().update(output_id, user_id, data)
+async def update_output(
+    output_id: UUID, data: dict, background_tasks: BackgroundTasks, user_id: UUID = Depends(get_current_user)
+):
+    """Per marcare contenuto come visto: {"is_new": false}. Se cambia text_content, l'embedding viene rigenerato."""
+    rows = OutputService().update(output_id, user_id, data)
+    if rows and "text_content" in data:
+        root_id = rows[0].get("root_output_id") or rows[0]["id"]
+        background_tasks.add_task(EmbeddingService().embed_outputs, [UUID(root_id)])
+    return rows
 
 
 @router.delete("/{output_id}")
-async def delete_output(output_id: UUID, user_id: UUID = Depends(get_current_user)):
-    OutputService().delete(output_id, user_id)
+async def delete_output(output_id: UUID, background_tasks: BackgroundTasks, user_id: UUID = Depends(get_current_user)):
+    """Elimina output + versioni + chat + archive in un'unica transazione; i file vengono rimossi in background."""
+    file_paths = OutputService().delete(output_id, user_id)
+    if file_paths:
+        background_tasks.add_task(StorageService().delete_files, file_paths)
     return {"deleted": True}
 
 
 @router.post("/{output_id}/review")
-async def review_output(output_id: UUID, req: ReviewRequest, user_id: UUID = Depends(get_current_user)):
-    """Path unificato per review. Aggiorna sia archive.review_status sia outputs.status."""
-    return OutputService().review(output_id, user_id, req)
+async def review_output(
+    output_id: UUID, req: ReviewRequest, background_tasks: BackgroundTasks, user_id: UUID = Depends(get_current_user)
+):
+    """Path unificato per review. Aggiorna sia archive.review_status sia outputs.status.
+
+    L'embedding dell'elemento di archivio viene calcolato in background.
+    """
+    result = OutputService().review(output_id, user_id, req)
+    background_tasks.add_task(EmbeddingService().embed_outputs, [output_id])
+    return result
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from pydantic import BaseModel, Field, validator
 
 from app.api.deps import get_current_user
+from app.domain.models import ContextScope
 from app.services.pack_service import PackService
 
 router = APIRouter()
@@ -77,6 +78,8 @@ class PackImport(BaseModel):
                 raise ValueError("Each agent must have 'name'")
             if "prompt" not in agent:
                 raise ValueError("Each agent must have 'prompt'")
+            if agent.get("context_scope") is not None:
+                ContextScope.model_validate(agent["context_scope"])
         return v
 
 
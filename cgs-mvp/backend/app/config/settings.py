@@ -33,6 +33,29 @@ class Settings(BaseSettings):
     default_llm_provider: str = "openai"
     default_llm_model: str = "gpt-4o"
 
+    # Embeddings (query cache: in-process LRU + optional embedding_cache table)
+    embedding_cache_size: int = 1024
+    embedding_cache_ttl_seconds: int = 3600
+    embedding_cache_persistent: bool = False
+    embedding_cache_persistent_ttl_seconds: int = 90 * 24 * 3600
+
+    # In-process vector index in front of pgvector (needs numpy; hnswlib optional)
+    vector_index_mode: str = "off"  # off | hot | always
+    vector_index_hot_after: int = 3
+    vector_index_max_contexts: int = 8
+    vector_index_max_vectors: int = 10_000
+    vector_index_ttl_seconds: int = 300
+
+    # RAG: uploaded document chunks injected into each run
+    rag_top_k: int = 5
+
+    # Context items trees cached in-process per (context, items_version)
+    context_tree_cache_size: int = 256
+
+    # Onboarding: company research reused per (brand, website domain); TTL 0 = off
+    onboarding_research_cache_ttl_seconds: int = 7 * 24 * 3600
+    onboarding_research_cache_shared: bool = True  # across users (public company info)
+
     # Tools
     perplexity_api_key: str = ""
     serper_api_key: str = ""
@@ -50,6 +73,10 @@ class Settings(BaseSettings):
     preview_bucket: str = "previews"
     document_bucket: str = "documents"
     max_upload_size_mb: int = 50
+    storage_backend: str = "supabase"  # supabase | local (filesystem, for tests/dev)
+    storage_local_root: str = "./local_storage"
+    storage_max_concurrency: int = 8
+    signed_url_cache_size: int = 4096
 
     @property
     def cors_origins_list(self) -> list[str]:
@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination for PostgREST queries.
+
+List endpoints accept `limit` + `cursor` and return the cursor of the next
+page in the `X-Next-Cursor` response header. A cursor is an opaque,
+URL-safe token encoding the sort key of the last row of the previous page,
+so every page is a single indexed range scan regardless of depth
+(unlike OFFSET).
+
+Without `limit` and `cursor` the full ordered list is returned, which keeps
+existing clients working unchanged.
+"""
+
+import base64
+import json
+from collections.abc import Sequence
+
+from app.exceptions import ValidationException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# (column, descending) pairs; the last column must be unique and NOT NULL (usually "id").
+# Other columns may be nullable: NULLs sort as in Postgres (last ASC, first DESC).
+Order = Sequence[tuple[str, bool]]
+
+CREATED_DESC: Order = (("created_at", True), ("id", True))
+
+
+def encode_cursor(row: dict, order: Order) -> str:
+    values = [row[col] for col, _ in order]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: Order) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValidationException("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(order) or values[-1] is None:
+        raise ValidationException("Invalid cursor")
+    return values
+
+
+def _equal(col: str, value) -> str:
+    return f"{col}.is.null" if value is None else f'{col}.eq."{value}"'
+
+
+def _after(col: str, desc: bool, value, nullable: bool) -> str | None:
+    """Condition for `col` strictly after `value`; None when nothing sorts after it."""
+    if value is None:
+        # NULLS LAST in ASC (nothing after), NULLS FIRST in DESC (every non-null)
+        return f"{col}.not.is.null" if desc else None
+    if desc or not nullable:
+        return f'{col}.{"lt" if desc else "gt"}."{value}"'
+    return f'or({col}.gt."{value}",{col}.is.null)'
+
+
+def _keyset_filter(order: Order, values: list) -> str:
+    """PostgREST `or` filter selecting rows strictly after `values` in `order`.
+
+    (a, b, id) DESC → a.lt.A, and(a.eq.A, b.lt.B), and(a.eq.A, b.eq.B, id.lt.ID)
+    """
+    clauses = []
+    for i, (col, desc) in enumerate(order):
+        after = _after(col, desc, values[i], nullable=i < len(order) - 1)
+        if after is None:
+            continue
+        parts = [_equal(c, v) for (c, _), v in zip(order[:i], values[:i], strict=True)]
+        parts.append(after)
+        clauses.append(parts[0] if len(parts) == 1 else f"and({','.join(parts)})")
+    return ",".join(clauses)
+
+
+def paginate(query, order: Order, limit: int | None = None, cursor: str | None = None) -> tuple[list, str | None]:
+    """Apply ORDER BY + keyset filter to a select query and execute it.
+
+    Returns (rows, next_cursor). next_cursor is None on the last page and
+    when pagination is not requested (limit and cursor both None).
+    """
+    if cursor:
+        query = query.or_(_keyset_filter(order, decode_cursor(cursor, order)))
+    for col, desc in order:
+        query = query.order(col, desc=desc)
+
+    if limit is None and cursor is None:
+        return query.execute().data, None
+
+    limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).execute().data
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1], order)
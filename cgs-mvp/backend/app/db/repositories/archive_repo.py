@@ -1,4 +1,3 @@
-from typing import Callable
 from uuid import UUID
 
 import structlog
@@ -9,84 +8,125 @@ logger = structlog.get_logger("cgs-mvp.archive_repo")
 
 
 class ArchiveRepository(BaseRepository):
+    # Never ship the 1536-dim embedding to clients
+    summary_columns = (
+        "id",
+        "output_id",
+        "run_id",
+        "context_id",
+        "brief_id",
+        "user_id",
+        "topic",
+        "content_type",
+        "review_status",
+        "reviewed_at",
+        "feedback",
+        "feedback_categories",
+        "is_reference",
+        "reference_notes",
+        "created_at",
+        "updated_at",
+    )
+
     def __init__(self, db):
         super().__init__(db, "archive")
 
-    # ── Private helper: brief-first, context fallback ──
-
-    @staticmethod
-    def _brief_first_fallback(
-        narrow_fn: Callable[[], list],
-        wide_fn: Callable[[], list],
-        brief_id: UUID | None,
-    ) -> tuple[list, bool]:
-        """Try brief-scoped query first; fall back to context-scoped if empty.
-
-        Returns (results, is_brief_scoped).
-        """
-        if brief_id is None:
-            return wide_fn(), False
-
-        results = narrow_fn()
-        if results:
-            return results, True
-
-        # Fallback to context-level
-        logger.info(
-            "brief_fallback | brief_id=%s returned 0 results, falling back to context",
-            brief_id,
-        )
-        return wide_fn(), False
-
     # ── Public methods ──
 
-    def get_references(
+    def get_feedback_examples(
         self,
         context_id: UUID,
         brief_id: UUID | None = None,
         limit: int = 5,
-    ) -> list:
-        def _query(bid: UUID | None = None):
-            q = (
-                self.db.table("archive")
-                .select("*, outputs(text_content)")
-                .eq("context_id", str(context_id))
-                .eq("is_reference", True)
-            )
-            if bid is not None:
-                q = q.eq("brief_id", str(bid))
-            return q.order("created_at", desc=True).limit(limit).execute().data
-
-        results, scoped = self._brief_first_fallback(
-            narrow_fn=lambda: _query(brief_id),
-            wide_fn=lambda: _query(None),
-            brief_id=brief_id,
+        excerpt_chars: int = 300,
+        query_embedding: list | None = None,
+    ) -> tuple[list, list]:
+        """References and guardrails (rejected items) in one RPC.
+
+        Brief-first with context fallback is applied per set in SQL; each row
+        carries `excerpt` (output text truncated to excerpt_chars) and
+        `brief_scoped`. With query_embedding, each set is ranked by similarity
+        to it instead of recency. Returns (references, guardrails).
+        """
+        params = {
+            "p_context_id": str(context_id),
+            "p_limit": limit,
+            "p_excerpt_chars": excerpt_chars,
+        }
+        if brief_id is not None:
+            params["p_brief_id"] = str(brief_id)
+        if query_embedding is not None:
+            params["p_query_embedding"] = query_embedding
+        rows = self.db.rpc("get_feedback_examples", params).execute().data
+
+        references = [r for r in rows if r["kind"] == "reference"]
+        guardrails = [r for r in rows if r["kind"] == "guardrail"]
+        if brief_id is not None:
+            for kind, items in (("references", references), ("guardrails", guardrails)):
+                if items and not items[0]["brief_scoped"]:
+                    logger.info(
+                        "brief_fallback | brief_id=%s returned 0 %s, falling back to context",
+                        brief_id,
+                        kind,
+                    )
+        return references, guardrails
+
+    # ── Embedding pipeline ──
+
+    _EMBEDDING_COLUMNS = "id, output_id, context_id, topic, review_status, embedding_hash, embedding_model"
+
+    def list_for_embedding(self, output_ids: list[UUID]) -> list:
+        if not output_ids:
+            return []
+        return (
+            self.db.table("archive")
+            .select(self._EMBEDDING_COLUMNS)
+            .in_("output_id", [str(o) for o in output_ids])
+            .neq("review_status", "pending")
+            .execute()
+            .data
         )
-        return results
 
-    def get_guardrails(
-        self,
-        context_id: UUID,
-        brief_id: UUID | None = None,
-        limit: int = 5,
-    ) -> list:
-        def _query(bid: UUID | None = None):
+    def list_pending_embeddings(self, model: str, after_id: str | None = None, limit: int = 100) -> list:
+        """Reviewed rows never embedded, invalidated by an edit, or embedded with another model."""
+        q = (
+            self.db.table("archive")
+            .select(self._EMBEDDING_COLUMNS)
+            .neq("review_status", "pending")
+            .or_(f"embedding_hash.is.null,embedding_model.is.null,embedding_model.neq.{model}")
+        )
+        if after_id:
+            q = q.gt("id", after_id)
+        return q.order("id").limit(limit).execute().data
+
+    def set_embeddings(self, items: list[dict]) -> int:
+        """Bulk write [{id, embedding, hash, model}] in one RPC."""
+        if not items:
+            return 0
+        return self.db.rpc("set_archive_embeddings", {"p_items": items}).execute().data or 0
+
+    _INDEX_COLUMNS = "id, output_id, brief_id, topic, content_type, review_status, is_reference, feedback, embedding"
+    _INDEX_PAGE_SIZE = 1000  # PostgREST max rows per request
+
+    def list_embedded(self, context_id: UUID, max_rows: int) -> list:
+        """Every embedded row of a context (for the in-process index), paged by id. At most max_rows + 1 rows."""
+        rows: list = []
+        after_id = None
+        while len(rows) <= max_rows:
             q = (
                 self.db.table("archive")
-                .select("*, outputs(text_content)")
+                .select(self._INDEX_COLUMNS)
                 .eq("context_id", str(context_id))
-                .eq("review_status", "rejected")
+                .not_.is_("embedding", "null")
             )
-            if bid is not None:
-                q = q.eq("brief_id", str(bid))
-            return q.order("created_at", desc=True).limit(limit).execute().data
-
-        results, scoped = self._brief_first_fallback(
-            narrow_fn=lambda: _query(brief_id),
-            wide_fn=lambda: _query(None),
-            brief_id=brief_id,
-        )
-        return results
+            if after_id:
+                q = q.gt("id", after_id)
+            page = q.order("id").limit(self._INDEX_PAGE_SIZE).execute().data
+            rows.extend(page)
+            if len(page) < self._INDEX_PAGE_SIZE:
+                break
+            after_id = page[-1]["id"]
+        return rows[: max_rows + 1]
 
     def semantic_search(
         self,
@@ -94,20 +134,29 @@ class ArchiveRepository(BaseRepository):
         context_id: UUID,
         brief_id: UUID | None = None,
         limit: int = 5,
+        review_status: str | None = None,
+        is_reference: bool | None = None,
+        ef_search: int | None = None,
     ) -> list:
-        def _rpc(bid: UUID | None = None):
-            params = {
-                "query_embedding": embedding,
-                "match_context_id": str(context_id),
-                "match_count": limit,
-            }
-            if bid is not None:
-                params["match_brief_id"] = str(bid)
-            return self.db.rpc("search_archive_by_embedding", params).execute().data
-
-        results, scoped = self._brief_first_fallback(
-            narrow_fn=lambda: _rpc(brief_id),
-            wide_fn=lambda: _rpc(None),
-            brief_id=brief_id,
-        )
+        """HNSW search (match_archive): brief-first with context fallback in one RPC."""
+        params = {
+            "query_embedding": embedding,
+            "match_context_id": str(context_id),
+            "match_count": limit,
+        }
+        if brief_id is not None:
+            params["match_brief_id"] = str(brief_id)
+        if review_status is not None:
+            params["match_review_status"] = review_status
+        if is_reference is not None:
+            params["match_is_reference"] = is_reference
+        if ef_search is not None:
+            params["ef_search"] = ef_search
+        results = self.db.rpc("match_archive", params).execute().data
+
+        if brief_id is not None and results and not results[0]["brief_scoped"]:
+            logger.info(
+                "brief_fallback | brief_id=%s returned 0 results, falling back to context",
+                brief_id,
+            )
         return results
@@ -2,12 +2,33 @@ from uuid import UUID
 
 from supabase import Client
 
+from app.exceptions import ValidationException
+
 
 class BaseRepository:
+    # Columns returned by list endpoints ("*" = no projection). Heavy columns
+    # (full text, embeddings, JSONB blobs) stay out of list payloads.
+    summary_columns: tuple[str, ...] = ("*",)
+    # Heavy columns a client may add back with ?fields=a,b
+    optional_columns: tuple[str, ...] = ()
+
     def __init__(self, db: Client, table_name: str):
         self.db = db
         self.table = table_name
 
+    def projection(self, fields: list[str] | None = None) -> str:
+        """Select string for list queries: summary columns + requested optional ones."""
+        if self.summary_columns == ("*",):
+            return "*"
+        extra = [f for f in dict.fromkeys(fields or []) if f not in self.summary_columns]
+        invalid = [f for f in extra if f not in self.optional_columns]
+        if invalid:
+            raise ValidationException(
+                f"Unknown field(s): {', '.join(invalid)}. "
+                f"Available: {', '.join(self.summary_columns + self.optional_columns)}"
+            )
+        return ",".join(self.summary_columns + tuple(extra))
+
     def get_by_id(self, id: UUID):
         res = self.db.table(self.table).select("*").eq("id", str(id)).single().execute()
         return res.data
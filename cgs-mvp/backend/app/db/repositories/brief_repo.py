@@ -4,6 +4,21 @@ from .base import BaseRepository
 
 
 class BriefRepository(BaseRepository):
+    summary_columns = (
+        "id",
+        "context_id",
+        "pack_id",
+        "user_id",
+        "name",
+        "description",
+        "slug",
+        "settings",
+        "status",
+        "created_at",
+        "updated_at",
+    )
+    optional_columns = ("questions", "answers", "compiled_brief")
+
     def __init__(self, db):
         super().__init__(db, "briefs")
 
@@ -1,48 +1,79 @@
 """
 Repository per context_items — dati gerarchici del contesto.
 Ogni item rappresenta un nodo nell'albero (Level 0 → Level 3).
+
+`path` (materialized path, mantenuto da trigger) ordina i nodi in profondità
+e rende sottoalberi e tagli per profondità singole query sull'indice
+(context_id, path); `depth` parte da 0 sulle radici.
 """
 
 from uuid import UUID
 
+from app.db.pagination import paginate
 from app.db.repositories.base import BaseRepository
 
 
 class ContextItemRepository(BaseRepository):
+    summary_columns = (
+        "id",
+        "context_id",
+        "parent_id",
+        "level",
+        "depth",
+        "path",
+        "name",
+        "sort_order",
+        "created_at",
+        "updated_at",
+    )
+    optional_columns = ("content",)
+
     def __init__(self, db):
         super().__init__(db, "context_items")
 
-    def list_by_context(self, context_id: UUID) -> list:
-        """Tutti gli items di un contesto, ordinati per livello e sort_order."""
-        return (
+    def list_by_context(self, context_id: UUID, max_depth: int | None = None) -> list:
+        """Tutti gli items di un contesto in ordine di albero (path), fino a max_depth se indicato."""
+        query = self.db.table("context_items").select("*").eq("context_id", str(context_id))
+        if max_depth is not None:
+            query = query.lte("depth", max_depth)
+        return query.order("path").execute().data
+
+    def get_node(self, context_id: UUID, item_id: UUID) -> dict | None:
+        """Posizione di un nodo nell'albero (id, path, depth), None se non è di questo contesto."""
+        rows = (
             self.db.table("context_items")
-            .select("*")
+            .select("id, path, depth")
             .eq("context_id", str(context_id))
-            .order("level")
-            .order("sort_order")
+            .eq("id", str(item_id))
             .execute()
-        ).data
-
-    def get_tree(self, context_id: UUID) -> list:
-        """Restituisce gli items come albero annidato (lista di root con children)."""
-        items = self.list_by_context(context_id)
-
-        # Costruisci lookup per id
-        by_id = {}
-        for item in items:
-            by_id[item["id"]] = {**item, "children": []}
+            .data
+        )
+        return rows[0] if rows else None
 
-        # Collega figli ai genitori
-        roots = []
-        for item in items:
-            node = by_id[item["id"]]
-            parent_id = item.get("parent_id")
-            if parent_id and parent_id in by_id:
-                by_id[parent_id]["children"].append(node)
-            else:
-                roots.append(node)
+    def list_subtree(self, context_id: UUID, path: str, max_depth: int | None = None) -> list:
+        """Il nodo con quel path e i suoi discendenti, in ordine di albero."""
+        # In collation "C" i discendenti sono path + "/..." e "/" precede "0"
+        query = (
+            self.db.table("context_items")
+            .select("*")
+            .eq("context_id", str(context_id))
+            .gte("path", path)
+            .lt("path", path + "0")
+        )
+        if max_depth is not None:
+            query = query.lte("depth", max_depth)
+        return query.order("path").execute().data
 
-        return roots
+    def page_by_context(
+        self,
+        context_id: UUID,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list, str | None]:
+        """Come list_by_context, con proiezione summary e paginazione keyset su (level, sort_order, id)."""
+        query = self.db.table("context_items").select(self.projection(fields)).eq("context_id", str(context_id))
+        return paginate(query, (("level", False), ("sort_order", False), ("id", False)), limit, cursor)
 
     def delete_by_context(self, context_id: UUID) -> None:
         """Cancella TUTTI gli items di un contesto (per re-import)."""
@@ -52,3 +83,16 @@ class ContextItemRepository(BaseRepository):
         """Conta gli items di un contesto."""
         result = self.db.table("context_items").select("id", count="exact").eq("context_id", str(context_id)).execute()
         return result.count if result.count else 0
+
+    def stage_import(self, import_id: UUID, rows: list[dict]) -> None:
+        """Scrive un batch di nodi nella staging table di un import CSV."""
+        self.db.table("context_item_imports").insert([{**row, "import_id": str(import_id)} for row in rows]).execute()
+
+    def commit_import(self, context_id: UUID, import_id: UUID) -> int:
+        """Sostituisce atomicamente gli items del contesto con quelli in staging; ritorna quanti ne ha inseriti."""
+        params = {"p_context_id": str(context_id), "p_import_id": str(import_id)}
+        return self.db.rpc("commit_context_items_import", params).execute().data or 0
+
+    def discard_import(self, import_id: UUID) -> None:
+        """Rimuove le righe in staging di un import fallito."""
+        self.db.table("context_item_imports").delete().eq("import_id", str(import_id)).execute()
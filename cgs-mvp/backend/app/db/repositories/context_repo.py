@@ -1,12 +1,43 @@
 from uuid import UUID
 
+from postgrest.exceptions import APIError
+
+from app.exceptions import ConflictException
+
 from .base import BaseRepository
 
+UNIQUE_VIOLATION = "23505"
+
 
 class ContextRepository(BaseRepository):
     def __init__(self, db):
         super().__init__(db, "contexts")
 
+    def create(self, data: dict):
+        try:
+            return super().create(data)
+        except APIError as e:
+            _raise_if_duplicate_brand(e)
+            raise
+
+    def update(self, id: UUID, data: dict):
+        try:
+            return super().update(id, data)
+        except APIError as e:
+            _raise_if_duplicate_brand(e)
+            raise
+
+    def brand_name_exists(self, user_id: UUID, brand_name: str) -> bool:
+        res = (
+            self.db.table(self.table)
+            .select("id")
+            .eq("user_id", str(user_id))
+            .eq("brand_name", brand_name)
+            .limit(1)
+            .execute()
+        )
+        return bool(res.data)
+
     def get_with_cards(self, id: UUID):
         context = self.get_by_id(id)
         if not context:
@@ -14,3 +45,21 @@ class ContextRepository(BaseRepository):
         cards = self.db.table("cards").select("*").eq("context_id", str(id)).order("sort_order").execute()
         context["cards"] = cards.data
         return context
+
+    def create_with_cards(self, user_id: UUID, entries: list[dict]) -> list[dict]:
+        """Crea in un'unica transazione ogni contesto di `entries` ([{context, cards}]) con le sue cards.
+
+        Un brand_name già usato dall'utente annulla tutto (ConflictException).
+        """
+        params = {"p_user_id": str(user_id), "p_contexts": entries}
+        try:
+            return self.db.rpc("import_contexts", params).execute().data
+        except APIError as e:
+            _raise_if_duplicate_brand(e)
+            raise
+
+
+def _raise_if_duplicate_brand(e: APIError) -> None:
+    """uq_contexts_user_brand violated → ConflictException (409) instead of a generic 500."""
+    if e.code == UNIQUE_VIOLATION:
+        raise ConflictException(e.message or "A context with this brand name already exists")
@@ -0,0 +1,88 @@
+from datetime import UTC, datetime, timedelta
+from uuid import UUID
+
+from app.db.pagination import paginate
+
+from .base import BaseRepository
+
+# Tabelle documento che referenziano un blob via (user_id, content_hash)
+DOCUMENT_TABLES = ("context_documents", "brief_documents")
+
+
+class DocumentBlobRepository(BaseRepository):
+    """Content-addressed document files (document_blobs, keyed by user_id + sha256)."""
+
+    def __init__(self, db):
+        super().__init__(db, "document_blobs")
+
+    def _key(self, query, user_id: UUID | str, sha256: str):
+        return query.eq("user_id", str(user_id)).eq("sha256", sha256)
+
+    def get(self, user_id: UUID | str, sha256: str) -> dict | None:
+        res = self._key(self.db.table(self.table).select("*"), user_id, sha256).limit(1).execute()
+        return res.data[0] if res.data else None
+
+    def acquire(
+        self, user_id: UUID | str, sha256: str, storage_path: str, size_bytes: int, mime_type: str | None
+    ) -> tuple[str, bool]:
+        """Register (or touch) a user's blob. Returns (stored path, True if these bytes are new)."""
+        row = (
+            self.db.rpc(
+                "acquire_document_blob",
+                {
+                    "p_user_id": str(user_id),
+                    "p_sha256": sha256,
+                    "p_storage_path": storage_path,
+                    "p_size_bytes": size_bytes,
+                    "p_mime_type": mime_type,
+                },
+            )
+            .execute()
+            .data[0]
+        )
+        return row["storage_path"], row["created"]
+
+    def claim_ingestion(self, user_id: UUID | str, sha256: str, stale_after_seconds: int) -> bool:
+        """Take the blob's ingestion unless it is done or another worker is on it (stale claims expire)."""
+        now = datetime.now(UTC)
+        stale_before = (now - timedelta(seconds=stale_after_seconds)).isoformat()
+        query = self.db.table(self.table).update(
+            {"ingestion_status": "processing", "ingestion_started_at": now.isoformat()}
+        )
+        res = (
+            self._key(query, user_id, sha256)
+            .or_(f'ingestion_status.in.(pending,failed),ingestion_started_at.lt."{stale_before}"')
+            .neq("ingestion_status", "ready")
+            .neq("ingestion_status", "skipped")
+            .execute()
+        )
+        return bool(res.data)
+
+    def set_ingestion(self, user_id: UUID | str, sha256: str, data: dict) -> None:
+        self._key(self.db.table(self.table).update(data), user_id, sha256).execute()
+
+    def list_pending(self, limit: int = 100, cursor: str | None = None) -> tuple[list, str | None]:
+        """Blobs waiting for (or failed) ingestion, keyset-paginated on the primary key."""
+        query = self.db.table(self.table).select("user_id, sha256").in_("ingestion_status", ["pending", "failed"])
+        return paginate(query, (("user_id", False), ("sha256", False)), limit, cursor)
+
+    def release(self, user_id: UUID | str, sha256: str, grace_seconds: int = 600) -> list[str]:
+        """Delete the blob if no document references it any more (chunks cascade); returns its storage path.
+
+        Same grace as release_unreferenced: a blob acquire() touched in the last
+        `grace_seconds` belongs to an upload of the same file whose document row
+        is not inserted yet, and is left to the sweep.
+        """
+        cutoff = (datetime.now(UTC) - timedelta(seconds=grace_seconds)).isoformat()
+        query = self.db.table(self.table).delete().eq("ref_count", 0).lt("last_used_at", cutoff)
+        return [row["storage_path"] for row in self._key(query, user_id, sha256).execute().data]
+
+    def release_unreferenced(self, grace_seconds: int = 600) -> list[str]:
+        """Delete every blob no document references any more; returns their storage paths.
+
+        Blobs touched in the last `grace_seconds` are kept: an upload may be
+        between acquire() and the insert of its document row.
+        """
+        cutoff = (datetime.now(UTC) - timedelta(seconds=grace_seconds)).isoformat()
+        query = self.db.table(self.table).delete().eq("ref_count", 0).lt("last_used_at", cutoff)
+        return [row["storage_path"] for row in query.execute().data]
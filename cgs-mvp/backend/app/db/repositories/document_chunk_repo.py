@@ -0,0 +1,59 @@
+from uuid import UUID
+
+from .base import BaseRepository
+
+INSERT_BATCH_SIZE = 500
+
+# Colonna di document_chunks con il documento proprietario (chunk di 0012, non ancora su un blob)
+_DOCUMENT_COLUMNS = {"context_documents": "context_document_id", "brief_documents": "brief_document_id"}
+
+
+class DocumentChunkRepository(BaseRepository):
+    def __init__(self, db):
+        super().__init__(db, "document_chunks")
+
+    def replace_for_blob(self, user_id: UUID | str, content_hash: str, chunks: list[dict]) -> int:
+        """Drop the blob's previous chunks and bulk-insert the new ones."""
+        self.db.table("document_chunks").delete().eq("user_id", str(user_id)).eq("content_hash", content_hash).execute()
+        rows = [{**chunk, "user_id": str(user_id), "content_hash": content_hash} for chunk in chunks]
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            self.db.table("document_chunks").insert(rows[start : start + INSERT_BATCH_SIZE]).execute()
+        return len(rows)
+
+    def adopt_document_chunks(self, document_table: str, document_id: UUID | str, content_hash: str) -> None:
+        """Move a document's per-document chunks to its (new) blob instead of embedding them again."""
+        (
+            self.db.table("document_chunks")
+            .update(
+                {
+                    "content_hash": content_hash,
+                    "context_document_id": None,
+                    "brief_document_id": None,
+                    "context_id": None,
+                    "brief_id": None,
+                }
+            )
+            .eq(_DOCUMENT_COLUMNS[document_table], str(document_id))
+            .execute()
+        )
+
+    def delete_for_document(self, document_table: str, document_id: UUID | str) -> None:
+        """Drop a document's per-document chunks (superseded by its blob's)."""
+        self.db.table("document_chunks").delete().eq(_DOCUMENT_COLUMNS[document_table], str(document_id)).execute()
+
+    def match(
+        self,
+        embedding: list,
+        context_id: UUID,
+        brief_id: UUID | None = None,
+        limit: int = 5,
+    ) -> list:
+        """Top-k chunks of the context's documents + the brief's documents."""
+        params = {
+            "query_embedding": embedding,
+            "match_context_id": str(context_id),
+            "match_count": limit,
+        }
+        if brief_id is not None:
+            params["match_brief_id"] = str(brief_id)
+        return self.db.rpc("match_document_chunks", params).execute().data
@@ -6,40 +6,65 @@ Simple CRUD operations following the existing repository pattern.
 from typing import Any
 from uuid import UUID
 
+from app.db.pagination import CREATED_DESC, paginate
+
 from .base import BaseRepository
 
+_DOCUMENT_SUMMARY_COLUMNS = (
+    "id",
+    "user_id",
+    "file_name",
+    "file_path",
+    "file_size_bytes",
+    "mime_type",
+    "content_hash",
+    "description",
+    "metadata",
+    "ingestion_status",
+    "ingestion_error",
+    "chunk_count",
+    "created_at",
+    "updated_at",
+)
+
 
 class ContextDocumentRepository(BaseRepository):
     """Repository for context documents."""
 
+    summary_columns = ("context_id", *_DOCUMENT_SUMMARY_COLUMNS)
+    optional_columns = ("text_content",)
+
     def __init__(self, db):
         super().__init__(db, "context_documents")
 
-    def list_by_context(self, context_id: UUID) -> list[dict[str, Any]]:
-        """Get all documents for a specific context."""
-        return (
-            self.db.table(self.table)
-            .select("*")
-            .eq("context_id", str(context_id))
-            .order("created_at", desc=True)
-            .execute()
-            .data
-        )
+    def list_by_context(
+        self,
+        context_id: UUID,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """Get documents for a specific context, newest first (keyset-paginated)."""
+        query = self.db.table(self.table).select(self.projection(fields)).eq("context_id", str(context_id))
+        return paginate(query, CREATED_DESC, limit, cursor)
 
 
 class BriefDocumentRepository(BaseRepository):
     """Repository for brief documents."""
 
+    summary_columns = ("brief_id", *_DOCUMENT_SUMMARY_COLUMNS)
+    optional_columns = ("text_content",)
+
     def __init__(self, db):
         super().__init__(db, "brief_documents")
 
-    def list_by_brief(self, brief_id: UUID) -> list[dict[str, Any]]:
-        """Get all documents for a specific brief."""
-        return (
-            self.db.table(self.table)
-            .select("*")
-            .eq("brief_id", str(brief_id))
-            .order("created_at", desc=True)
-            .execute()
-            .data
-        )
+    def list_by_brief(
+        self,
+        brief_id: UUID,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """Get documents for a specific brief, newest first (keyset-paginated)."""
+        query = self.db.table(self.table).select(self.projection(fields)).eq("brief_id", str(brief_id))
+        return paginate(query, CREATED_DESC, limit, cursor)
@@ -4,6 +4,29 @@ from .base import BaseRepository
 
 
 class OutputRepository(BaseRepository):
+    summary_columns = (
+        "id",
+        "run_id",
+        "brief_id",
+        "user_id",
+        "output_type",
+        "mime_type",
+        "file_path",
+        "file_size_bytes",
+        "preview_path",
+        "title",
+        "version",
+        "parent_output_id",
+        "root_output_id",
+        "latest_version_id",
+        "status",
+        "is_new",
+        "number",
+        "author",
+        "created_at",
+    )
+    optional_columns = ("text_content", "metadata")
+
     def __init__(self, db):
         super().__init__(db, "outputs")
 
@@ -21,34 +44,28 @@ class OutputRepository(BaseRepository):
         )
 
     def get_latest_version(self, output_id: UUID):
-        """Traverse the chain to the latest version."""
-        current = self.get_by_id(output_id)
-        if not current:
-            return None
-        while True:
-            child = (
-                self.db.table(self.table)
-                .select("*")
-                .eq("parent_output_id", str(current["id"]))
-                .order("version", desc=True)
-                .limit(1)
-                .execute()
-                .data
-            )
-            if not child:
-                return current
-            current = child[0]
-
-    def get_next_number(self, brief_id: UUID) -> int:
-        """Next sequential number for a brief."""
-        res = (
-            self.db.table(self.table)
-            .select("number")
-            .eq("brief_id", str(brief_id))
-            .is_("parent_output_id", "null")
-            .order("number", desc=True)
-            .limit(1)
+        """Latest version of the edit chain `output_id` belongs to (one RPC round trip).
+
+        Resolved through the root's `latest_version_id` pointer, maintained by
+        a trigger on insert (migration 0002).
+        """
+        res = self.db.rpc("get_latest_output_version", {"p_output_id": str(output_id)}).execute().data
+        return res[0] if res else None
+
+    def get_latest_versions(self, output_ids: list[UUID]) -> dict[str, dict]:
+        """Bulk variant for list views: {root_output_id: latest version}."""
+        if not output_ids:
+            return {}
+        res = self.db.rpc("get_latest_output_versions", {"p_output_ids": [str(i) for i in output_ids]}).execute().data
+        return {row.get("root_output_id") or row["id"]: row for row in res}
+
+    def delete_cascade(self, output_id: UUID, user_id: UUID) -> list[dict]:
+        """Delete an output tree + chat messages + archive rows in one transaction.
+
+        Returns [{deleted_id, storage_path, context_id}]; empty if the output is not owned by the user.
+        """
+        return (
+            self.db.rpc("delete_output_cascade", {"p_output_id": str(output_id), "p_user_id": str(user_id)})
             .execute()
             .data
         )
-        return (res[0]["number"] + 1) if res and res[0].get("number") else 1
@@ -2,5 +2,25 @@ from .base import BaseRepository
 
 
 class RunRepository(BaseRepository):
+    # Status polling doesn't need the agents' full outputs
+    summary_columns = (
+        "id",
+        "brief_id",
+        "user_id",
+        "topic",
+        "input_data",
+        "status",
+        "progress",
+        "current_step",
+        "total_tokens",
+        "total_cost_usd",
+        "duration_seconds",
+        "started_at",
+        "completed_at",
+        "created_at",
+        "error_message",
+    )
+    optional_columns = ("task_outputs", "final_output")
+
     def __init__(self, db):
         super().__init__(db, "workflow_runs")
@@ -1,8 +1,8 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 from uuid import UUID
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, validator
 
 from app.domain.enums import (
     BriefStatus,
@@ -113,6 +113,25 @@ class AgentOverride(BaseModel):
     temperature: float | None = None
 
 
+class ContextScope(BaseModel):
+    """Slice of the execution context an agent receives (pack.agents_config[].context_scope).
+
+    Each omitted field means "everything", an empty list means "nothing":
+    cards: card types to include
+    items: context-item subtrees by name path, e.g. "Products/Line A"
+    brief: brief sections to include
+
+    Unknown keys and card types are rejected, so a typo fails at pack import
+    instead of silently widening or emptying the agent's context.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    cards: list[CardType] | None = None
+    items: list[str] | None = None
+    brief: list[Literal["answers", "compiled_brief"]] | None = None
+
+
 class BriefSettings(BaseModel):
     """Structure for the briefs.settings JSONB column.
 
@@ -235,6 +254,8 @@ class Output(BaseModel):
     metadata: dict = {}
     version: int = 1
     parent_output_id: UUID | None = None
+    root_output_id: UUID | None = None
+    latest_version_id: UUID | None = None
     # Design Lab fields
     status: OutputStatus = OutputStatus.PENDING_REVIEW
     is_new: bool = True
@@ -275,6 +296,9 @@ class ArchiveSearch(BaseModel):
     query: str
     context_id: UUID
     brief_id: UUID | None = None
+    review_status: ReviewStatus | None = None
+    is_reference: bool | None = None
+    limit: int = Field(5, ge=1, le=50)
 
 
 # ─── Chat ────────────────────────────────────────────
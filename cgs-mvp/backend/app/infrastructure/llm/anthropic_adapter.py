@@ -10,23 +10,29 @@ PRICING = {
 }
 
 
+def _split_system(messages: list[dict]) -> tuple[str, list[dict]]:
+    """Anthropic takes the system prompt apart from the chat messages."""
+    system_msg = None
+    chat_msgs = []
+    for m in messages:
+        if m["role"] == "system":
+            system_msg = m["content"]
+        else:
+            chat_msgs.append(m)
+    return system_msg or "", chat_msgs
+
+
 class AnthropicAdapter(LLMAdapter):
     def __init__(self):
         self.client = AsyncAnthropic(api_key=get_settings().anthropic_api_key)
 
     async def generate(self, messages, model=None, temperature=0.7, max_tokens=4096):
         model = model or "claude-sonnet-4-20250514"
-        system_msg = None
-        chat_msgs = []
-        for m in messages:
-            if m["role"] == "system":
-                system_msg = m["content"]
-            else:
-                chat_msgs.append(m)
+        system_msg, chat_msgs = _split_system(messages)
 
         response = await self.client.messages.create(
             model=model,
-            system=system_msg or "",
+            system=system_msg,
             messages=chat_msgs,
             temperature=temperature,
             max_tokens=max_tokens,
@@ -43,3 +49,15 @@ class AnthropicAdapter(LLMAdapter):
             tokens_out=response.usage.output_tokens,
             cost_usd=cost,
         )
+
+    async def stream(self, messages, model=None, temperature=0.7, max_tokens=4096):
+        system_msg, chat_msgs = _split_system(messages)
+        async with self.client.messages.stream(
+            model=model or "claude-sonnet-4-20250514",
+            system=system_msg,
+            messages=chat_msgs,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 
 from pydantic import BaseModel
 
@@ -21,3 +22,17 @@ class LLMAdapter(ABC):
         max_tokens: int = 4096,
     ) -> LLMResponse:
         pass
+
+    async def stream(
+        self,
+        messages: list[dict],
+        model: str | None = None,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        """Yield the completion as text deltas.
+
+        Default for providers without streaming: one delta with the whole content.
+        """
+        response = await self.generate(messages, model=model, temperature=temperature, max_tokens=max_tokens)
+        yield response.content
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+
+import structlog
+from openai import AsyncOpenAI
+
+from app.config.settings import get_settings
+from app.config.supabase import get_supabase_admin
+
+logger = structlog.get_logger("cgs-mvp.embeddings")
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536  # archive.embedding VECTOR(1536)
+
+# The embeddings endpoint accepts up to 2048 inputs per request; smaller
+# batches keep each request well under the per-request token cap.
+MAX_BATCH_SIZE = 256
+# text-embedding-3-small accepts 8191 tokens per input (~4 chars/token)
+MAX_INPUT_CHARS = 24_000
+
+
+def normalize_query(text: str) -> str:
+    """Cache key normalization: case and whitespace don't change what a search query means."""
+    return " ".join(text.split()).casefold()
+
+
+class QueryEmbeddingCache:
+    """In-process LRU cache with TTL for query embeddings, keyed by (model, normalized text)."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items: OrderedDict[tuple[str, str], tuple[float, list[float]]] = OrderedDict()
+
+    def get(self, key: tuple[str, str]) -> list[float] | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, vector = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return vector
+
+    def set(self, key: tuple[str, str], vector: list[float]) -> None:
+        self._items[key] = (time.monotonic() + self.ttl_seconds, vector)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class EmbeddingClient:
+    """Batched OpenAI embeddings. Transient errors (429/5xx/timeouts) are
+    retried with exponential backoff by the SDK (max_retries).
+
+    Use get_embedding_client() for the process-wide instance: it shares one
+    HTTP connection pool and the query embedding cache.
+    """
+
+    def __init__(self, model: str = EMBEDDING_MODEL, max_retries: int = 5):
+        settings = get_settings()
+        self.model = model
+        self.client = AsyncOpenAI(api_key=settings.openai_api_key, max_retries=max_retries)
+        self.query_cache = QueryEmbeddingCache(settings.embedding_cache_size, settings.embedding_cache_ttl_seconds)
+        self.persistent_cache = settings.embedding_cache_persistent
+        self.persistent_ttl_seconds = settings.embedding_cache_persistent_ttl_seconds
+
+    async def embed(self, text: str) -> list[float]:
+        return (await self.embed_batch([text]))[0]
+
+    async def embed_query(self, text: str) -> list[float]:
+        """Embed a search query, reusing recent results.
+
+        Lookup order: in-process LRU → embedding_cache table (if
+        EMBEDDING_CACHE_PERSISTENT) → embeddings API. The normalized query is
+        only the cache key: the API always embeds the original text, like the
+        archive texts it is compared against.
+        """
+        normalized = normalize_query(text)
+        key = (self.model, normalized)
+        vector = self.query_cache.get(key)
+        if vector is not None:
+            return vector
+
+        digest = hashlib.sha256(f"{self.model}\n{normalized}".encode()).hexdigest()
+        # supabase-py is synchronous: keep its HTTP calls off the event loop
+        if self.persistent_cache:
+            vector = await asyncio.to_thread(self._load_persistent, digest)
+        if vector is None:
+            vector = await self.embed(text)
+            if self.persistent_cache:
+                await asyncio.to_thread(self._store_persistent, digest, vector)
+        self.query_cache.set(key, vector)
+        return vector
+
+    async def embed_batch(self, texts: list[str], batch_size: int = MAX_BATCH_SIZE) -> list[list[float]]:
+        """Embed many texts with one API call per batch; order is preserved."""
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), batch_size):
+            chunk = [(t or " ")[:MAX_INPUT_CHARS] for t in texts[start : start + batch_size]]
+            response = await self.client.embeddings.create(model=self.model, input=chunk)
+            # Results carry their input index; don't rely on response order
+            vectors.extend(d.embedding for d in sorted(response.data, key=lambda d: d.index))
+            logger.info(
+                "Embeddings batch | size=%d tokens=%d",
+                len(chunk),
+                response.usage.total_tokens if response.usage else 0,
+            )
+        return vectors
+
+    # ── Persistent cache (best effort: a DB error never fails the search) ──
+
+    def _persistent_cutoff(self) -> str:
+        return (datetime.now(UTC) - timedelta(seconds=self.persistent_ttl_seconds)).isoformat()
+
+    def _load_persistent(self, digest: str) -> list[float] | None:
+        try:
+            rows = (
+                get_supabase_admin()
+                .table("embedding_cache")
+                .select("embedding")
+                .eq("key_hash", digest)
+                .gte("created_at", self._persistent_cutoff())
+                .limit(1)
+                .execute()
+                .data
+            )
+        except Exception as e:
+            logger.warning("Embedding cache read failed", error=str(e))
+            return None
+        if not rows:
+            return None
+        vector = rows[0]["embedding"]
+        # pgvector comes back as its text form "[0.1,0.2,...]"
+        return json.loads(vector) if isinstance(vector, str) else vector
+
+    def _store_persistent(self, digest: str, vector: list[float]) -> None:
+        row = {
+            "key_hash": digest,
+            "model": self.model,
+            "embedding": vector,
+            "created_at": datetime.now(UTC).isoformat(),
+        }
+        try:
+            db = get_supabase_admin()
+            db.table("embedding_cache").upsert(row).execute()
+            db.table("embedding_cache").delete().lt("created_at", self._persistent_cutoff()).execute()
+        except Exception as e:
+            logger.warning("Embedding cache write failed", error=str(e))
+
+
+@lru_cache
+def get_embedding_client() -> EmbeddingClient:
+    return EmbeddingClient()
@@ -12,6 +12,11 @@ PRICING = {
 }
 
 
+def _to_prompt(messages: list[dict]) -> str:
+    """Converti formato OpenAI → Gemini."""
+    return "\n\n".join(f"[{m['role'].upper()}]: {m['content']}" for m in messages)
+
+
 class GeminiAdapter(LLMAdapter):
     def __init__(self):
         genai.configure(api_key=get_settings().google_api_key)
@@ -19,12 +24,7 @@ class GeminiAdapter(LLMAdapter):
     async def generate(self, messages, model=None, temperature=0.7, max_tokens=4096):
         model_name = model or "gemini-1.5-pro"
         gm = genai.GenerativeModel(model_name)
-
-        # Converti formato OpenAI → Gemini
-        parts = []
-        for m in messages:
-            parts.append(f"[{m['role'].upper()}]: {m['content']}")
-        prompt = "\n\n".join(parts)
+        prompt = _to_prompt(messages)
 
         # FIX: gm.generate_content() è sincrono — wrap in asyncio.to_thread()
         response = await asyncio.to_thread(
@@ -44,3 +44,17 @@ class GeminiAdapter(LLMAdapter):
             tokens_out=tokens_out,
             cost_usd=cost,
         )
+
+    async def stream(self, messages, model=None, temperature=0.7, max_tokens=4096):
+        gm = genai.GenerativeModel(model or "gemini-1.5-pro")
+        response = await asyncio.to_thread(
+            gm.generate_content,
+            _to_prompt(messages),
+            generation_config={"temperature": temperature, "max_output_tokens": max_tokens},
+            stream=True,
+        )
+        # Anche l'iterazione dei chunk è bloccante: un next() per thread
+        chunks = iter(response)
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            if chunk.parts:
+                yield chunk.text
@@ -0,0 +1,142 @@
+"""
+Incremental extraction of string fields from a streamed JSON object.
+
+LLM replies in JSON envelopes ({"message": "...", "action": ...}) are only
+parseable once complete. JsonFieldStream is fed the raw deltas and returns the
+decoded text of the requested top-level string fields as it arrives, so a
+field can be shown while the rest of the object is still being generated.
+
+Anything before the first "{" (e.g. a ```json fence) is skipped. Nested values
+and non-watched fields are skipped without being decoded; the complete reply
+should still be parsed with json.loads once the stream ends.
+"""
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# Parser states
+_SEEK = "seek"  # before the opening "{"
+_KEY = "key"  # expecting a key, "," or the closing "}"
+_KEY_STRING = "key_string"
+_COLON = "colon"
+_VALUE = "value"  # expecting the start of a value
+_VALUE_STRING = "value_string"
+_VALUE_OTHER = "value_other"  # number, literal, nested object/array
+_DONE = "done"
+
+
+class JsonFieldStream:
+    def __init__(self, fields: set[str] | list[str] | tuple[str, ...]):
+        self.fields = set(fields)
+        self.state = _SEEK
+        self.key = ""
+        self.escape: str | None = None  # None, "" after "\", "uXXXX" while reading a \u escape
+        self.high_surrogate: int | None = None
+        self.nesting = 0  # depth inside a non-string value
+        self.in_nested_string = False
+        self.nested_escape = False
+
+    @property
+    def done(self) -> bool:
+        return self.state == _DONE
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """Consume a delta; return (field, decoded text) pieces for watched fields, in order."""
+        out: list[tuple[str, str]] = []
+        buf: list[str] = []
+        for ch in chunk:
+            state = self.state
+            if state == _VALUE_STRING:
+                if self.escape is None and ch != "\\" and ch != '"':
+                    buf.append(ch)
+                    continue
+                if self.escape is None and ch == '"':
+                    self._flush(buf, out)
+                    self.state = _KEY
+                    continue
+                self._decode(ch, buf)
+            elif state == _SEEK:
+                if ch == "{":
+                    self.state = _KEY
+            elif state == _KEY:
+                if ch == '"':
+                    self.key = ""
+                    self.state = _KEY_STRING
+                elif ch == "}":
+                    self.state = _DONE
+            elif state == _KEY_STRING:
+                if self.escape is None and ch == '"':
+                    self.state = _COLON
+                else:
+                    key_buf: list[str] = []
+                    self._decode(ch, key_buf)
+                    self.key += "".join(key_buf)
+            elif state == _COLON:
+                if ch == ":":
+                    self.state = _VALUE
+            elif state == _VALUE:
+                if ch == '"':
+                    self.state = _VALUE_STRING
+                elif not ch.isspace():
+                    self.state = _VALUE_OTHER
+                    self.nesting = 0
+                    self._skip(ch)
+            elif state == _VALUE_OTHER:
+                self._skip(ch)
+        self._flush(buf, out)
+        return out
+
+    def _flush(self, buf: list[str], out: list[tuple[str, str]]) -> None:
+        if buf:
+            if self.key in self.fields:
+                out.append((self.key, "".join(buf)))
+            buf.clear()
+
+    def _decode(self, ch: str, buf: list[str]) -> None:
+        """Handle one character of a string body, resolving escapes across chunks."""
+        if self.escape is None:
+            if ch == "\\":
+                self.escape = ""
+            else:
+                buf.append(ch)
+            return
+        if self.escape == "" and ch != "u":
+            buf.append(_ESCAPES.get(ch, ch))
+            self.escape = None
+            return
+        self.escape += ch
+        if len(self.escape) < 5:  # "u" + 4 hex digits
+            return
+        try:
+            code = int(self.escape[1:], 16)
+        except ValueError:
+            code = 0xFFFD
+        self.escape = None
+        if 0xD800 <= code < 0xDC00:
+            self.high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self.high_surrogate is not None:
+            buf.append(chr(0x10000 + ((self.high_surrogate - 0xD800) << 10) + (code - 0xDC00)))
+        else:
+            buf.append(chr(code))
+        self.high_surrogate = None
+
+    def _skip(self, ch: str) -> None:
+        """Track a non-string value until the "," or "}" that ends it."""
+        if self.in_nested_string:
+            if self.nested_escape:
+                self.nested_escape = False
+            elif ch == "\\":
+                self.nested_escape = True
+            elif ch == '"':
+                self.in_nested_string = False
+        elif ch == '"':
+            self.in_nested_string = True
+        elif ch in "{[":
+            self.nesting += 1
+        elif ch in "}]":
+            if self.nesting == 0:
+                self.state = _DONE  # closing "}" of the envelope
+            else:
+                self.nesting -= 1
+        elif ch == "," and self.nesting == 0:
+            self.state = _KEY
@@ -34,3 +34,15 @@ class OpenAIAdapter(LLMAdapter):
             tokens_out=usage.completion_tokens,
             cost_usd=cost,
         )
+
+    async def stream(self, messages, model=None, temperature=0.7, max_tokens=4096):
+        stream = await self.client.chat.completions.create(
+            model=model or "gpt-4o",
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
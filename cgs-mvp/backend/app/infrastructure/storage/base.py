@@ -0,0 +1,37 @@
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+
+# Streaming uploads are fed in chunks of this size (the last one may be shorter).
+# Supabase resumable uploads (TUS) require exactly 6 MB.
+UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
+
+
+class StorageBackend(ABC):
+    """Async object storage. Implementations never block the event loop and
+    bound how many operations run at once (STORAGE_MAX_CONCURRENCY)."""
+
+    @abstractmethod
+    async def upload(self, bucket: str, path: str, data: bytes, content_type: str) -> None:
+        pass
+
+    @abstractmethod
+    async def upload_chunks(self, bucket: str, path: str, chunks: AsyncIterator[bytes], content_type: str) -> None:
+        """Upload from UPLOAD_CHUNK_SIZE chunks without holding the whole object."""
+        pass
+
+    @abstractmethod
+    async def download(self, bucket: str, path: str) -> bytes:
+        pass
+
+    @abstractmethod
+    async def delete(self, bucket: str, paths: list[str]) -> None:
+        pass
+
+    @abstractmethod
+    async def sign(self, bucket: str, paths: list[str], expires_in: int) -> dict[str, str]:
+        """Signed URL per path; paths that cannot be signed (missing objects) are left out."""
+        pass
+
+    @abstractmethod
+    def public_url(self, bucket: str, path: str) -> str:
+        pass
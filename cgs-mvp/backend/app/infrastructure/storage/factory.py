@@ -0,0 +1,20 @@
+from functools import lru_cache
+
+from app.config.settings import get_settings
+
+from .base import StorageBackend
+
+
+@lru_cache
+def get_storage_backend() -> StorageBackend:
+    """Process-wide backend (shared connection pool and concurrency bound), chosen by STORAGE_BACKEND."""
+    settings = get_settings()
+    if settings.storage_backend == "supabase":
+        from .supabase_backend import SupabaseStorageBackend
+
+        return SupabaseStorageBackend(settings.storage_max_concurrency)
+    if settings.storage_backend == "local":
+        from .local_storage import LocalStorageBackend
+
+        return LocalStorageBackend(settings.storage_local_root, settings.storage_max_concurrency)
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend}. Available: ['supabase', 'local']")
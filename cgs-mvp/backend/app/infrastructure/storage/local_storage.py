@@ -0,0 +1,69 @@
+import asyncio
+import os
+import uuid
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from .base import StorageBackend
+
+
+class LocalStorageBackend(StorageBackend):
+    """Filesystem storage under `root/<bucket>/<path>`, for tests, benchmarks
+    and local development without a bucket.
+
+    File I/O runs in worker threads, at most `max_concurrency` at a time.
+    Signed and public URLs are file:// URIs.
+    """
+
+    def __init__(self, root: str | Path, max_concurrency: int = 8):
+        self.root = Path(root).resolve()
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def _file(self, bucket: str, path: str) -> Path:
+        base = self.root / bucket
+        target = (base / path).resolve()
+        if not target.is_relative_to(base):
+            raise ValueError(f"Path escapes the bucket: {path}")
+        return target
+
+    async def _run(self, fn, *args):
+        async with self._slots:
+            return await asyncio.to_thread(fn, *args)
+
+    @staticmethod
+    def _write(target: Path, data: bytes) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+
+    async def upload(self, bucket: str, path: str, data: bytes, content_type: str) -> None:
+        await self._run(self._write, self._file(bucket, path), data)
+
+    async def upload_chunks(self, bucket: str, path: str, chunks: AsyncIterator[bytes], content_type: str) -> None:
+        target = self._file(bucket, path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+        handle = await asyncio.to_thread(open, tmp, "wb")
+        try:
+            async for chunk in chunks:
+                await self._run(handle.write, chunk)
+            await asyncio.to_thread(handle.close)
+            os.replace(tmp, target)
+        except BaseException:
+            handle.close()
+            tmp.unlink(missing_ok=True)
+            raise
+
+    async def download(self, bucket: str, path: str) -> bytes:
+        return await self._run(self._file(bucket, path).read_bytes)
+
+    async def delete(self, bucket: str, paths: list[str]) -> None:
+        await asyncio.gather(*(self._run(self._file(bucket, p).unlink, True) for p in paths))
+
+    async def sign(self, bucket: str, paths: list[str], expires_in: int) -> dict[str, str]:
+        files = {p: self._file(bucket, p) for p in paths}
+        return {p: f.as_uri() for p, f in files.items() if f.exists()}
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return self._file(bucket, path).as_uri()
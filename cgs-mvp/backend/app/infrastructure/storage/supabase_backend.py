@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import contextlib
+from collections.abc import AsyncIterator
+
+import httpx
+from storage3 import AsyncStorageClient
+
+from app.config.settings import get_settings
+
+from .base import UPLOAD_CHUNK_SIZE, StorageBackend
+
+RESUMABLE_TIMEOUT_SECONDS = 120
+# Storage API limit of objects per remove call
+REMOVE_BATCH_SIZE = 1000
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """Supabase Storage over the async storage3 client: one shared HTTP pool,
+    at most `max_concurrency` requests in flight per process."""
+
+    def __init__(self, max_concurrency: int = 8):
+        settings = get_settings()
+        key = settings.supabase_service_role_key
+        self.base_url = f"{settings.supabase_url}/storage/v1"
+        self.headers = {"apikey": key, "authorization": f"Bearer {key}"}
+        self.client = AsyncStorageClient(self.base_url, self.headers)
+        self.http = httpx.AsyncClient(timeout=RESUMABLE_TIMEOUT_SECONDS)
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def upload(self, bucket: str, path: str, data: bytes, content_type: str) -> None:
+        async with self._slots:
+            await self.client.from_(bucket).upload(path, data, {"content-type": content_type})
+
+    async def upload_chunks(self, bucket: str, path: str, chunks: AsyncIterator[bytes], content_type: str) -> None:
+        first = await anext(chunks, b"")
+        if len(first) < UPLOAD_CHUNK_SIZE:
+            # Fits in one chunk: a single plain upload
+            await self.upload(bucket, path, first, content_type)
+            return
+        async with self._slots:
+            await self._upload_resumable(bucket, path, content_type, first, chunks)
+
+    async def _upload_resumable(
+        self, bucket: str, path: str, content_type: str, first: bytes, chunks: AsyncIterator[bytes]
+    ) -> None:
+        """TUS upload with deferred length: the total is only known after the last chunk."""
+        headers = {**self.headers, "tus-resumable": "1.0.0"}
+        endpoint = f"{self.base_url}/upload/resumable"
+        metadata = ",".join(
+            f"{name} {base64.b64encode(value.encode()).decode()}"
+            for name, value in (("bucketName", bucket), ("objectName", path), ("contentType", content_type))
+        )
+        res = await self.http.post(
+            endpoint, headers={**headers, "upload-defer-length": "1", "upload-metadata": metadata}
+        )
+        res.raise_for_status()
+        location = str(httpx.URL(endpoint).join(res.headers["location"]))
+        try:
+            offset, chunk = 0, first
+            while chunk:
+                following = await anext(chunks, b"")
+                patch_headers = {
+                    **headers,
+                    "upload-offset": str(offset),
+                    "content-type": "application/offset+octet-stream",
+                }
+                if not following:
+                    patch_headers["upload-length"] = str(offset + len(chunk))
+                res = await self.http.patch(location, headers=patch_headers, content=chunk)
+                res.raise_for_status()
+                offset = int(res.headers["upload-offset"])
+                chunk = following
+        except BaseException:
+            # Drop the partial upload (TUS termination)
+            with contextlib.suppress(httpx.HTTPError):
+                await self.http.delete(location, headers=headers)
+            raise
+
+    async def download(self, bucket: str, path: str) -> bytes:
+        async with self._slots:
+            return await self.client.from_(bucket).download(path)
+
+    async def delete(self, bucket: str, paths: list[str]) -> None:
+        async def remove(batch: list[str]) -> None:
+            async with self._slots:
+                await self.client.from_(bucket).remove(batch)
+
+        await asyncio.gather(
+            *(remove(paths[i : i + REMOVE_BATCH_SIZE]) for i in range(0, len(paths), REMOVE_BATCH_SIZE))
+        )
+
+    async def sign(self, bucket: str, paths: list[str], expires_in: int) -> dict[str, str]:
+        async with self._slots:
+            items = await self.client.from_(bucket).create_signed_urls(paths, expires_in)
+        urls = {}
+        for item in items:
+            url = item.get("signedURL") or item.get("signedUrl")
+            if url and not item.get("error"):
+                urls[item["path"]] = url
+        return urls
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return f"{self.base_url}/object/public/{bucket}/{path}"
@@ -1,13 +1,102 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
 from uuid import UUID
 
 from app.config.settings import get_settings
-from app.config.supabase import get_supabase_admin
+
+from .base import UPLOAD_CHUNK_SIZE, StorageBackend
+from .factory import get_storage_backend
+
+# A cached signed URL is handed out until this fraction of its lifetime is left
+# (at least SIGNED_URL_MIN_MARGIN_SECONDS), so clients always get a usable link
+SIGNED_URL_REFRESH_MARGIN = 0.1
+SIGNED_URL_MIN_MARGIN_SECONDS = 60
+
+
+class UploadTooLargeError(ValueError):
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+
+
+@dataclass
+class StreamedUpload:
+    path: str
+    size: int
+    sha256: str
+
+
+class SignedUrlCache:
+    """Process-wide LRU of signed URLs, keyed by (bucket, path, expires_in), dropped shortly before expiry."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._items: OrderedDict[tuple[str, str, int], tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str, int]) -> str | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            reuse_until, url = item
+            if reuse_until < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return url
+
+    def set(self, key: tuple[str, str, int], url: str) -> None:
+        expires_in = key[2]
+        margin = max(expires_in * SIGNED_URL_REFRESH_MARGIN, SIGNED_URL_MIN_MARGIN_SECONDS)
+        if expires_in <= margin:
+            return  # too short-lived to be worth reusing
+        with self._lock:
+            self._items[key] = (time.monotonic() + expires_in - margin, url)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, bucket: str, paths: list[str]) -> None:
+        """Forget the URLs of deleted objects (any expiry)."""
+        targets = set(paths)
+        with self._lock:
+            for key in [k for k in self._items if k[0] == bucket and k[1] in targets]:
+                del self._items[key]
+
+
+@lru_cache
+def get_signed_url_cache() -> SignedUrlCache:
+    return SignedUrlCache(get_settings().signed_url_cache_size)
+
+
+async def _read_chunk(stream, size: int) -> bytes:
+    """Read up to `size` bytes, short only at end of stream."""
+    parts, remaining = [], size
+    while remaining:
+        part = await stream.read(remaining)
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b"".join(parts)
 
 
 class StorageService:
-    def __init__(self):
-        self.client = get_supabase_admin()
+    """Storage used by the services: path layout, streaming + hashing, signed-URL cache.
+
+    I/O goes to the process-wide StorageBackend (STORAGE_BACKEND=supabase|local),
+    so every operation is non-blocking and bounded by STORAGE_MAX_CONCURRENCY.
+    """
+
+    def __init__(self, backend: StorageBackend | None = None):
         self.settings = get_settings()
+        self.backend = backend or get_storage_backend()
 
     async def upload_file(
         self,
@@ -19,19 +108,94 @@ class StorageService:
     ) -> str:
         bucket = bucket or self.settings.output_bucket
         path = f"{user_id}/{file_name}"
-        self.client.storage.from_(bucket).upload(path, file_data, {"content-type": content_type})
+        await self.backend.upload(bucket, path, file_data, content_type)
         return path
 
-    def get_signed_url(self, path: str, expires_in: int = 3600, bucket: str | None = None) -> str:
+    async def upload_files(
+        self,
+        user_id: UUID,
+        files: list[tuple[str, bytes, str]],
+        bucket: str | None = None,
+    ) -> list[str]:
+        """Upload many (file_name, data, content_type) in parallel; returns the paths in order."""
+        return list(
+            await asyncio.gather(
+                *(self.upload_file(user_id, data, name, content_type, bucket) for name, data, content_type in files)
+            )
+        )
+
+    async def upload_stream(
+        self,
+        user_id: UUID,
+        stream,
+        file_name: str,
+        content_type: str,
+        bucket: str | None = None,
+        max_bytes: int | None = None,
+    ) -> StreamedUpload:
+        """Upload from an async byte stream (e.g. UploadFile) without loading it whole.
+
+        Size and SHA-256 are computed while streaming; going past `max_bytes`
+        aborts the upload with UploadTooLargeError.
+        """
         bucket = bucket or self.settings.output_bucket
-        res = self.client.storage.from_(bucket).create_signed_url(path, expires_in)
-        return res["signedURL"]
+        path = f"{user_id}/{file_name}"
+        digest = hashlib.sha256()
+        size = 0
+
+        async def chunks():
+            nonlocal size
+            while chunk := await _read_chunk(stream, UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                digest.update(chunk)
+                yield chunk
+
+        await self.backend.upload_chunks(bucket, path, chunks(), content_type)
+        return StreamedUpload(path=path, size=size, sha256=digest.hexdigest())
+
+    async def download_file(self, path: str, bucket: str | None = None) -> bytes:
+        return await self.backend.download(bucket or self.settings.output_bucket, path)
+
+    async def get_signed_url(self, path: str, expires_in: int = 3600, bucket: str | None = None) -> str:
+        urls = await self.get_signed_urls([path], expires_in, bucket)
+        if path not in urls:
+            raise FileNotFoundError(path)
+        return urls[path]
+
+    async def get_signed_urls(
+        self, paths: list[str], expires_in: int = 3600, bucket: str | None = None
+    ) -> dict[str, str]:
+        """Signed URLs for many objects: cached ones plus a single storage call for the rest.
+
+        Paths the storage cannot sign (e.g. missing objects) are left out.
+        """
+        bucket = bucket or self.settings.output_bucket
+        cache = get_signed_url_cache()
+        urls, missing = {}, []
+        for path in dict.fromkeys(paths):
+            url = cache.get((bucket, path, expires_in))
+            if url is None:
+                missing.append(path)
+            else:
+                urls[path] = url
+        if missing:
+            for path, url in (await self.backend.sign(bucket, missing, expires_in)).items():
+                urls[path] = url
+                cache.set((bucket, path, expires_in), url)
+        return urls
 
     def get_public_url(self, path: str, bucket: str | None = None) -> str:
-        bucket = bucket or self.settings.preview_bucket
-        res = self.client.storage.from_(bucket).get_public_url(path)
-        return res
+        return self.backend.public_url(bucket or self.settings.preview_bucket, path)
+
+    async def delete_file(self, path: str, bucket: str | None = None):
+        await self.delete_files([path], bucket)
 
-    def delete_file(self, path: str, bucket: str | None = None):
+    async def delete_files(self, paths: list[str], bucket: str | None = None):
+        """Remove many objects (batched and run in parallel by the backend)."""
+        if not paths:
+            return
         bucket = bucket or self.settings.output_bucket
-        self.client.storage.from_(bucket).remove([path])
+        await self.backend.delete(bucket, paths)
+        get_signed_url_cache().invalidate(bucket, paths)
@@ -0,0 +1,86 @@
+"""
+In-process vector index: exact cosine search over a contiguous float32
+matrix (NumPy), with an optional hnswlib graph for large indexes.
+
+Both libraries are optional. Without NumPy the index is unavailable
+(`is_available()` is False) and callers stay on pgvector.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+try:
+    import hnswlib
+except ImportError:  # optional dependency
+    hnswlib = None
+
+# Below this size brute force is as fast as HNSW and always exact
+HNSW_MIN_VECTORS = 20_000
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+class VectorIndex:
+    """Immutable cosine index over `vectors`; `metadata[i]` describes row i.
+
+    Rebuild to update: indexes are cheap to build and swapping the whole
+    object keeps concurrent searches consistent without locks.
+    """
+
+    def __init__(self, vectors: list, metadata: list[dict], use_hnsw: bool | None = None):
+        if np is None:
+            raise RuntimeError("numpy is required for the in-process vector index (pip install numpy)")
+        if len(vectors) != len(metadata):
+            raise ValueError("vectors and metadata must have the same length")
+        self.metadata = metadata
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(metadata), -1 if metadata else 0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        # Unit rows: cosine similarity is a single matrix-vector product
+        self.matrix = np.ascontiguousarray(matrix / norms)
+
+        self._hnsw = None
+        if use_hnsw is None:
+            use_hnsw = hnswlib is not None and len(metadata) >= HNSW_MIN_VECTORS
+        if use_hnsw and len(metadata):
+            if hnswlib is None:
+                raise RuntimeError("hnswlib is not installed")
+            graph = hnswlib.Index(space="cosine", dim=self.matrix.shape[1])
+            graph.init_index(max_elements=len(metadata), M=16, ef_construction=64)
+            graph.add_items(self.matrix, np.arange(len(metadata)))
+            self._hnsw = graph
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    def search(self, query: list, k: int, mask=None, ef_search: int | None = None) -> list[tuple[int, float]]:
+        """Top-k (row, cosine similarity), best first. `mask` is an optional boolean array of eligible rows."""
+        if not len(self) or k <= 0:
+            return []
+        q = np.array(query, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+
+        if self._hnsw is not None and mask is None:
+            self._hnsw.set_ef(max(ef_search or 80, k))
+            labels, distances = self._hnsw.knn_query(q, k=min(k, len(self)))
+            return [(int(i), 1.0 - float(d)) for i, d in zip(labels[0], distances[0], strict=True)]
+
+        # Filtered queries scan the (small) eligible subset exactly: post-filtering
+        # a graph search would drop results.
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if not len(rows):
+            return []
+        scores = self.matrix[rows] @ q
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def mask(self, predicate) -> "np.ndarray":
+        return np.fromiter((predicate(m) for m in self.metadata), dtype=bool, count=len(self))
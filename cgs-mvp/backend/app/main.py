@@ -7,6 +7,7 @@ from slowapi.errors import RateLimitExceeded
 from app.api.v1 import router as v1_router
 from app.config.logging import setup_observability
 from app.config.settings import get_settings
+from app.db.pagination import NEXT_CURSOR_HEADER
 from app.exceptions import AppException
 from app.middleware.correlation import CorrelationIdMiddleware
 from app.middleware.error_handler import app_exception_handler, generic_exception_handler
@@ -47,6 +48,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 # Correlation ID middleware runs inside CORS — assigns a unique ID per request
 app.add_middleware(CorrelationIdMiddleware)
@@ -0,0 +1,174 @@
+"""
+In-process archive vector index, in front of pgvector.
+
+ArchiveIndexCache.semantic_search has the same signature and result shape
+as ArchiveRepository.semantic_search (match_archive RPC), so callers can
+use either one. Controlled by VECTOR_INDEX_MODE:
+
+- "off"    (default) always pgvector
+- "hot"    contexts searched at least VECTOR_INDEX_HOT_AFTER times are
+           loaded into memory and served locally (LRU of
+           VECTOR_INDEX_MAX_CONTEXTS); the rest go to pgvector
+- "always" every context is served locally (local dev, tests, small tenants)
+
+Contexts with no embeddings or more than VECTOR_INDEX_MAX_VECTORS, or a missing
+numpy, always fall back to pgvector. Indexes are rebuilt after
+VECTOR_INDEX_TTL_SECONDS and dropped on review / embedding writes in this
+process; the TTL bounds staleness across workers.
+
+semantic_search is blocking (database reads, index builds of up to
+VECTOR_INDEX_MAX_VECTORS rows): async callers run it in asyncio.to_thread.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from uuid import UUID
+
+import structlog
+
+from app.config.settings import get_settings
+from app.config.supabase import get_supabase_admin
+from app.db.repositories.archive_repo import ArchiveRepository
+from app.infrastructure.vector import memory_index
+from app.infrastructure.vector.memory_index import VectorIndex
+
+logger = structlog.get_logger("cgs-mvp.archive_index")
+
+
+class _ContextIndex:
+    def __init__(self, rows: list[dict]):
+        vectors = []
+        for row in rows:
+            vector = row.pop("embedding")
+            # pgvector comes back as its text form "[0.1,0.2,...]"
+            vectors.append(json.loads(vector) if isinstance(vector, str) else vector)
+        self.index = VectorIndex(vectors, rows)
+        self.built_at = time.monotonic()
+
+    def search(
+        self,
+        embedding: list,
+        brief_id: UUID | None,
+        limit: int,
+        review_status: str | None,
+        is_reference: bool | None,
+        ef_search: int | None,
+    ) -> list:
+        def eligible(m: dict, bid: str | None) -> bool:
+            return (
+                (bid is None or m["brief_id"] == bid)
+                and (review_status is None or m["review_status"] == review_status)
+                and (is_reference is None or m["is_reference"] == is_reference)
+            )
+
+        # Same brief-first semantics as match_archive
+        if brief_id is not None:
+            bid = str(brief_id)
+            hits = self.index.search(embedding, limit, self.index.mask(lambda m: eligible(m, bid)))
+            if hits:
+                return self._rows(hits, brief_scoped=True)
+
+        filtered = review_status is not None or is_reference is not None
+        mask = self.index.mask(lambda m: eligible(m, None)) if filtered else None
+        return self._rows(self.index.search(embedding, limit, mask, ef_search), brief_scoped=False)
+
+    def _rows(self, hits: list[tuple[int, float]], brief_scoped: bool) -> list:
+        return [{**self.index.metadata[i], "similarity": score, "brief_scoped": brief_scoped} for i, score in hits]
+
+
+class ArchiveIndexCache:
+    def __init__(self):
+        settings = get_settings()
+        self.mode = settings.vector_index_mode
+        self.hot_after = settings.vector_index_hot_after
+        self.max_contexts = settings.vector_index_max_contexts
+        self.max_vectors = settings.vector_index_max_vectors
+        self.ttl_seconds = settings.vector_index_ttl_seconds
+
+        self._indexes: OrderedDict[str, _ContextIndex] = OrderedDict()
+        self._skipped: dict[str, float] = {}  # empty or too large for memory → time of the check
+        self._hits: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.repo = ArchiveRepository(get_supabase_admin())
+
+        if self.mode != "off" and not memory_index.is_available():
+            logger.warning("VECTOR_INDEX_MODE=%s but numpy is not installed: using pgvector", self.mode)
+            self.mode = "off"
+
+    def semantic_search(
+        self,
+        embedding: list,
+        context_id: UUID,
+        brief_id: UUID | None = None,
+        limit: int = 5,
+        review_status: str | None = None,
+        is_reference: bool | None = None,
+        ef_search: int | None = None,
+    ) -> list:
+        index = self._get(str(context_id))
+        if index is None:
+            return self.repo.semantic_search(
+                embedding,
+                context_id,
+                brief_id=brief_id,
+                limit=limit,
+                review_status=review_status,
+                is_reference=is_reference,
+                ef_search=ef_search,
+            )
+        return index.search(embedding, brief_id, limit, review_status, is_reference, ef_search)
+
+    def invalidate(self, context_id: UUID | str | None = None) -> None:
+        """Drop one context (or all) so the next search rebuilds from the database."""
+        with self._lock:
+            if context_id is None:
+                self._indexes.clear()
+                self._skipped.clear()
+            else:
+                self._indexes.pop(str(context_id), None)
+                self._skipped.pop(str(context_id), None)
+
+    def _get(self, context_id: str) -> _ContextIndex | None:
+        if self.mode == "off":
+            return None
+        now = time.monotonic()
+        with self._lock:
+            checked_at = self._skipped.get(context_id)
+            if checked_at is not None and now - checked_at < self.ttl_seconds:
+                return None
+            index = self._indexes.get(context_id)
+            if index is not None and now - index.built_at < self.ttl_seconds:
+                self._indexes.move_to_end(context_id)
+                return index
+            if self.mode == "hot":
+                if len(self._hits) > 10 * self.max_contexts * self.hot_after:
+                    self._hits.clear()  # keep the counter table bounded
+                self._hits[context_id] = self._hits.get(context_id, 0) + 1
+                if self._hits[context_id] < self.hot_after:
+                    return None
+
+        # Load and build outside the lock: a slow context must not block searches on the others
+        rows = self.repo.list_embedded(UUID(context_id), self.max_vectors)
+        if not rows or len(rows) > self.max_vectors:
+            with self._lock:
+                self._skipped[context_id] = now
+                self._indexes.pop(context_id, None)
+            if rows:
+                logger.info("Context too large for in-process index | context=%s", context_id)
+            return None
+        index = _ContextIndex(rows)
+        with self._lock:
+            self._indexes[context_id] = index
+            self._indexes.move_to_end(context_id)
+            while len(self._indexes) > self.max_contexts:
+                self._indexes.popitem(last=False)
+        logger.info("In-process archive index built | context=%s vectors=%d", context_id, len(index.index))
+        return index
+
+
+@lru_cache
+def get_archive_index_cache() -> ArchiveIndexCache:
+    return ArchiveIndexCache()
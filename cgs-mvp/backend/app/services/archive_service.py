@@ -1,11 +1,13 @@
+import asyncio
 from uuid import UUID
 
 import structlog
-from openai import AsyncOpenAI
 
-from app.config.settings import get_settings
 from app.config.supabase import get_supabase_admin
+from app.db.pagination import CREATED_DESC, paginate
 from app.db.repositories.archive_repo import ArchiveRepository
+from app.infrastructure.llm.embeddings import get_embedding_client
+from app.services.archive_index import get_archive_index_cache
 
 logger = structlog.get_logger("cgs-mvp.archive")
 
@@ -19,13 +21,18 @@ class ArchiveService:
         user_id: UUID,
         context_id: UUID | None = None,
         brief_id: UUID | None = None,
-    ) -> list:
-        query = self.db.table("archive").select("*").eq("user_id", str(user_id))
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list, str | None]:
+        # Summary projection: the embedding never leaves the database
+        columns = ArchiveRepository(self.db).projection(fields)
+        query = self.db.table("archive").select(columns).eq("user_id", str(user_id))
         if context_id:
             query = query.eq("context_id", str(context_id))
         if brief_id:
             query = query.eq("brief_id", str(brief_id))
-        return query.order("created_at", desc=True).execute().data
+        return paginate(query, CREATED_DESC, limit, cursor)
 
     def get_stats(
         self,
@@ -33,24 +40,12 @@ class ArchiveService:
         context_id: UUID | None = None,
         brief_id: UUID | None = None,
     ) -> dict:
-        # When filtering by context or brief, compute stats in Python
-        if context_id or brief_id:
-            items = self.list(user_id, context_id, brief_id)
-            total = len(items)
-            approved = sum(1 for i in items if i.get("review_status") == "approved")
-            rejected = sum(1 for i in items if i.get("review_status") == "rejected")
-            pending = sum(1 for i in items if i.get("review_status") == "pending")
-            references = sum(1 for i in items if i.get("is_reference"))
-            return {
-                "total": total,
-                "approved": approved,
-                "rejected": rejected,
-                "pending_count": pending,
-                "references_count": references,
-            }
-
-        # No filters → use RPC for global stats
+        # Counting happens in SQL for both global and filtered stats
         params = {"p_user_id": str(user_id)}
+        if context_id:
+            params["p_context_id"] = str(context_id)
+        if brief_id:
+            params["p_brief_id"] = str(brief_id)
         result = self.db.rpc("get_archive_stats", params).execute()
         return (
             result.data[0]
@@ -69,19 +64,24 @@ class ArchiveService:
         query: str,
         context_id: UUID,
         brief_id: UUID | None = None,
+        review_status: str | None = None,
+        is_reference: bool | None = None,
+        limit: int = 5,
     ) -> list:
-        """Semantic search usando embeddings OpenAI + vector search."""
-        settings = get_settings()
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
+        """Semantic search usando embeddings OpenAI (client condiviso + cache) + vector search (HNSW)."""
+        logger.info("Embedding query | query=%s context=%s brief=%s", query[:50], context_id, brief_id)
+        embedding = await get_embedding_client().embed_query(query)
 
-        logger.info("Generating embedding | query=%s context=%s brief=%s", query[:50], context_id, brief_id)
-        embedding_response = await client.embeddings.create(
-            model="text-embedding-3-small",
-            input=query,
+        # pgvector, or the in-process index for hot contexts (VECTOR_INDEX_MODE)
+        # Off the event loop: building an index loads up to VECTOR_INDEX_MAX_VECTORS embeddings
+        results = await asyncio.to_thread(
+            get_archive_index_cache().semantic_search,
+            embedding,
+            context_id,
+            brief_id=brief_id,
+            limit=limit,
+            review_status=review_status,
+            is_reference=is_reference,
         )
-        embedding = embedding_response.data[0].embedding
-
-        repo = ArchiveRepository(self.db)
-        results = repo.semantic_search(embedding, context_id, brief_id=brief_id)
         logger.info("Semantic search completed | results=%d", len(results))
         return results
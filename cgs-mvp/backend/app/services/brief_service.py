@@ -4,6 +4,8 @@ from uuid import UUID
 import structlog
 
 from app.config.supabase import get_supabase_admin
+from app.db.pagination import CREATED_DESC, paginate
+from app.db.repositories.brief_repo import BriefRepository
 from app.exceptions import NotFoundException, ValidationException
 
 logger = structlog.get_logger("cgs-mvp.brief")
@@ -68,13 +70,23 @@ class BriefService:
 
     # ── CRUD ──
 
-    def list(self, user_id: UUID, context_id: UUID | None = None, pack_id: UUID | None = None) -> list:
-        query = self.db.table("briefs").select("*").eq("user_id", str(user_id))
+    def list(
+        self,
+        user_id: UUID,
+        context_id: UUID | None = None,
+        pack_id: UUID | None = None,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list, str | None]:
+        # questions/answers/compiled_brief only on request (?fields=) or via get()
+        columns = BriefRepository(self.db).projection(fields)
+        query = self.db.table("briefs").select(columns).eq("user_id", str(user_id))
         if context_id:
             query = query.eq("context_id", str(context_id))
         if pack_id:
             query = query.eq("pack_id", str(pack_id))
-        return query.order("created_at", desc=True).execute().data
+        return paginate(query, CREATED_DESC, limit, cursor)
 
     def get(self, brief_id: UUID, user_id: UUID) -> dict:
         result = (
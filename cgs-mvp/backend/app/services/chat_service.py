@@ -1,5 +1,7 @@
 import json
 import re
+from collections.abc import AsyncIterator
+from itertools import pairwise
 from uuid import UUID
 
 import structlog
@@ -7,24 +9,75 @@ import structlog
 from app.config.supabase import get_supabase_admin
 from app.exceptions import LLMException, NotFoundException
 from app.infrastructure.llm.factory import get_llm_adapter
+from app.infrastructure.llm.json_stream import JsonFieldStream
 
 logger = structlog.get_logger("cgs-mvp.chat")
 
 CHAT_SYSTEM_PROMPT = """You are an expert AI editor. You can do 3 things:
 
-1. EDIT_OUTPUT: Edit the content. Reply with the complete updated content.
+1. EDIT_OUTPUT: Edit the content. Prefer targeted "edits": each "find" is text copied exactly from
+   CURRENT CONTENT that occurs only once (add surrounding words if needed), "replace" is its new text.
+   Use "edited_content" with the complete updated content only when rewriting most of the text.
 2. UPDATE_CONTEXT: If the user tells you something about the brand identity, suggest a Context update.
 3. UPDATE_BRIEF: If the user tells you something about how they want the content, suggest a Brief update.
 
-ALWAYS reply with valid JSON:
+ALWAYS reply with valid JSON, "message" first:
 {
     "message": "your response to the user",
     "action": null | "edit_output" | "update_context" | "update_brief",
-    "edited_content": "complete edited content (only if action=edit_output)" | null,
+    "edits": [{"find": "exact current text", "replace": "new text"}] | null,
+    "edited_content": "complete edited content (only for a full rewrite)" | null,
     "context_update": {"field": "value"} | null,
     "brief_update": {"field": "value"} | null
 }"""
 
+REWRITE_PROMPT = """Your edits could not be applied to CURRENT CONTENT ({reason}).
+Reply again with the same JSON, this time with "edits": null and the complete updated content in "edited_content"."""
+
+
+def apply_edits(text: str, edits: list) -> str:
+    """Apply search/replace edits to `text`; every "find" must match exactly one span.
+
+    Matches are located in the original text (an edit never sees another edit's
+    result) and must not overlap. When the exact text is missing, a match that
+    differs only in whitespace is accepted. Raises ValueError on the first bad edit.
+    """
+    spans = []
+    for i, edit in enumerate(edits, 1):
+        if (
+            not isinstance(edit, dict)
+            or not isinstance(edit.get("find"), str)
+            or not isinstance(edit.get("replace"), str)
+        ):
+            raise ValueError(f'edit {i} is not {{"find": string, "replace": string}}')
+        find = edit["find"]
+        if not find.strip():
+            raise ValueError(f'edit {i} has an empty "find"')
+        matches = _find_spans(text, find)
+        if len(matches) != 1:
+            raise ValueError(f'"find" of edit {i} ({find[:60]!r}) matches {len(matches)} times, expected once')
+        spans.append((*matches[0], edit["replace"]))
+
+    spans.sort()
+    for (_, end, _), (start, _, _) in pairwise(spans):
+        if start < end:
+            raise ValueError("edits overlap")
+
+    parts, pos = [], 0
+    for start, end, replace in spans:
+        parts += [text[pos:start], replace]
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _find_spans(text: str, find: str) -> list[tuple[int, int]]:
+    spans = [(m.start(), m.end()) for m in re.finditer(re.escape(find), text)]
+    if not spans:
+        pattern = r"\s+".join(re.escape(word) for word in find.split())
+        spans = [(m.start(), m.end()) for m in re.finditer(pattern, text)]
+    return spans
+
 
 class ChatService:
     def __init__(self):
@@ -32,6 +85,51 @@ class ChatService:
         self.llm = get_llm_adapter()
 
     async def chat(self, output_id: UUID, user_id: UUID, user_message: str) -> dict:
+        turn = self.start_turn(output_id, user_id, user_message)
+
+        # Call LLM
+        try:
+            response = await self.llm.generate(turn["messages"], temperature=0.5)
+        except Exception as e:
+            logger.error("LLM call failed | output=%s error=%s", output_id, str(e))
+            raise LLMException("Error generating response")
+
+        return await self._complete_turn(turn, response.content)
+
+    async def stream_turn(self, turn: dict) -> AsyncIterator[dict]:
+        """Run a turn prepared by start_turn, streaming the reply.
+
+        Yields "message_delta" events with the assistant message as it is
+        generated, then "completed" with the same payload as chat() (or "error").
+        """
+        output_id = turn["output"]["id"]
+        message_field = JsonFieldStream({"message"})
+        chunks = []
+        try:
+            async for delta in self.llm.stream(turn["messages"], temperature=0.5):
+                chunks.append(delta)
+                for _, text in message_field.feed(delta):
+                    yield {"type": "message_delta", "data": {"delta": text}}
+        except Exception as e:
+            logger.error("LLM stream failed | output=%s error=%s", output_id, str(e))
+            yield {"type": "error", "data": {"error": "Error generating response"}}
+            return
+
+        try:
+            result = await self._complete_turn(turn, "".join(chunks))
+        except LLMException as e:
+            logger.error("Chat turn failed | output=%s error=%s", output_id, e.detail)
+            yield {"type": "error", "data": {"error": e.detail}}
+            return
+        except Exception as e:
+            # DB and other errors must still close the stream with an error event
+            logger.error("Chat turn failed | output=%s error=%s", output_id, str(e))
+            yield {"type": "error", "data": {"error": "Error generating response"}}
+            return
+        yield {"type": "completed", "data": result}
+
+    def start_turn(self, output_id: UUID, user_id: UUID, user_message: str) -> dict:
+        """Load output, brief and context, save the user message and build the LLM messages."""
         logger.info("Chat request | output=%s user=%s", output_id, user_id)
 
         # Load output and context
@@ -84,15 +182,21 @@ BRIEF (name: {brief["name"]}):
             messages.append({"role": msg["role"], "content": msg["content"]})
         messages.append({"role": "user", "content": user_message})
 
-        # Call LLM
-        try:
-            response = await self.llm.generate(messages, temperature=0.5)
-        except Exception as e:
-            logger.error("LLM call failed | output=%s error=%s", output_id, str(e))
-            raise LLMException("Error generating response")
+        return {
+            "output": output,
+            "brief": brief,
+            "context": context,
+            "user_id": user_id,
+            "messages": messages,
+        }
+
+    async def _complete_turn(self, turn: dict, content: str) -> dict:
+        """Parse the LLM reply, apply its action and save the assistant message."""
+        output, brief, context = turn["output"], turn["brief"], turn["context"]
+        output_id, user_id = output["id"], turn["user_id"]
 
         # Robust JSON parsing with multiple fallback strategies
-        parsed = self._parse_llm_response(response.content)
+        parsed = self._parse_llm_response(content)
 
         action_type = parsed.get("action")
         action_data = {}
@@ -103,7 +207,10 @@ BRIEF (name: {brief["name"]}):
         # Execute action
         if action_type:
             logger.info("Chat action: %s | output=%s", action_type, output_id)
-        if action_type == "edit_output" and parsed.get("edited_content"):
+        edited_content, edit_mode = None, None
+        if action_type == "edit_output":
+            edited_content, edit_mode = await self._resolve_edit(turn, parsed, content)
+        if action_type == "edit_output" and edited_content:
             new_output = (
                 self.db.table("outputs")
                 .insert(
@@ -113,7 +220,7 @@ BRIEF (name: {brief["name"]}):
                         "user_id": str(user_id),
                         "output_type": output["output_type"],
                         "mime_type": output["mime_type"],
-                        "text_content": parsed["edited_content"],
+                        "text_content": edited_content,
                         "title": output.get("title"),
                         "version": output["version"] + 1,
                         "parent_output_id": str(output_id),
@@ -127,9 +234,9 @@ BRIEF (name: {brief["name"]}):
                 .data[0]
             )
             # Update the status of the original (root) output
-            root_id = output.get("parent_output_id") or str(output_id)
+            root_id = output.get("root_output_id") or output.get("parent_output_id") or str(output_id)
             self.db.table("outputs").update({"status": "adapted"}).eq("id", root_id).execute()
-            action_data = {"new_output_id": new_output["id"]}
+            action_data = {"new_output_id": new_output["id"], "edit_mode": edit_mode}
             updated_output = new_output
 
         elif action_type == "update_context" and parsed.get("context_update"):
@@ -159,7 +266,7 @@ BRIEF (name: {brief["name"]}):
                     "output_id": str(output_id),
                     "user_id": str(user_id),
                     "role": "assistant",
-                    "content": parsed.get("message", response.content),
+                    "content": parsed.get("message", content),
                     "action_type": action_type,
                     "action_data": action_data or None,
                 }
@@ -177,6 +284,45 @@ BRIEF (name: {brief["name"]}):
             "brief_changes": brief_changes,
         }
 
+    async def _resolve_edit(self, turn: dict, parsed: dict, reply: str) -> tuple[str | None, str | None]:
+        """New text_content for edit_output and how it was obtained ("patch" or "rewrite").
+
+        Edits are applied to the current text_content; if they don't apply, the
+        reply's edited_content is used, or the model is asked once for a full rewrite.
+        """
+        output_id = turn["output"]["id"]
+        edits = parsed.get("edits")
+        if not edits:
+            return parsed.get("edited_content"), "rewrite"
+
+        if not isinstance(edits, list):
+            edits = [edits]
+        current = turn["output"].get("text_content") or ""
+        try:
+            edited = apply_edits(current, edits)
+        except ValueError as e:
+            logger.warning("Chat edits not applicable | output=%s reason=%s", output_id, str(e))
+            if parsed.get("edited_content"):
+                return parsed["edited_content"], "rewrite"
+            return await self._rewrite_content(turn, reply, str(e)), "rewrite"
+
+        logger.info("Chat edits applied | output=%s edits=%d", output_id, len(edits))
+        return edited, "patch"
+
+    async def _rewrite_content(self, turn: dict, reply: str, reason: str) -> str | None:
+        """Fallback to a full rewrite when the proposed edits don't match the content."""
+        messages = [
+            *turn["messages"],
+            {"role": "assistant", "content": reply},
+            {"role": "user", "content": REWRITE_PROMPT.format(reason=reason)},
+        ]
+        try:
+            response = await self.llm.generate(messages, temperature=0.5)
+        except Exception as e:
+            logger.error("LLM rewrite failed | output=%s error=%s", turn["output"]["id"], str(e))
+            raise LLMException("Error generating response")
+        return self._parse_llm_response(response.content).get("edited_content")
+
     def _parse_llm_response(self, content: str) -> dict:
         """Parse LLM JSON response with multiple fallback strategies."""
         VALID_ACTIONS = {"edit_output", "update_context", "update_brief", None}
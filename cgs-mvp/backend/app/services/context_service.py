@@ -1,17 +1,21 @@
 import csv
 import io
-from typing import Any
-from uuid import UUID
+from typing import Any, BinaryIO
+from uuid import UUID, uuid4
 
 import structlog
 
 from app.config.supabase import get_supabase_admin
 from app.db.repositories.context_item_repo import ContextItemRepository
 from app.db.repositories.context_repo import ContextRepository
-from app.exceptions import ConflictException, NotFoundException
+from app.exceptions import NotFoundException
+from app.services.context_tree import get_context_tree, nest_items
 
 logger = structlog.get_logger("cgs-mvp.context")
 
+# Righe per insert in staging durante l'import CSV
+IMPORT_BATCH_SIZE = 2000
+
 
 class ContextService:
     def __init__(self):
@@ -122,59 +126,68 @@ class ContextService:
             Created context with all cards
 
         Raises:
-            ValidationError: If template structure is invalid
             ConflictException: If context with same brand_name already exists
         """
-        repo = ContextRepository(self.db)
+        return self.import_bundle(user_id, [template_data])[0]
 
-        # Extract context metadata
-        context_data = template_data["context"]
-        context_data["user_id"] = str(user_id)
-        context_data["status"] = "active"
-
-        # Check for duplicate brand_name
-        existing = repo.list_by_user(user_id)
-        if any(c["brand_name"] == context_data["brand_name"] for c in existing):
-            raise ConflictException(f"Context with brand_name '{context_data['brand_name']}' already exists")
-
-        # Create context
-        context = repo.create(context_data)
-        context_id = context["id"]
-
-        # Create cards
-        cards_created = []
-        for card_data in template_data["cards"]:
-            card = {
-                "context_id": context_id,
-                "card_type": card_data["card_type"],
-                "title": card_data["title"],
-                "subtitle": card_data.get("subtitle"),
-                "content": card_data["content"],
-                "sort_order": card_data.get("sort_order", 0),
-                "is_visible": card_data.get("is_visible", True),
-            }
-            created_card = self.db.table("cards").insert(card).execute()
-            cards_created.append(created_card.data[0])
+    def import_bundle(self, user_id: UUID, templates: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Import several context templates at once: all of them with their cards, or none.
+
+        Duplicate brand_names are rejected by the unique (user_id, brand_name)
+        index, both against existing contexts and within the bundle.
+
+        Returns:
+            One {context, cards, cards_count} per template, in order
+
+        Raises:
+            ConflictException: If any brand_name already exists
+        """
+        entries = [
+            {"context": {**template["context"], "status": "active"}, "cards": template["cards"]}
+            for template in templates
+        ]
+        created = ContextRepository(self.db).create_with_cards(user_id, entries)
 
         logger.info(
-            "Context imported from template | user=%s context=%s cards=%d", user_id, context_id, len(cards_created)
+            "Contexts imported from template | user=%s contexts=%d cards=%d",
+            user_id,
+            len(created),
+            sum(len(c["cards"]) for c in created),
         )
-
-        return {"context": context, "cards": cards_created, "cards_count": len(cards_created)}
+        return [{**c, "cards_count": len(c["cards"])} for c in created]
 
     # ─── Context Items (hierarchical data) ───────────────
 
-    def get_context_items(self, context_id: UUID, user_id: UUID) -> list:
-        """Lista piatta di tutti gli items di un contesto."""
+    def get_context_items(
+        self,
+        context_id: UUID,
+        user_id: UUID,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list, str | None]:
+        """Lista piatta degli items di un contesto (senza content salvo ?fields=content; paginata se limit/cursor)."""
         self.get(context_id, user_id)  # ownership check
         repo = ContextItemRepository(self.db)
-        return repo.list_by_context(context_id)
+        return repo.page_by_context(context_id, limit, cursor, fields)
+
+    def get_context_items_tree(
+        self, context_id: UUID, user_id: UUID, root_id: UUID | None = None, max_depth: int | None = None
+    ) -> list:
+        """Albero annidato degli items di un contesto, o del sottoalbero di root_id; max_depth è relativo alla radice."""
+        context = self.get(context_id, user_id)  # ownership check
+        if root_id is None and max_depth is None:
+            return get_context_tree(self.db, context).nested()
 
-    def get_context_items_tree(self, context_id: UUID, user_id: UUID) -> list:
-        """Albero annidato di tutti gli items di un contesto."""
-        self.get(context_id, user_id)  # ownership check
         repo = ContextItemRepository(self.db)
-        return repo.get_tree(context_id)
+        if root_id is None:
+            return nest_items(repo.list_by_context(context_id, max_depth))
+        root = repo.get_node(context_id, root_id)
+        if not root:
+            raise NotFoundException("Context item not found")
+        limit = root["depth"] + max_depth if max_depth is not None else None
+        return nest_items(repo.list_subtree(context_id, root["path"], limit))
 
     def create_context_item(self, context_id: UUID, user_id: UUID, data: dict) -> dict:
         """Crea un singolo nodo nell'albero del contesto."""
@@ -207,88 +220,108 @@ class ContextService:
         repo = ContextItemRepository(self.db)
         repo.delete(item_id)
 
-    def import_context_items_from_csv(self, context_id: UUID, user_id: UUID, csv_content: str) -> list:
+    def import_context_items_from_csv(self, context_id: UUID, user_id: UUID, csv_file: BinaryIO) -> int:
         """
         Importa dati gerarchici da un CSV con colonne:
         Level 0, Level 1, Level 2, Level 3, Contenuto
 
-        Ogni riga viene parsificata creando nodi nell'albero.
-        I nodi duplicati (stesso nome sotto lo stesso genitore) non vengono ricreati.
+        Il file viene letto in streaming e l'albero costruito in memoria
+        (nodi duplicati — stesso nome sotto lo stesso genitore — non vengono
+        ricreati). I nodi vengono scritti in staging a batch e sostituiscono
+        quelli esistenti in un'unica transazione: se l'import fallisce, gli
+        items precedenti restano intatti. Ritorna il numero di items importati.
         """
         self.get(context_id, user_id)  # ownership check
         repo = ContextItemRepository(self.db)
 
-        # Prova diverse codifiche
-        try:
-            reader = csv.DictReader(io.StringIO(csv_content))
-        except Exception as e:
-            raise ValueError(f"Cannot parse CSV: {e}")
-
-        # Valida colonne
-        fieldnames = reader.fieldnames or []
-        # Supporta sia colonne italiane che inglesi
-        level_columns = []
-        content_column = None
-
-        for col in fieldnames:
-            col_stripped = col.strip()
-            if col_stripped.startswith("Level "):
-                level_columns.append(col)
-            elif col_stripped.lower() in ("contenuto", "content"):
-                content_column = col
-
-        if not level_columns:
-            raise ValueError(f"CSV must have 'Level 0', 'Level 1', etc. columns. Found: {fieldnames}")
-        if not content_column:
-            raise ValueError(f"CSV must have a 'Contenuto' or 'Content' column. Found: {fieldnames}")
+        nodes = _parse_csv_tree(csv_file)
+        logger.info("CSV import | context=%s items=%d", context_id, len(nodes))
 
-        # Ordina level columns per numero
-        level_columns.sort(key=lambda c: int(c.strip().replace("Level ", "")))
-        max_levels = len(level_columns)
-
-        # Cancella items precedenti per questo contesto (re-import)
-        repo.delete_by_context(context_id)
-
-        # Traccia nodi esistenti: chiave = (parent_id, name) → item_id
-        existing_nodes: dict[tuple, str] = {}
-        sort_counter = 0
-
-        rows = list(reader)
-        logger.info("CSV import | context=%s rows=%d levels=%d", context_id, len(rows), max_levels)
+        import_id = uuid4()
+        try:
+            for i in range(0, len(nodes), IMPORT_BATCH_SIZE):
+                repo.stage_import(import_id, nodes[i : i + IMPORT_BATCH_SIZE])
+            count = repo.commit_import(context_id, import_id)
+        except Exception:
+            repo.discard_import(import_id)
+            raise
+
+        logger.info("CSV import completed | context=%s items_created=%d", context_id, count)
+        return count
+
+
+def _parse_csv_tree(csv_file: BinaryIO) -> list[dict]:
+    """Legge il CSV (UTF-8, con fallback Latin-1) e ritorna i nodi dell'albero con id già assegnati."""
+    for encoding in ("utf-8-sig", "latin-1"):
+        csv_file.seek(0)
+        text = io.TextIOWrapper(csv_file, encoding=encoding, newline="")
+        try:
+            return _build_tree(csv.DictReader(text))
+        except UnicodeDecodeError:
+            continue
+        finally:
+            text.detach()  # il file resta aperto per il chiamante
+    raise ValueError("Cannot decode CSV file. Try saving it as UTF-8.")
 
-        for row in rows:
-            current_parent_id = None
 
-            for _i, col in enumerate(level_columns):
+def _build_tree(reader: csv.DictReader) -> list[dict]:
+    # Valida colonne
+    try:
+        fieldnames = reader.fieldnames or []
+    except csv.Error as e:
+        raise ValueError(f"Cannot parse CSV: {e}")
+    # Supporta sia colonne italiane che inglesi
+    level_columns = []
+    content_column = None
+
+    for col in fieldnames:
+        col_stripped = col.strip()
+        if col_stripped.startswith("Level "):
+            level_columns.append(col)
+        elif col_stripped.lower() in ("contenuto", "content"):
+            content_column = col
+
+    if not level_columns:
+        raise ValueError(f"CSV must have 'Level 0', 'Level 1', etc. columns. Found: {fieldnames}")
+    if not content_column:
+        raise ValueError(f"CSV must have a 'Contenuto' or 'Content' column. Found: {fieldnames}")
+
+    # Ordina level columns per numero
+    try:
+        levels = sorted((int(c.strip().replace("Level ", "")), c) for c in level_columns)
+    except ValueError:
+        raise ValueError(f"Invalid level column. Found: {level_columns}")
+
+    # Traccia nodi: chiave = (parent_id, name) → nodo
+    nodes: dict[tuple, dict] = {}
+
+    try:
+        for row in reader:
+            current = None
+
+            for level_num, col in levels:
                 value = (row.get(col) or "").strip()
                 if not value:
                     break  # nessun livello più profondo in questa riga
 
-                level_num = int(col.strip().replace("Level ", ""))
-                node_key = (current_parent_id, value)
-
-                if node_key not in existing_nodes:
-                    # Crea nuovo nodo
-                    item = repo.create(
-                        {
-                            "context_id": str(context_id),
-                            "parent_id": current_parent_id,
-                            "level": level_num,
-                            "name": value,
-                            "content": None,  # contenuto viene aggiunto dopo
-                            "sort_order": sort_counter,
-                        }
-                    )
-                    existing_nodes[node_key] = item["id"]
-                    sort_counter += 1
-
-                current_parent_id = existing_nodes[node_key]
-
-            # Dopo aver trovato/creato il nodo più profondo, aggiungi il contenuto
+                parent_id = current["id"] if current else None
+                node_key = (parent_id, value)
+                if node_key not in nodes:
+                    nodes[node_key] = {
+                        "id": str(uuid4()),
+                        "parent_id": parent_id,
+                        "level": level_num,
+                        "name": value,
+                        "content": None,
+                        "sort_order": len(nodes),
+                    }
+                current = nodes[node_key]
+
+            # Il contenuto va sul nodo più profondo della riga (l'ultimo vince)
             content_value = (row.get(content_column) or "").strip()
-            if current_parent_id and content_value:
-                repo.update(UUID(current_parent_id), {"content": content_value})
+            if current and content_value:
+                current["content"] = content_value
+    except csv.Error as e:
+        raise ValueError(f"Cannot parse CSV line {reader.line_num}: {e}")
 
-        items = repo.list_by_context(context_id)
-        logger.info("CSV import completed | context=%s items_created=%d", context_id, len(items))
-        return items
+    return list(nodes.values())
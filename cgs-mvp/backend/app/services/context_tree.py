@@ -0,0 +1,124 @@
+"""
+Albero dei context items costruito dal materialized path.
+
+context_items.path ordina i nodi in profondità (genitore prima dei figli,
+fratelli per sort_order): un solo SELECT ... ORDER BY path basta per
+annidarli o renderizzarli nel prompt, senza ricostruire l'albero a ogni
+chiamata. Ogni scrittura sugli items incrementa contexts.items_version, quindi
+ContextTreeCache tiene l'albero serializzato per (context_id, items_version):
+una versione nuova è semplicemente una chiave diversa, nessuna invalidazione
+tra worker.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import lru_cache
+
+from app.config.settings import get_settings
+from app.db.repositories.context_item_repo import ContextItemRepository
+
+
+def nest_items(items: list[dict]) -> list[dict]:
+    """Annida una lista di items in ordine di path: ritorna le radici, ognuna con `children`."""
+    by_id: dict[str, dict] = {}
+    roots = []
+    for item in items:
+        node = by_id[item["id"]] = {**item, "children": []}
+        parent = by_id.get(item.get("parent_id"))
+        if parent is not None:
+            parent["children"].append(node)
+        else:
+            roots.append(node)
+    return roots
+
+
+def render_items(items: list[dict]) -> str:
+    """Markdown dell'albero per il prompt: un heading per nodo (### → ######) seguito dal contenuto."""
+    if not items:
+        return ""
+    base_depth = min(item["depth"] for item in items)
+    lines = []
+    for item in items:
+        lines.append(f"{'#' * min(item['depth'] - base_depth + 3, 6)} {item['name']}")
+        if item.get("content"):
+            lines.append(item["content"])
+            lines.append("")
+    return "\n".join(lines)
+
+
+class ContextTree:
+    """Items di un contesto in ordine di path, con albero annidato e markdown calcolati una volta sola."""
+
+    def __init__(self, items: list[dict]):
+        self.items = items
+        self._nested: list[dict] | None = None
+        self._rendered: dict[tuple[str, ...] | None, str] = {}
+        self._name_paths: dict[str, tuple[str, ...]] | None = None
+
+    def nested(self) -> list[dict]:
+        if self._nested is None:
+            self._nested = nest_items(self.items)
+        return self._nested
+
+    def render(self, scope: tuple[str, ...] | None = None) -> str:
+        """Markdown dell'albero, o solo dei sottoalberi in `scope` (path per nome, es. "Prodotti/Linea A")."""
+        if scope not in self._rendered:
+            self._rendered[scope] = render_items(self.items if scope is None else self.select(scope))
+        return self._rendered[scope]
+
+    def select(self, scope: tuple[str, ...]) -> list[dict]:
+        """Items dei sottoalberi in `scope`; gli antenati restano come intestazioni, senza contenuto."""
+        if self._name_paths is None:
+            by_id = {}
+            for item in self.items:
+                by_id[item["id"]] = by_id.get(item.get("parent_id"), ()) + (item["name"].strip(),)
+            self._name_paths = by_id
+
+        roots = [tuple(part.strip() for part in path.split("/") if part.strip()) for path in scope]
+        selected = []
+        for item in self.items:
+            name_path = self._name_paths[item["id"]]
+            if any(name_path[: len(root)] == root for root in roots):
+                selected.append(item)
+            elif any(root[: len(name_path)] == name_path for root in roots):
+                selected.append({**item, "content": None})
+        return selected
+
+
+class ContextTreeCache:
+    """LRU di processo degli alberi, per (context_id, items_version)."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._items: OrderedDict[tuple[str, int], ContextTree] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, context_id: str, version: int, load: Callable[[], list[dict]]) -> ContextTree:
+        """Albero della versione richiesta; `load` legge gli items (ordinati per path) solo se manca."""
+        key = (str(context_id), version)
+        with self._lock:
+            tree = self._items.get(key)
+            if tree is not None:
+                self._items.move_to_end(key)
+                return tree
+        tree = ContextTree(load())
+        with self._lock:
+            self._items[key] = tree
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return tree
+
+
+@lru_cache
+def get_context_tree_cache() -> ContextTreeCache:
+    return ContextTreeCache(get_settings().context_tree_cache_size)
+
+
+def get_context_tree(db, context: dict) -> ContextTree:
+    """Albero corrente di un contesto, dalla riga `contexts` già letta (serve items_version)."""
+    repo = ContextItemRepository(db)
+    return get_context_tree_cache().get(
+        context["id"], context["items_version"], lambda: repo.list_by_context(context["id"])
+    )
@@ -0,0 +1,239 @@
+"""
+Document ingestion for RAG.
+
+After upload, a document's file is downloaded, its text is extracted (PDF,
+DOCX, TXT), split into overlapping chunks and embedded in batches into
+document_chunks. Runs then inject only the chunks most similar to the
+topic (WorkflowService._build_execution_context).
+
+The work is keyed by the file's content hash (document_blobs, per user): a
+file a user uploaded to several contexts/briefs is processed once and every
+document referencing it gets the same result.
+
+Images and legacy .doc files have no text to extract: they are marked
+`skipped`. Failures are recorded (`failed` + ingestion_error) and never
+raised.
+
+Ingest pending / failed files (and hash documents uploaded before
+de-duplication, moving their existing chunks to the blob) with:
+
+    python -m app.services.document_ingestion
+"""
+
+import asyncio
+import hashlib
+import io
+import re
+from uuid import UUID
+
+import structlog
+
+from app.config.settings import get_settings
+from app.config.supabase import get_supabase_admin
+from app.db.repositories.document_blob_repo import DOCUMENT_TABLES, DocumentBlobRepository
+from app.db.repositories.document_chunk_repo import DocumentChunkRepository
+from app.infrastructure.llm.embeddings import get_embedding_client
+from app.infrastructure.storage.supabase_storage import StorageService
+
+logger = structlog.get_logger("cgs-mvp.document_ingestion")
+
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+CHUNK_CHARS = 3200  # ~800 token
+CHUNK_OVERLAP_CHARS = 200
+MAX_CHUNKS_PER_DOCUMENT = 500
+BACKFILL_PAGE_SIZE = 100
+
+# A claim older than this is considered abandoned (crashed worker) and retaken
+CLAIM_TIMEOUT_SECONDS = 900
+
+# Blob ingestion state copied to each document (shown in document lists)
+_PUBLISHED_COLUMNS = ("ingestion_status", "ingestion_error", "chunk_count", "text_content")
+
+
+def extract_text(data: bytes, mime_type: str) -> str | None:
+    """Plain text of a document, or None if the type has no extractable text."""
+    if mime_type == "text/plain":
+        return data.decode("utf-8", errors="replace")
+    if mime_type == "application/pdf":
+        from pypdf import PdfReader
+
+        reader = PdfReader(io.BytesIO(data))
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+    if mime_type == DOCX_MIME_TYPE:
+        from docx import Document
+
+        document = Document(io.BytesIO(data))
+        return "\n\n".join(p.text for p in document.paragraphs)
+    return None
+
+
+def chunk_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP_CHARS) -> list[str]:
+    """Pack paragraphs into chunks of at most `size` chars; consecutive chunks share up to `overlap` chars."""
+    chunks: list[str] = []
+    current = ""
+    for paragraph in (p.strip() for p in re.split(r"\n\s*\n", text)):
+        if not paragraph:
+            continue
+        # Paragraphs longer than a chunk are cut on a hard boundary
+        while len(paragraph) > size:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:size])
+            paragraph = paragraph[size - overlap :]
+        if current and len(current) + len(paragraph) + 2 > size:
+            chunks.append(current)
+            # Carry only as much overlap as still fits next to the paragraph
+            keep = min(overlap, size - len(paragraph) - 2)
+            current = f"{current[-keep:]}\n\n{paragraph}" if keep > 0 else paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class DocumentIngestionService:
+    def __init__(self):
+        self.db = get_supabase_admin()
+        self.settings = get_settings()
+        self.storage = StorageService()
+        self.blobs = DocumentBlobRepository(self.db)
+        self.chunks = DocumentChunkRepository(self.db)
+
+    async def ingest(self, document_table: str, document_id: UUID) -> int:
+        """Ingest a document's file (once per unique content). Used as a background task after upload."""
+        try:
+            doc = (
+                self.db.table(document_table)
+                .select("id, user_id, file_path, mime_type, content_hash, ingestion_status, chunk_count, text_content")
+                .eq("id", str(document_id))
+                .single()
+                .execute()
+                .data
+            )
+            data = None
+            sha256 = doc["content_hash"]
+            if not sha256:
+                sha256, data = await self._register_legacy(document_table, doc)
+            return await self.ingest_blob(doc["user_id"], sha256, data)
+        except Exception as e:
+            # Background task: never raise. The document stays `failed` and the backfill retries it.
+            logger.error("Document ingestion failed | doc=%s error=%s", str(document_id), str(e))
+            try:
+                self.db.table(document_table).update(
+                    {"ingestion_status": "failed", "ingestion_error": str(e)[:1000]}
+                ).eq("id", str(document_id)).execute()
+            except Exception:
+                pass  # document deleted meanwhile
+            return 0
+
+    async def ingest_blob(self, user_id: UUID | str, sha256: str, data: bytes | None = None) -> int:
+        """Extract, chunk and embed one unique file, then publish the result to every document using it."""
+        if not self.blobs.claim_ingestion(user_id, sha256, CLAIM_TIMEOUT_SECONDS):
+            # Already done (documents uploaded since just take the result) or running in another worker,
+            # which publishes to this document too when it finishes
+            blob = self.blobs.get(user_id, sha256)
+            if blob and blob["ingestion_status"] in ("ready", "skipped"):
+                self._publish(user_id, sha256, blob)
+            return 0
+
+        self._publish(user_id, sha256, {"ingestion_status": "processing", "ingestion_error": None})
+        try:
+            state = await self._process(user_id, sha256, data)
+        except Exception as e:
+            logger.error("Blob ingestion failed | sha256=%s error=%s", sha256, str(e))
+            state = {"ingestion_status": "failed", "ingestion_error": str(e)[:1000]}
+        self.blobs.set_ingestion(user_id, sha256, state)
+        self._publish(user_id, sha256, state)
+        return state.get("chunk_count", 0)
+
+    async def backfill(self, page_size: int = BACKFILL_PAGE_SIZE) -> int:
+        """Ingest documents uploaded before de-duplication, then every pending or failed blob."""
+        total = 0
+        for table in DOCUMENT_TABLES:
+            after_id = None
+            while True:
+                query = self.db.table(table).select("id").is_("content_hash", "null")
+                if after_id:
+                    query = query.gt("id", after_id)
+                rows = query.order("id").limit(page_size).execute().data
+                if not rows:
+                    break
+                for row in rows:
+                    total += await self.ingest(table, UUID(row["id"]))
+                after_id = rows[-1]["id"]
+
+        cursor = None
+        while True:
+            rows, cursor = self.blobs.list_pending(page_size, cursor)
+            for row in rows:
+                total += await self.ingest_blob(row["user_id"], row["sha256"])
+            if cursor is None:
+                break
+        logger.info("Document ingestion backfill completed | chunks=%d", total)
+        return total
+
+    async def _process(self, user_id: UUID | str, sha256: str, data: bytes | None) -> dict:
+        blob = self.blobs.get(user_id, sha256)
+        if data is None:
+            data = await self.storage.download_file(blob["storage_path"], self.settings.document_bucket)
+        text = await asyncio.to_thread(extract_text, data, blob["mime_type"])
+        # Postgres TEXT non accetta NUL (frequenti nei PDF)
+        text = (text or "").replace("\x00", "").strip()
+        if not text:
+            logger.info("Document has no extractable text | sha256=%s mime=%s", sha256, blob["mime_type"])
+            return {"ingestion_status": "skipped", "ingestion_error": None, "chunk_count": 0}
+
+        pieces = chunk_text(text)[:MAX_CHUNKS_PER_DOCUMENT]
+        vectors = await get_embedding_client().embed_batch(pieces)
+        stored = self.chunks.replace_for_blob(
+            user_id,
+            sha256,
+            [
+                {"chunk_index": i, "content": piece, "token_count": len(piece) // 4, "embedding": vector}
+                for i, (piece, vector) in enumerate(zip(pieces, vectors, strict=True))
+            ],
+        )
+        logger.info("Document ingested | sha256=%s chunks=%d", sha256, stored)
+        return {"ingestion_status": "ready", "ingestion_error": None, "chunk_count": stored, "text_content": text}
+
+    async def _register_legacy(self, document_table: str, doc: dict) -> tuple[str, bytes]:
+        """Hash a document uploaded before de-duplication and point it at its blob.
+
+        Chunks the document already has (ingested per document) move to the
+        blob when it is new; if the user already has the blob they are dropped.
+        """
+        data = await self.storage.download_file(doc["file_path"], self.settings.document_bucket)
+        sha256 = hashlib.sha256(data).hexdigest()
+        path, created = self.blobs.acquire(doc["user_id"], sha256, doc["file_path"], len(data), doc["mime_type"])
+        if created and doc.get("ingestion_status") == "ready":
+            self.chunks.adopt_document_chunks(document_table, doc["id"], sha256)
+            self.blobs.set_ingestion(
+                doc["user_id"],
+                sha256,
+                {
+                    "ingestion_status": "ready",
+                    "ingestion_error": None,
+                    "chunk_count": doc["chunk_count"],
+                    "text_content": doc.get("text_content"),
+                },
+            )
+        else:
+            self.chunks.delete_for_document(document_table, doc["id"])
+        self.db.table(document_table).update({"content_hash": sha256, "file_path": path}).eq("id", doc["id"]).execute()
+        if path != doc["file_path"]:
+            # Same bytes already stored for another document: this copy is redundant
+            await self.storage.delete_file(doc["file_path"], self.settings.document_bucket)
+        return sha256, data
+
+    def _publish(self, user_id: UUID | str, sha256: str, state: dict) -> None:
+        """Copy the blob's ingestion state to every document referencing it."""
+        update = {k: state[k] for k in _PUBLISHED_COLUMNS if k in state}
+        for table in DOCUMENT_TABLES:
+            self.db.table(table).update(update).eq("user_id", str(user_id)).eq("content_hash", sha256).execute()
+
+
+if __name__ == "__main__":
+    asyncio.run(DocumentIngestionService().backfill())
@@ -3,20 +3,23 @@ Document service for handling file uploads to contexts and briefs.
 Manages validation, storage, and database operations.
 """
 
+import asyncio
+from dataclasses import replace
 from typing import Any
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import structlog
 from fastapi import UploadFile
 
 from app.config.settings import get_settings
 from app.config.supabase import get_supabase_admin
+from app.db.repositories.document_blob_repo import DocumentBlobRepository
 from app.db.repositories.document_repo import (
     BriefDocumentRepository,
     ContextDocumentRepository,
 )
 from app.exceptions import NotFoundException, ValidationException
-from app.infrastructure.storage.supabase_storage import StorageService
+from app.infrastructure.storage.supabase_storage import StorageService, StreamedUpload, UploadTooLargeError
 
 logger = structlog.get_logger("cgs-mvp.documents")
 
@@ -31,6 +34,11 @@ ALLOWED_MIME_TYPES = {
     "image/webp",
 }
 
+# Unreferenced blobs touched more recently than this are kept (by both the global
+# sweep and single releases): they may belong to an upload that has not inserted
+# its document row yet
+BLOB_RELEASE_GRACE_SECONDS = 300
+
 
 class DocumentService:
     """Service for managing document uploads and retrieval."""
@@ -39,38 +47,84 @@ class DocumentService:
         self.db = get_supabase_admin()
         self.settings = get_settings()
         self.storage = StorageService()
+        self.blobs = DocumentBlobRepository(self.db)
 
-    def _validate_file(self, file: UploadFile) -> int:
+    def _validate_file(self, file: UploadFile) -> None:
         """
-        Validate file type and size.
+        Validate file type. The size limit is enforced while streaming (_store).
 
         Args:
             file: The uploaded file to validate
 
-        Returns:
-            int: File size in bytes
-
         Raises:
-            ValidationException: If file type or size is invalid
+            ValidationException: If file type is invalid
         """
-        # Validate MIME type
         if file.content_type not in ALLOWED_MIME_TYPES:
             raise ValidationException(
                 f"File type '{file.content_type}' not allowed. Supported types: PDF, DOCX, DOC, TXT, PNG, JPEG, WEBP"
             )
 
-        # Check file size
-        file.file.seek(0, 2)  # Seek to end
-        size = file.file.tell()
-        file.file.seek(0)  # Reset to beginning
+    async def _store(self, file: UploadFile, user_id: UUID) -> StreamedUpload:
+        """
+        Stream the upload to storage and de-duplicate it by content hash.
+
+        The file is streamed in fixed-size chunks (constant memory per upload)
+        to a fresh path under the user's prefix. If the user already stored a
+        blob with the same SHA-256, the new copy is deleted and that one is
+        referenced instead (blobs are never shared across users).
 
-        max_size = self.settings.max_upload_size_mb * 1024 * 1024
-        if size > max_size:
-            raise ValidationException(
-                f"File too large ({size / 1024 / 1024:.1f}MB). Maximum allowed: {self.settings.max_upload_size_mb}MB"
+        Returns:
+            StreamedUpload with the (shared) storage path, size in bytes and SHA-256
+
+        Raises:
+            ValidationException: If the file exceeds max_upload_size_mb
+        """
+        try:
+            upload = await self.storage.upload_stream(
+                user_id=user_id,
+                stream=file,
+                file_name=f"blobs/{uuid4()}",
+                content_type=file.content_type,
+                bucket="documents",
+                max_bytes=self.settings.max_upload_size_mb * 1024 * 1024,
             )
+        except UploadTooLargeError:
+            raise ValidationException(
+                f"File too large. Maximum allowed: {self.settings.max_upload_size_mb}MB"
+            ) from None
+
+        path, created = self.blobs.acquire(user_id, upload.sha256, upload.path, upload.size, file.content_type)
+        if not created:
+            await self.storage.delete_file(upload.path, bucket="documents")
+            logger.info("Duplicate upload, reusing stored file", sha256=upload.sha256)
+        return replace(upload, path=path)
+
+    async def _release_file(self, doc: dict) -> None:
+        """Remove a deleted document's file unless another document still shares it."""
+        if not doc.get("content_hash"):
+            # Uploaded before de-duplication: the document owns its file
+            await self.storage.delete_file(doc["file_path"], bucket="documents")
+            return
+        paths = self.blobs.release(doc["user_id"], doc["content_hash"], grace_seconds=BLOB_RELEASE_GRACE_SECONDS)
+        await self.storage.delete_files(paths, bucket="documents")
+
+    async def purge_unreferenced_files(self) -> int:
+        """
+        Delete the blobs (row, chunks and storage object) no document references any more.
 
-        return size
+        Blobs are ref-counted by a DB trigger on the document tables, so this
+        also collects files orphaned by cascades (context or brief deletion).
+        Deleting a single document releases its own blob right away (_release_file),
+        unless an upload of the same file touched it within the grace period.
+
+        Returns:
+            Number of files deleted
+        """
+        paths = self.blobs.release_unreferenced(grace_seconds=BLOB_RELEASE_GRACE_SECONDS)
+        await self.storage.delete_files(paths, bucket="documents")
+        if paths:
+            logger.info("Unreferenced document files deleted", count=len(paths))
+        return len(paths)
 
     # ==================== CONTEXT DOCUMENTS ====================
 
@@ -98,7 +152,7 @@ class DocumentService:
             ValidationException: If file validation fails
         """
         # Validate file
-        size = self._validate_file(file)
+        self._validate_file(file)
 
         # Verify context ownership
         context = (
@@ -112,17 +166,8 @@ class DocumentService:
         if not context.data:
             raise NotFoundException("Context not found or access denied")
 
-        # Upload to storage
-        file_data = await file.read()
-        storage_path = f"{user_id}/contexts/{context_id}/{file.filename}"
-
-        path = await self.storage.upload_file(
-            user_id=user_id,
-            file_data=file_data,
-            file_name=storage_path,
-            content_type=file.content_type,
-            bucket="documents",
-        )
+        # Stream to storage
+        upload = await self._store(file, user_id)
 
         # Create database record
         doc = ContextDocumentRepository(self.db).create(
@@ -130,26 +175,39 @@ class DocumentService:
                 "context_id": str(context_id),
                 "user_id": str(user_id),
                 "file_name": file.filename,
-                "file_path": path,
-                "file_size_bytes": size,
+                "file_path": upload.path,
+                "file_size_bytes": upload.size,
                 "mime_type": file.content_type,
                 "description": description,
+                "content_hash": upload.sha256,
             }
         )
 
         logger.info("Context document uploaded", doc_id=doc["id"], context_id=str(context_id))
         return doc
 
-    def list_context_documents(self, context_id: UUID, user_id: UUID) -> list[dict[str, Any]]:
+    async def list_context_documents(
+        self,
+        context_id: UUID,
+        user_id: UUID,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+        include_download_url: bool = False,
+    ) -> tuple[list[dict[str, Any]], str | None]:
         """
-        List all documents for a context.
+        List documents for a context.
 
         Args:
             context_id: ID of the context
             user_id: ID of the user
+            limit: Page size (None = all documents)
+            cursor: Cursor returned by the previous page
+            fields: Optional heavy columns to include (e.g. text_content)
+            include_download_url: Add a signed `download_url` to each document
 
         Returns:
-            List of document records
+            Tuple of (document records, next page cursor or None)
 
         Raises:
             NotFoundException: If context not found or not owned by user
@@ -166,11 +224,14 @@ class DocumentService:
         if not context.data:
             raise NotFoundException("Context not found or access denied")
 
-        return ContextDocumentRepository(self.db).list_by_context(context_id)
+        items, next_cursor = ContextDocumentRepository(self.db).list_by_context(context_id, limit, cursor, fields)
+        if include_download_url:
+            await self._attach_download_urls(items)
+        return items, next_cursor
 
-    def delete_context_document(self, doc_id: UUID, user_id: UUID):
+    async def delete_context_document(self, doc_id: UUID, user_id: UUID):
         """
-        Delete a context document and its file.
+        Delete a context document and, if no other document shares it, its file.
 
         Args:
             doc_id: ID of the document
@@ -191,11 +252,9 @@ class DocumentService:
         if not doc.data:
             raise NotFoundException("Document not found or access denied")
 
-        # Delete from storage
-        self.storage.delete_file(doc.data["file_path"], bucket="documents")
-
-        # Delete from database
+        # Delete from database (releases the shared file), then from storage
         ContextDocumentRepository(self.db).delete(doc_id)
+        await self._release_file(doc.data)
         logger.info("Context document deleted", doc_id=str(doc_id))
 
     # ==================== BRIEF DOCUMENTS ====================
@@ -224,7 +283,7 @@ class DocumentService:
             ValidationException: If file validation fails
         """
         # Validate file
-        size = self._validate_file(file)
+        self._validate_file(file)
 
         # Verify brief ownership
         brief = (
@@ -233,17 +292,8 @@ class DocumentService:
         if not brief.data:
             raise NotFoundException("Brief not found or access denied")
 
-        # Upload to storage
-        file_data = await file.read()
-        storage_path = f"{user_id}/briefs/{brief_id}/{file.filename}"
-
-        path = await self.storage.upload_file(
-            user_id=user_id,
-            file_data=file_data,
-            file_name=storage_path,
-            content_type=file.content_type,
-            bucket="documents",
-        )
+        # Stream to storage
+        upload = await self._store(file, user_id)
 
         # Create database record
         doc = BriefDocumentRepository(self.db).create(
@@ -251,26 +301,39 @@ class DocumentService:
                 "brief_id": str(brief_id),
                 "user_id": str(user_id),
                 "file_name": file.filename,
-                "file_path": path,
-                "file_size_bytes": size,
+                "file_path": upload.path,
+                "file_size_bytes": upload.size,
                 "mime_type": file.content_type,
                 "description": description,
+                "content_hash": upload.sha256,
             }
         )
 
         logger.info("Brief document uploaded", doc_id=doc["id"], brief_id=str(brief_id))
         return doc
 
-    def list_brief_documents(self, brief_id: UUID, user_id: UUID) -> list[dict[str, Any]]:
+    async def list_brief_documents(
+        self,
+        brief_id: UUID,
+        user_id: UUID,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+        include_download_url: bool = False,
+    ) -> tuple[list[dict[str, Any]], str | None]:
         """
-        List all documents for a brief.
+        List documents for a brief.
 
         Args:
             brief_id: ID of the brief
             user_id: ID of the user
+            limit: Page size (None = all documents)
+            cursor: Cursor returned by the previous page
+            fields: Optional heavy columns to include (e.g. text_content)
+            include_download_url: Add a signed `download_url` to each document
 
         Returns:
-            List of document records
+            Tuple of (document records, next page cursor or None)
 
         Raises:
             NotFoundException: If brief not found or not owned by user
@@ -282,11 +345,14 @@ class DocumentService:
         if not brief.data:
             raise NotFoundException("Brief not found or access denied")
 
-        return BriefDocumentRepository(self.db).list_by_brief(brief_id)
+        items, next_cursor = BriefDocumentRepository(self.db).list_by_brief(brief_id, limit, cursor, fields)
+        if include_download_url:
+            await self._attach_download_urls(items)
+        return items, next_cursor
 
-    def delete_brief_document(self, doc_id: UUID, user_id: UUID):
+    async def delete_brief_document(self, doc_id: UUID, user_id: UUID):
         """
-        Delete a brief document and its file.
+        Delete a brief document and, if no other document shares it, its file.
 
         Args:
             doc_id: ID of the document
@@ -307,16 +373,20 @@ class DocumentService:
         if not doc.data:
             raise NotFoundException("Document not found or access denied")
 
-        # Delete from storage
-        self.storage.delete_file(doc.data["file_path"], bucket="documents")
-
-        # Delete from database
+        # Delete from database (releases the shared file), then from storage
         BriefDocumentRepository(self.db).delete(doc_id)
+        await self._release_file(doc.data)
         logger.info("Brief document deleted", doc_id=str(doc_id))
 
     # ==================== DOWNLOAD URLS ====================
 
-    def get_document_download_url(self, doc_id: UUID, user_id: UUID, doc_type: str) -> dict[str, str]:
+    async def _attach_download_urls(self, docs: list[dict[str, Any]]) -> None:
+        """Add `download_url` to each document with one batch signing call (cached URLs are reused)."""
+        urls = await self.storage.get_signed_urls([d["file_path"] for d in docs], bucket="documents")
+        for d in docs:
+            d["download_url"] = urls.get(d["file_path"])
+
+    async def get_document_download_url(self, doc_id: UUID, user_id: UUID, doc_type: str) -> dict[str, str]:
         """
         Get a signed URL for downloading a document.
 
@@ -345,5 +415,12 @@ class DocumentService:
         if not doc.data:
             raise NotFoundException("Document not found or access denied")
 
-        url = self.storage.get_signed_url(doc.data["file_path"], bucket="documents")
+        try:
+            url = await self.storage.get_signed_url(doc.data["file_path"], bucket="documents")
+        except FileNotFoundError:
+            raise NotFoundException("File not found in storage") from None
         return {"download_url": url}
+
+
+if __name__ == "__main__":
+    asyncio.run(DocumentService().purge_unreferenced_files())
@@ -0,0 +1,94 @@
+"""
+Archive embedding pipeline.
+
+Reviewed archive rows (approved / rejected) are embedded in the background
+so semantic search and the feedback loop can match them by meaning. The
+embedded text is the topic plus the latest version of the output; its hash
+is stored next to the vector, so unchanged rows are skipped and rows whose
+output changed (hash cleared by a DB trigger) are re-embedded.
+
+Backfill existing rows with:
+
+    python -m app.services.embedding_service
+"""
+
+import asyncio
+import hashlib
+from uuid import UUID
+
+import structlog
+
+from app.config.supabase import get_supabase_admin
+from app.db.repositories.archive_repo import ArchiveRepository
+from app.db.repositories.output_repo import OutputRepository
+from app.infrastructure.llm.embeddings import MAX_INPUT_CHARS, get_embedding_client
+from app.services.archive_index import get_archive_index_cache
+
+logger = structlog.get_logger("cgs-mvp.embedding")
+
+BACKFILL_PAGE_SIZE = 100
+
+
+class EmbeddingService:
+    def __init__(self):
+        self.db = get_supabase_admin()
+        self.client = get_embedding_client()
+        self.archive = ArchiveRepository(self.db)
+
+    async def embed_outputs(self, output_ids: list[UUID]) -> int:
+        """Embed the archive rows of the given (root) outputs. Used as a background task after review/edit."""
+        try:
+            return await self._embed_rows(self.archive.list_for_embedding(output_ids))
+        except Exception as e:
+            # Background task: never raise. Rows keep a NULL hash and the backfill picks them up.
+            logger.error("Embedding failed | outputs=%s error=%s", [str(o) for o in output_ids], str(e))
+            return 0
+
+    async def backfill(self, page_size: int = BACKFILL_PAGE_SIZE) -> int:
+        """Embed every reviewed row that is missing, stale or from another model."""
+        total = 0
+        after_id = None
+        while True:
+            rows = self.archive.list_pending_embeddings(self.client.model, after_id, page_size)
+            if not rows:
+                break
+            total += await self._embed_rows(rows)
+            after_id = rows[-1]["id"]
+        logger.info("Embedding backfill completed | embedded=%d", total)
+        return total
+
+    async def _embed_rows(self, rows: list[dict]) -> int:
+        if not rows:
+            return 0
+        latest = OutputRepository(self.db).get_latest_versions([UUID(r["output_id"]) for r in rows])
+
+        pending = []
+        for row in rows:
+            text = self._embedding_text(row, latest.get(row["output_id"]))
+            digest = hashlib.sha256(f"{self.client.model}\n{text}".encode()).hexdigest()
+            if row.get("embedding_hash") == digest and row.get("embedding_model") == self.client.model:
+                continue
+            pending.append((row["id"], text, digest))
+        if not pending:
+            return 0
+
+        vectors = await self.client.embed_batch([text for _, text, _ in pending])
+        items = [
+            {"id": row_id, "embedding": vector, "hash": digest, "model": self.client.model}
+            for (row_id, _, digest), vector in zip(pending, vectors, strict=True)
+        ]
+        updated = self.archive.set_embeddings(items)
+        index_cache = get_archive_index_cache()
+        for context_id in {row["context_id"] for row in rows}:
+            index_cache.invalidate(context_id)
+        logger.info("Archive embeddings stored | rows=%d skipped=%d", updated, len(rows) - len(pending))
+        return updated
+
+    @staticmethod
+    def _embedding_text(row: dict, output: dict | None) -> str:
+        content = (output or {}).get("text_content") or ""
+        return f"{row.get('topic') or ''}\n\n{content}"[:MAX_INPUT_CHARS]
+
+
+if __name__ == "__main__":
+    asyncio.run(EmbeddingService().backfill())
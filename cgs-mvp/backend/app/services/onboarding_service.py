@@ -1,15 +1,74 @@
+"""
+Onboarding: company research → clarifying questions → Context + 8 Cards.
+
+Both phases run as background jobs (FastAPI BackgroundTasks) so no request
+waits on Perplexity or the LLM. Progress lives on the onboarding_sessions
+row (state / progress / step) and is streamed by watch():
+
+    researching → questions_ready        (start + run_research)
+    processing  → completed | failed     (accept_answers + generate_context)
+
+Profile and card generation are independent LLM calls and run concurrently.
+A running session its job stopped updating (STALE_SESSION_SECONDS) is marked
+failed on the next read, so answers can be resubmitted.
+"""
+
+import asyncio
 import json
+import time
+from collections.abc import AsyncGenerator
+from datetime import UTC, datetime, timedelta
 from uuid import UUID, uuid4
 
 import structlog
 
 from app.config.supabase import get_supabase_admin
-from app.exceptions import ExternalServiceException
+from app.db.repositories.context_repo import ContextRepository
+from app.domain.enums import CardType
+from app.exceptions import ConflictException, NotFoundException
 from app.infrastructure.llm.factory import get_llm_adapter
 from app.infrastructure.tools.perplexity import PerplexityTool
+from app.services.research_cache import ResearchCache
 
 logger = structlog.get_logger("cgs-mvp.onboarding")
 
+# watch(): session polling interval and maximum stream duration
+POLL_INTERVAL_SECONDS = 1.0
+WATCH_TIMEOUT_SECONDS = 900
+
+# States where the running phase is over (the event stream closes)
+PHASE_END_STATES = ("questions_ready", "completed", "failed")
+
+# A background job (BackgroundTasks, not durable) that hasn't touched its session for this
+# long is considered lost, e.g. to a worker restart: the session is marked failed
+STALE_SESSION_SECONDS = 900
+RUNNING_STATES = ("researching", "processing")
+
+# States accept_answers may move to processing (failed = retry of a failed generation)
+ANSWERABLE_STATES = ("questions_ready", "failed")
+
+PROFILE_SCHEMA = """- company_info: {name, description, products, usp, values, industry}
+- audience_info: {primary_segment, secondary_segments, pain_points, demographics}
+- voice_info: {tone, personality, dos, donts, style_guidelines}
+- goals_info: {primary_goal, kpis, content_pillars}"""
+
+CARD_SCHEMAS = {
+    "product": "{valueProposition, features[], differentiators[], useCases[], performanceMetrics[]}",
+    "target": "{icpName, description, painPoints[], goals[], preferredLanguage, communicationChannels[]}",
+    "brand_voice": "{toneDescription, styleGuidelines[], dosExamples[], dontsExamples[], termsToUse[], termsToAvoid[]}",
+    "competitor": "{competitorName, positioning, keyMessages[], strengths[], weaknesses[], differentiationOpportunities[]}",
+    "topic": "{description, keywords[], angles[], relatedContent[], trends[]}",
+    "campaigns": "{objective, keyMessages[], tone, assets[], learnings[]}",
+    "performance": "{period, metrics[], topPerformingContent[], insights[]}",
+    "feedback": "{source, summary, details, actionItems[], priority}",
+}
+
+GENERATION_SYSTEM_PROMPT = (
+    "You are an expert business strategist. Generate detailed company profiles. "
+    "IMPORTANT: All generated content MUST be in English, regardless of the company's language or country. "
+    "Reply ONLY with valid JSON."
+)
+
 
 class OnboardingService:
     def __init__(self):
@@ -17,32 +76,99 @@ class OnboardingService:
         self.perplexity = PerplexityTool()
         self.llm = get_llm_adapter()
 
-    async def start(self, user_id: UUID, data: dict) -> dict:
-        """Start onboarding: research + generate questions."""
+    # ─── Session state ────────────────────────────────
+
+    def get_session(self, session_id: UUID, user_id: UUID) -> dict:
+        rows = (
+            self.db.table("onboarding_sessions")
+            .select("*")
+            .eq("id", str(session_id))
+            .eq("user_id", str(user_id))
+            .execute()
+            .data
+        )
+        if not rows:
+            raise NotFoundException("Onboarding session not found")
+        return self._expire_if_stale(rows[0])
+
+    def _expire_if_stale(self, session: dict) -> dict:
+        """Mark a running session failed if its job stopped updating it (crashed or restarted worker)."""
+        if session["state"] not in RUNNING_STATES or not session.get("updated_at"):
+            return session
+        stale_before = datetime.now(UTC) - timedelta(seconds=STALE_SESSION_SECONDS)
+        if datetime.fromisoformat(session["updated_at"]) >= stale_before:
+            return session
+        message = "Onboarding was interrupted, please retry"
+        expired = (
+            self.db.table("onboarding_sessions")
+            .update({"state": "failed", "error_message": message, "step": None})
+            .eq("id", session["id"])
+            .eq("state", session["state"])
+            .lt("updated_at", stale_before.isoformat())
+            .execute()
+            .data
+        )
+        if expired:
+            logger.warning("Onboarding session expired | session=%s state=%s", session["id"], session["state"])
+            return expired[0]
+        return session
+
+    def _update_session(self, session_id: UUID, **fields) -> None:
+        self.db.table("onboarding_sessions").update(fields).eq("id", str(session_id)).execute()
+
+    def _fail(self, session_id: UUID, message: str) -> None:
+        self._update_session(session_id, state="failed", error_message=message, step=None)
+
+    # ─── Phase 1: research + questions ────────────────
+
+    def start(self, user_id: UUID, data: dict) -> dict:
+        """Create the session; research and questions follow in run_research (background)."""
         logger.info("Onboarding start | user=%s brand=%s", user_id, data.get("brand_name"))
+        # The context is saved only after research and generation: reject a taken brand_name up front
+        if ContextRepository(self.db).brand_name_exists(user_id, data["brand_name"]):
+            raise ConflictException(f'A context for "{data["brand_name"]}" already exists')
         session_id = uuid4()
 
-        # Create session
         self.db.table("onboarding_sessions").insert(
             {
                 "id": str(session_id),
                 "user_id": str(user_id),
                 "session_type": "context",
                 "state": "researching",
+                "step": "research",
+                "progress": 0,
                 "initial_input": data,
             }
         ).execute()
 
-        # 1. Research with Perplexity
-        research_query = f"""Analyze the company "{data["brand_name"]}".
-        {"Website: " + data["website"] if data.get("website") else ""}
-        Provide: description, industry, products/services, target audience, competitors, tone of voice."""
+        return {"session_id": str(session_id), "state": "researching"}
 
+    async def run_research(self, session_id: UUID, user_id: UUID, data: dict) -> None:
+        """Background job: company research (cached), then clarifying questions (→ questions_ready)."""
         try:
-            research = await self.perplexity.search(research_query)
+            await self._run_research(session_id, user_id, data)
         except Exception as e:
-            logger.error("Perplexity research failed | session=%s error=%s", session_id, str(e))
-            raise ExternalServiceException("Company research error")
+            logger.error("Onboarding research failed | session=%s error=%s", session_id, str(e))
+            self._fail(session_id, f"Company research failed: {e}")
+
+    async def _run_research(self, session_id: UUID, user_id: UUID, data: dict) -> None:
+        # 1. Research with Perplexity, unless this company was researched recently
+        cache = ResearchCache()
+        research = cache.get(user_id, data["brand_name"], data.get("website"))
+        if research is None:
+            research_query = f"""Analyze the company "{data["brand_name"]}".
+            {"Website: " + data["website"] if data.get("website") else ""}
+            Provide: description, industry, products/services, target audience, competitors, tone of voice."""
+
+            try:
+                research = await self.perplexity.search(research_query)
+            except Exception as e:
+                logger.error("Perplexity research failed | session=%s error=%s", session_id, str(e))
+                self._fail(session_id, "Company research error")
+                return
+            cache.set(user_id, data["brand_name"], data.get("website"), research)
+
+        self._update_session(session_id, research_data={"raw": research}, step="questions", progress=60)
 
         # 2. Generate questions with LLM
         questions_prompt = f"""Based on this research:
@@ -53,162 +179,245 @@ Each question must have: id, question, type (select/text), options (if select),
 
 Reply in JSON: [{{"id":"q1","question":"...","type":"select","options":["A","B","C"],"required":true}}]"""
 
-        response = await self.llm.generate(
-            [
-                {
-                    "role": "system",
-                    "content": "You are a business analyst. Generate relevant questions. IMPORTANT: All questions and text MUST be in English. Reply ONLY with valid JSON.",
-                },
-                {"role": "user", "content": questions_prompt},
-            ]
-        )
-
-        # Safe parsing with retry
-        questions = self._safe_json_parse(response.content)
-        if questions is None:
-            # Retry with more explicit prompt
-            retry_response = await self.llm.generate(
+        try:
+            questions = await self._generate_json(
                 [
-                    {"role": "system", "content": "Reply EXCLUSIVELY with a valid JSON array, no additional text."},
-                    {"role": "user", "content": f"Convert to a valid JSON array:\n{response.content}"},
+                    {
+                        "role": "system",
+                        "content": "You are a business analyst. Generate relevant questions. IMPORTANT: All questions and text MUST be in English. Reply ONLY with valid JSON.",
+                    },
+                    {"role": "user", "content": questions_prompt},
                 ],
-                temperature=0.3,
+                retry_system="Reply EXCLUSIVELY with a valid JSON array, no additional text.",
+                retry_prompt="Convert to a valid JSON array:\n{content}",
             )
-            questions = self._safe_json_parse(retry_response.content)
-            if questions is None:
-                questions = []
+        except Exception as e:
+            logger.error("Question generation failed | session=%s error=%s", session_id, str(e))
+            self._fail(session_id, "Question generation error")
+            return
 
-        # Update session
-        self.db.table("onboarding_sessions").update(
-            {
-                "state": "questions_ready",
-                "research_data": {"raw": research},
-                "questions": questions,
-            }
-        ).eq("id", str(session_id)).execute()
+        self._update_session(session_id, state="questions_ready", questions=questions or [], step=None, progress=100)
+        logger.info("Onboarding questions ready | session=%s questions=%d", session_id, len(questions or []))
 
-        return {
-            "session_id": str(session_id),
-            "questions": questions,
-            "research_summary": research[:500],
-        }
+    # ─── Phase 2: context + cards ─────────────────────
+
+    def accept_answers(self, session_id: UUID, user_id: UUID, answers: dict) -> dict:
+        """Store the answers and move to `processing`; generate_context (background) does the rest."""
+        session = self.get_session(session_id, user_id)
+        if session["state"] == "processing":
+            raise ConflictException("Onboarding is already generating the context")
+        if session["state"] == "completed":
+            raise ConflictException("Onboarding already completed")
+        # research_data is written halfway through phase 1: only the state says the questions are out
+        if session["state"] not in ANSWERABLE_STATES or not session.get("research_data"):
+            raise ConflictException("Onboarding questions are not ready yet")
+
+        # Documented body is {answers: {...}}; a bare {q1: ...} map is accepted too
+        if isinstance(answers.get("answers"), dict):
+            answers = answers["answers"]
 
-    async def process_answers(self, session_id: UUID, user_id: UUID, answers: dict) -> dict:
-        """Process answers and create Context + 8 Cards."""
         logger.info("Processing answers | session=%s user=%s", session_id, user_id)
-        session = self.db.table("onboarding_sessions").select("*").eq("id", str(session_id)).single().execute()
-        session = session.data
+        # Conditional on the state just read: of two concurrent POSTs only one starts generate_context
+        claimed = (
+            self.db.table("onboarding_sessions")
+            .update(
+                {"state": "processing", "answers": answers, "step": "profile", "progress": 0, "error_message": None}
+            )
+            .eq("id", str(session_id))
+            .eq("state", session["state"])
+            .execute()
+            .data
+        )
+        if not claimed:
+            raise ConflictException("Onboarding is already generating the context")
+        return {"session_id": str(session_id), "state": "processing"}
 
-        # Update session state
-        self.db.table("onboarding_sessions").update(
-            {
-                "state": "processing",
-                "answers": answers,
-            }
-        ).eq("id", str(session_id)).execute()
+    async def generate_context(self, session_id: UUID, user_id: UUID) -> None:
+        """Background job: profile + 8 cards generated concurrently, then Context + Cards saved (→ completed)."""
+        try:
+            await self._generate_context(session_id, user_id)
+        except ConflictException as e:
+            self._fail(session_id, str(e))
+        except Exception as e:
+            logger.error("Context generation failed | session=%s error=%s", session_id, str(e))
+            self._fail(session_id, f"Context generation failed: {e}")
+
+    async def _generate_context(self, session_id: UUID, user_id: UUID) -> None:
+        session = self.db.table("onboarding_sessions").select("*").eq("id", str(session_id)).single().execute().data
+        answers = session.get("answers") or {}
+        questions = session.get("questions") or []
+        background = f"""RESEARCH: {json.dumps(session["research_data"])}
+QUESTIONS AND ANSWERS: {json.dumps(dict(zip([q["question"] for q in questions], [answers.get(q["id"]) for q in questions], strict=False)))}"""
+
+        total = len(CARD_SCHEMAS) + 1
+        done = 0
+
+        async def tracked(step: str, coro):
+            nonlocal done
+            try:
+                return await coro
+            finally:
+                done += 1
+                self._update_session(session_id, step=step, progress=int(done / total * 90))
+
+        profile_task = tracked("profile", self._generate_profile(background))
+        card_tasks = [
+            tracked(f"card:{card_type}", self._generate_card(card_type, schema, background))
+            for card_type, schema in CARD_SCHEMAS.items()
+        ]
+        profile, *cards = await asyncio.gather(profile_task, *card_tasks, return_exceptions=True)
+
+        if isinstance(profile, BaseException) or profile is None:
+            raise ValueError("Failed to parse context generation response")
+        for card_type, card in zip(CARD_SCHEMAS, cards, strict=True):
+            if isinstance(card, BaseException):
+                logger.warning("Card generation failed | session=%s type=%s error=%s", session_id, card_type, card)
+        generated = [card for card in cards if isinstance(card, dict)]
 
-        # Generate Context with LLM
-        context_prompt = f"""Based on the company research and user answers, generate a complete profile.
+        # Create Context + 8 Cards (one transaction)
+        self._update_session(session_id, step="saving", progress=95)
+        brand_name = session["initial_input"]["brand_name"]
+        context = {
+            "name": f"Context - {brand_name}",
+            "brand_name": brand_name,
+            "website": session["initial_input"].get("website"),
+            "industry": profile.get("company_info", {}).get("industry"),
+            "company_info": profile.get("company_info", {}),
+            "audience_info": profile.get("audience_info", {}),
+            "voice_info": profile.get("voice_info", {}),
+            "goals_info": profile.get("goals_info", {}),
+            "research_data": session["research_data"],
+            "status": "active",
+        }
+        card_rows = self._card_rows(generated)
+        created = ContextRepository(self.db).create_with_cards(user_id, [{"context": context, "cards": card_rows}])
+        context_id = created[0]["context"]["id"]
+
+        # Update session
+        self._update_session(session_id, state="completed", context_id=context_id, step=None, progress=100)
+        logger.info("Onboarding completed | session=%s context=%s cards=%d", session_id, context_id, len(card_rows))
+
+    async def _generate_profile(self, background: str) -> dict | None:
+        prompt = f"""Based on the company research and user answers, generate a complete profile.
 
-RESEARCH: {json.dumps(session["research_data"])}
-QUESTIONS AND ANSWERS: {json.dumps(dict(zip([q["question"] for q in session["questions"]], [answers.get(q["id"]) for q in session["questions"]], strict=False)))}
+{background}
 
 Generate a JSON with:
-- company_info: {{name, description, products, usp, values, industry}}
-- audience_info: {{primary_segment, secondary_segments, pain_points, demographics}}
-- voice_info: {{tone, personality, dos, donts, style_guidelines}}
-- goals_info: {{primary_goal, kpis, content_pillars}}
-
-And for each of the 8 card types, generate the content:
-- product: {{valueProposition, features[], differentiators[], useCases[], performanceMetrics[]}}
-- target: {{icpName, description, painPoints[], goals[], preferredLanguage, communicationChannels[]}}
-- brand_voice: {{toneDescription, styleGuidelines[], dosExamples[], dontsExamples[], termsToUse[], termsToAvoid[]}}
-- competitor: {{competitorName, positioning, keyMessages[], strengths[], weaknesses[], differentiationOpportunities[]}}
-- topic: {{description, keywords[], angles[], relatedContent[], trends[]}}
-- campaigns: {{objective, keyMessages[], tone, assets[], learnings[]}}
-- performance: {{period, metrics[], topPerformingContent[], insights[]}}
-- feedback: {{source, summary, details, actionItems[], priority}}
-
-Reply with JSON: {{"context": {{...}}, "cards": [{{type, title, content: {{...}}}}]}}"""
-
-        response = await self.llm.generate(
-            [
-                {
-                    "role": "system",
-                    "content": "You are an expert business strategist. Generate detailed company profiles. IMPORTANT: All generated content MUST be in English, regardless of the company's language or country. Reply ONLY with valid JSON.",
-                },
-                {"role": "user", "content": context_prompt},
-            ],
-            max_tokens=8000,
+{PROFILE_SCHEMA}
+
+Reply with JSON: {{"company_info": {{...}}, "audience_info": {{...}}, "voice_info": {{...}}, "goals_info": {{...}}}}"""
+        result = await self._generate_json(
+            [{"role": "system", "content": GENERATION_SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+            max_tokens=3000,
+        )
+        return result if isinstance(result, dict) else None
+
+    async def _generate_card(self, card_type: str, schema: str, background: str) -> dict | None:
+        prompt = f"""Based on the company research and user answers, generate the "{card_type}" card of the company profile.
+
+{background}
+
+Content fields: {schema}
+
+Reply with JSON: {{"type": "{card_type}", "title": "...", "content": {{...}}}}"""
+        result = await self._generate_json(
+            [{"role": "system", "content": GENERATION_SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+            max_tokens=1500,
         )
+        if not isinstance(result, dict):
+            return None
+        return {**result, "type": card_type}
+
+    async def _generate_json(
+        self,
+        messages: list[dict],
+        max_tokens: int = 4096,
+        retry_system: str = "Reply EXCLUSIVELY with valid JSON, no additional text.",
+        retry_prompt: str = "Fix and return as valid JSON:\n{content}",
+    ):
+        """LLM call parsed as JSON, with one repair retry; None if still not valid."""
+        response = await self.llm.generate(messages, max_tokens=max_tokens)
 
         # Safe parsing with retry
         result = self._safe_json_parse(response.content)
         if result is None:
             retry_response = await self.llm.generate(
                 [
-                    {"role": "system", "content": "Reply EXCLUSIVELY with valid JSON, no additional text."},
-                    {"role": "user", "content": f"Fix and return as valid JSON:\n{response.content[:4000]}"},
+                    {"role": "system", "content": retry_system},
+                    {"role": "user", "content": retry_prompt.format(content=response.content[:4000])},
                 ],
                 temperature=0.3,
             )
             result = self._safe_json_parse(retry_response.content)
-            if result is None:
-                self.db.table("onboarding_sessions").update(
-                    {
-                        "state": "failed",
-                        "error_message": "Failed to parse LLM response as JSON",
-                    }
-                ).eq("id", str(session_id)).execute()
-                raise ValueError("Failed to parse context generation response")
+        return result
 
-        # Create Context
-        brand_name = session["initial_input"]["brand_name"]
-        context_data = result.get("context", {})
-        context = (
-            self.db.table("contexts")
-            .insert(
-                {
-                    "user_id": str(user_id),
-                    "name": f"Context - {brand_name}",
-                    "brand_name": brand_name,
-                    "website": session["initial_input"].get("website"),
-                    "industry": context_data.get("company_info", {}).get("industry"),
-                    "company_info": context_data.get("company_info", {}),
-                    "audience_info": context_data.get("audience_info", {}),
-                    "voice_info": context_data.get("voice_info", {}),
-                    "goals_info": context_data.get("goals_info", {}),
-                    "research_data": session["research_data"],
-                    "status": "active",
+    # ─── Progress stream ──────────────────────────────
+
+    async def watch(self, session_id: UUID, user_id: UUID) -> AsyncGenerator[dict, None]:
+        """SSE events for the running phase: one `state` event per change, then a final one.
+
+        The job may run in another worker, so this follows the session row.
+        """
+        deadline = time.monotonic() + WATCH_TIMEOUT_SECONDS
+        last = None
+        while True:
+            session = await asyncio.to_thread(self.get_session, session_id, user_id)
+            snapshot = (session["state"], session.get("progress"), session.get("step"))
+            if snapshot != last:
+                last = snapshot
+                yield {
+                    "type": "state",
+                    "data": {"state": snapshot[0], "progress": snapshot[1], "step": snapshot[2]},
                 }
-            )
-            .execute()
-        )
-        context_id = context.data[0]["id"]
 
-        # Create 8 Cards
-        cards = result.get("cards", [])
-        for i, card_data in enumerate(cards):
-            self.db.table("cards").insert(
-                {
-                    "context_id": context_id,
-                    "card_type": card_data["type"],
-                    "title": card_data.get("title", card_data["type"].replace("_", " ").title()),
-                    "content": card_data["content"],
-                    "sort_order": i,
+            state = session["state"]
+            if state == "questions_ready":
+                raw_research = (session.get("research_data") or {}).get("raw") or ""
+                yield {
+                    "type": "questions_ready",
+                    "data": {
+                        "session_id": str(session_id),
+                        "questions": session.get("questions") or [],
+                        "research_summary": raw_research[:500],
+                    },
                 }
-            ).execute()
+            elif state == "completed":
+                cards_count = await asyncio.to_thread(self._count_cards, session["context_id"])
+                yield {"type": "completed", "data": {"context_id": session["context_id"], "cards_count": cards_count}}
+            elif state == "failed":
+                yield {"type": "error", "data": {"error": session.get("error_message") or "Onboarding failed"}}
+            if state in PHASE_END_STATES:
+                return
 
-        # Update session
-        self.db.table("onboarding_sessions").update(
-            {
-                "state": "completed",
-                "context_id": context_id,
-            }
-        ).eq("id", str(session_id)).execute()
+            if time.monotonic() > deadline:
+                yield {"type": "error", "data": {"error": "Timed out waiting for onboarding progress"}}
+                return
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
 
-        logger.info("Onboarding completed | session=%s context=%s cards=%d", session_id, context_id, len(cards))
-        return {"context_id": context_id, "cards_count": len(cards)}
+    def _count_cards(self, context_id: str) -> int:
+        result = self.db.table("cards").select("id", count="exact").eq("context_id", context_id).execute()
+        return result.count or 0
+
+    @staticmethod
+    def _card_rows(cards: list) -> list:
+        """LLM cards → card rows: known types only, first card per type (cards are unique per context)."""
+        valid_types = {t.value for t in CardType}
+        rows, seen = [], set()
+        for card_data in cards:
+            card_type = card_data.get("type") if isinstance(card_data, dict) else None
+            if card_type not in valid_types or card_type in seen:
+                logger.warning("Skipping generated card | type=%s", card_type)
+                continue
+            seen.add(card_type)
+            rows.append(
+                {
+                    "card_type": card_type,
+                    "title": card_data.get("title", card_type.replace("_", " ").title()),
+                    "content": card_data.get("content", {}),
+                    "sort_order": len(rows),
+                }
+            )
+        return rows
 
     @staticmethod
     def _safe_json_parse(text: str):
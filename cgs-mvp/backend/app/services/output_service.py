@@ -4,19 +4,38 @@ from uuid import UUID
 import structlog
 
 from app.config.supabase import get_supabase_admin
+from app.db.pagination import Order, paginate
 from app.db.repositories.output_repo import OutputRepository
 from app.exceptions import NotFoundException, ValidationException
 from app.infrastructure.storage.supabase_storage import StorageService
+from app.services.archive_index import get_archive_index_cache
 
 logger = structlog.get_logger("cgs-mvp.output")
 
+# Outputs list as #N: number is assigned by trigger on insert, while created_at is the
+# transaction start and can disagree with it under concurrent runs. NULL numbers
+# (outputs without a brief) come first, as in Postgres DESC order.
+NUMBER_DESC: Order = (("number", True), ("id", True))
+
 
 class OutputService:
     def __init__(self):
         self.db = get_supabase_admin()
 
-    def list(self, user_id: UUID, brief_id: UUID | None = None, context_id: UUID | None = None) -> list:
-        query = self.db.table("outputs").select("*").eq("user_id", str(user_id)).is_("parent_output_id", "null")
+    async def list(
+        self,
+        user_id: UUID,
+        brief_id: UUID | None = None,
+        context_id: UUID | None = None,
+        include_latest: bool = False,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: list[str] | None = None,
+        include_download_url: bool = False,
+    ) -> tuple[list, str | None]:
+        repo = OutputRepository(self.db)
+        columns = repo.projection(fields)
+        query = self.db.table("outputs").select(columns).eq("user_id", str(user_id)).is_("parent_output_id", "null")
         if brief_id:
             query = query.eq("brief_id", str(brief_id))
         if context_id:
@@ -31,60 +50,51 @@ class OutputService:
             )
             brief_ids = [b["id"] for b in briefs]
             if not brief_ids:
-                return []
+                return [], None
             query = query.in_("brief_id", brief_ids)
-        return query.order("number", desc=True).execute().data
+        outputs, next_cursor = paginate(query, NUMBER_DESC, limit, cursor)
+
+        if include_latest and outputs:
+            # One bulk RPC instead of one chain walk per row
+            latest = repo.get_latest_versions([UUID(o["id"]) for o in outputs])
+            keep = columns.split(",")
+            for o in outputs:
+                row = latest.get(o["id"])
+                # The RPC returns full rows: trim them to the same projection as the list
+                o["latest_version"] = {k: row[k] for k in keep if k in row} if row else dict(o)
+
+        if include_download_url and outputs:
+            # One batch signing call (cached URLs are reused) instead of one /download per row
+            rows = outputs + [o["latest_version"] for o in outputs if "latest_version" in o]
+            urls = await StorageService().get_signed_urls([r["file_path"] for r in rows if r.get("file_path")])
+            for r in rows:
+                r["download_url"] = urls.get(r.get("file_path"))
+        return outputs, next_cursor
 
     def get_summary(self, user_id: UUID, context_id: UUID | None = None) -> list:
-        """Aggregated view by pack: brief counters + new flags."""
-        briefs_query = (
-            self.db.table("briefs").select("id, name, slug, pack_id").eq("user_id", str(user_id)).eq("status", "active")
-        )
+        """Aggregated view by pack: brief counters + new flags (aggregated in SQL)."""
+        params = {"p_user_id": str(user_id)}
         if context_id:
-            briefs_query = briefs_query.eq("context_id", str(context_id))
-        briefs = briefs_query.execute().data
-        if not briefs:
-            return []
-
-        outputs = (
-            self.db.table("outputs")
-            .select("brief_id, is_new")
-            .eq("user_id", str(user_id))
-            .is_("parent_output_id", "null")
-            .execute()
-            .data
-        )
-
-        brief_counts: dict[str, int] = {}
-        brief_has_new: dict[str, bool] = {}
-        for o in outputs:
-            bid = o["brief_id"]
-            brief_counts[bid] = brief_counts.get(bid, 0) + 1
-            if o.get("is_new"):
-                brief_has_new[bid] = True
-
-        pack_ids = list({b["pack_id"] for b in briefs})
-        packs = self.db.table("agent_packs").select("id, name, slug").in_("id", pack_ids).execute().data
-        packs_map = {p["id"]: p for p in packs}
+            params["p_context_id"] = str(context_id)
+        rows = self.db.rpc("get_outputs_summary", params).execute().data
 
         result: dict[str, dict] = {}
-        for b in briefs:
-            pid = b["pack_id"]
+        for row in rows:
+            pid = row["pack_id"]
             if pid not in result:
-                pack_info = packs_map.get(pid, {})
                 result[pid] = {
                     "pack_id": pid,
-                    "pack_name": pack_info.get("name", ""),
-                    "pack_slug": pack_info.get("slug", ""),
+                    "pack_name": row["pack_name"],
+                    "pack_slug": row["pack_slug"],
                     "briefs": [],
                 }
             result[pid]["briefs"].append(
                 {
-                    "id": b["id"],
-                    "name": b["name"],
-                    "slug": b.get("slug"),
-                    "count": brief_counts.get(b["id"], 0),
-                    "hasNew": brief_has_new.get(b["id"], False),
+                    "id": row["brief_id"],
+                    "name": row["brief_name"],
+                    "slug": row.get("brief_slug"),
+                    "count": row["output_count"],
+                    "hasNew": row["has_new"],
                 }
             )
 
@@ -105,7 +115,7 @@ class OutputService:
             raise NotFoundException("Output not found")
         return latest
 
-    def get_download_url(self, output_id: UUID, user_id: UUID) -> dict:
+    async def get_download_url(self, output_id: UUID, user_id: UUID) -> dict:
         output = (
             self.db.table("outputs")
             .select("file_path")
@@ -115,8 +125,10 @@ class OutputService:
             .execute()
         )
         if output.data and output.data.get("file_path"):
-            storage = StorageService()
-            url = storage.get_signed_url(output.data["file_path"])
+            try:
+                url = await StorageService().get_signed_url(output.data["file_path"])
+            except FileNotFoundError:
+                raise NotFoundException("File not found in storage") from None
             return {"download_url": url}
         raise NotFoundException("No file available for download")
 
@@ -134,34 +146,22 @@ class OutputService:
             .data
         )
 
-    def delete(self, output_id: UUID, user_id: UUID) -> None:
-        # Verify the output exists and belongs to this user
-        output = self.db.table("outputs").select("id").eq("id", str(output_id)).eq("user_id", str(user_id)).execute()
-        if not output.data:
-            raise NotFoundException("Output not found")
-
-        # Collect all output IDs to delete: the target + any child versions
-        child_outputs = self.db.table("outputs").select("id").eq("parent_output_id", str(output_id)).execute().data
-        child_ids = [c["id"] for c in child_outputs]
-        all_ids = child_ids + [str(output_id)]
-
-        # Delete in correct order to respect foreign key constraints:
-        # 1. Chat messages (reference output_id)
-        for oid in all_ids:
-            self.db.table("chat_messages").delete().eq("output_id", oid).execute()
+    def delete(self, output_id: UUID, user_id: UUID) -> list[str]:
+        """Delete an output, its child versions, chat messages and archive entries.
 
-        # 2. Archive entries (reference output_id)
-        for oid in all_ids:
-            self.db.table("archive").delete().eq("output_id", oid).execute()
-
-        # 3. Child outputs first, then parent
-        for oid in child_ids:
-            self.db.table("outputs").delete().eq("id", oid).execute()
-
-        # 4. Finally the target output
-        self.db.table("outputs").delete().eq("id", str(output_id)).eq("user_id", str(user_id)).execute()
+        Runs as a single transactional RPC. Returns the storage paths of the
+        deleted outputs so the caller can remove the files in the background.
+        """
+        repo = OutputRepository(self.db)
+        deleted = repo.delete_cascade(output_id, user_id)
+        if not deleted:
+            raise NotFoundException("Output not found")
 
-        logger.info("Deleted output %s (+ %d children)", output_id, len(child_ids))
+        logger.info("Deleted output %s (+ %d children)", output_id, len(deleted) - 1)
+        index_cache = get_archive_index_cache()
+        for context_id in {row["context_id"] for row in deleted if row.get("context_id")}:
+            index_cache.invalidate(context_id)
+        return [row["storage_path"] for row in deleted if row.get("storage_path")]
 
     def review(self, output_id: UUID, user_id: UUID, review_data) -> dict:
         """Review output: update archive + outputs status."""
@@ -175,9 +175,17 @@ class OutputService:
         if review_data.reference_notes:
             archive_update["reference_notes"] = review_data.reference_notes
 
-        self.db.table("archive").update(archive_update).eq("output_id", str(output_id)).eq(
-            "user_id", str(user_id)
-        ).execute()
+        archived = (
+            self.db.table("archive")
+            .update(archive_update)
+            .eq("output_id", str(output_id))
+            .eq("user_id", str(user_id))
+            .execute()
+            .data
+        )
+        # Review status/reference flags are search filters: drop the in-process index copy
+        for row in archived:
+            get_archive_index_cache().invalidate(row["context_id"])
 
         # Update status on the parent output AND all child versions (edit chain).
         # Without this, the latest version displayed in the frontend keeps
@@ -0,0 +1,106 @@
+"""
+Company research cache for onboarding (onboarding_research_cache table).
+
+Research depends only on the brand name and website, so repeated onboarding
+attempts for the same company reuse it instead of calling Perplexity again.
+Keys are normalized ("ACME S.r.l." and "acme srl", "https://www.acme.com/it"
+and "acme.com" match); a brand name with no letters or digits is never cached.
+Entries are shared across users unless ONBOARDING_RESEARCH_CACHE_SHARED is off,
+and expire after ONBOARDING_RESEARCH_CACHE_TTL_SECONDS (0 disables the cache):
+expired rows are ignored on read and deleted on every write.
+
+Cache errors never fail an onboarding: reads miss, writes are skipped.
+"""
+
+import hashlib
+import re
+import unicodedata
+from datetime import UTC, datetime, timedelta
+from urllib.parse import urlsplit
+from uuid import UUID
+
+import structlog
+
+from app.config.settings import get_settings
+from app.config.supabase import get_supabase_admin
+
+logger = structlog.get_logger("cgs-mvp.research_cache")
+
+# Legal-form suffixes that don't change which company is meant
+LEGAL_SUFFIXES = {"inc", "llc", "ltd", "limited", "corp", "co", "plc", "gmbh", "ag", "sa", "srl", "spa", "sas", "bv"}
+
+
+def normalize_brand(brand_name: str) -> str:
+    """Casefolded words (any script) without punctuation or a trailing legal form."""
+    text = unicodedata.normalize("NFKC", brand_name).casefold()
+    text = re.sub(r"(?<=\b\w)\.(?=\w\b)", "", text)  # s.r.l. → srl
+    words = re.sub(r"[\W_]+", " ", text).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def normalize_domain(website: str | None) -> str:
+    """Lowercase host of the website without "www." ("" when missing or malformed)."""
+    if not website or not website.strip():
+        return ""
+    url = website.strip()
+    try:
+        host = urlsplit(url if "//" in url else f"//{url}").hostname or ""
+    except ValueError:  # free-text field: "http://[acme" is an invalid IPv6 URL
+        return ""
+    return host.removeprefix("www.")
+
+
+class ResearchCache:
+    def __init__(self):
+        settings = get_settings()
+        self.ttl_seconds = settings.onboarding_research_cache_ttl_seconds
+        self.shared = settings.onboarding_research_cache_shared
+        self.db = get_supabase_admin()
+
+    def _key(self, user_id: UUID, brand_name: str, website: str | None) -> dict:
+        scope = "" if self.shared else str(user_id)
+        brand_key, domain = normalize_brand(brand_name), normalize_domain(website)
+        digest = hashlib.sha256(f"{scope}\n{brand_key}\n{domain}".encode()).hexdigest()
+        return {"key_hash": digest, "scope": scope, "brand_key": brand_key, "domain": domain}
+
+    def get(self, user_id: UUID, brand_name: str, website: str | None) -> str | None:
+        if self.ttl_seconds <= 0:
+            return None
+        key = self._key(user_id, brand_name, website)
+        if not key["brand_key"]:
+            return None
+        try:
+            rows = (
+                self.db.table("onboarding_research_cache")
+                .select("research")
+                .eq("key_hash", key["key_hash"])
+                .gte("created_at", self._expiry_cutoff())
+                .limit(1)
+                .execute()
+                .data
+            )
+        except Exception as e:
+            logger.warning("Research cache read failed", error=str(e))
+            return None
+        if rows:
+            logger.info("Research cache hit", brand=key["brand_key"], domain=key["domain"])
+            return rows[0]["research"]
+        return None
+
+    def set(self, user_id: UUID, brand_name: str, website: str | None, research: str) -> None:
+        if self.ttl_seconds <= 0 or not research:
+            return
+        key = self._key(user_id, brand_name, website)
+        if not key["brand_key"]:
+            return
+        row = {**key, "research": research, "created_at": datetime.now(UTC).isoformat()}
+        try:
+            self.db.table("onboarding_research_cache").upsert(row).execute()
+            self.db.table("onboarding_research_cache").delete().lt("created_at", self._expiry_cutoff()).execute()
+        except Exception as e:
+            logger.warning("Research cache write failed", error=str(e))
+
+    def _expiry_cutoff(self) -> str:
+        return (datetime.now(UTC) - timedelta(seconds=self.ttl_seconds)).isoformat()
@@ -5,18 +5,26 @@ from datetime import datetime
 from uuid import UUID
 
 import structlog
+from pydantic import ValidationError
 
+from app.config.settings import get_settings
 from app.config.supabase import get_supabase_admin
 from app.db.repositories.archive_repo import ArchiveRepository
-from app.db.repositories.output_repo import OutputRepository
+from app.db.repositories.document_chunk_repo import DocumentChunkRepository
+from app.domain.models import ContextScope
+from app.infrastructure.llm.embeddings import get_embedding_client
 from app.infrastructure.llm.factory import get_llm_adapter
 from app.infrastructure.logging.tracker import RunTracker
 from app.infrastructure.storage.supabase_storage import StorageService
 from app.infrastructure.tools.image_gen import ImageGenerationTool
 from app.infrastructure.tools.perplexity import PerplexityTool
+from app.services.context_tree import get_context_tree
 
 logger = structlog.get_logger("cgs-mvp.workflow")
 
+# Rough token estimate for prompt-size logging
+CHARS_PER_TOKEN = 4
+
 
 class WorkflowService:
     def __init__(self):
@@ -34,22 +42,18 @@ class WorkflowService:
             context = self.db.table("contexts").select("*").eq("id", brief["context_id"]).single().execute().data
             pack = self.db.table("agent_packs").select("*").eq("id", brief["pack_id"]).single().execute().data
             cards = self.db.table("cards").select("*").eq("context_id", brief["context_id"]).execute().data
-            context_items = (
-                self.db.table("context_items")
-                .select("*")
-                .eq("context_id", brief["context_id"])
-                .order("level")
-                .order("sort_order")
-                .execute()
-                .data
-            )
+            context_tree = get_context_tree(self.db, context)
 
-            # Load Archive (learning loop) — brief-first, context fallback
+            # Load Archive (learning loop) — brief-first, context fallback,
+            # ranked by similarity to the topic when an embedding is available
             archive_repo = ArchiveRepository(self.db)
             brief_uuid = UUID(brief["id"])
             context_uuid = UUID(brief["context_id"])
-            references = archive_repo.get_references(context_uuid, brief_id=brief_uuid)
-            guardrails = archive_repo.get_guardrails(context_uuid, brief_id=brief_uuid)
+            topic_embedding = await self._embed_topic(run["topic"])
+            references, guardrails = archive_repo.get_feedback_examples(
+                context_uuid, brief_id=brief_uuid, query_embedding=topic_embedding
+            )
+            document_chunks = self._match_document_chunks(topic_embedding, context_uuid, brief_uuid)
 
             # Log feedback loop data
             logger.info(
@@ -80,8 +84,6 @@ class WorkflowService:
             tracker.update_run(status="running", started_at=datetime.utcnow().isoformat())
             yield {"type": "status", "data": {"status": "running"}}
 
-            # Prepare execution context
-            exec_context = self._build_execution_context(context, brief, cards, run["topic"], context_items)
             archive_prompt = self._build_archive_prompt(references, guardrails)
 
             # Log archive prompt injection
@@ -96,6 +98,17 @@ class WorkflowService:
 
             agents = pack["agents_config"]
             total_agents = len(agents)
+            # Execution context per agent scope: agents with the same scope share one render
+            context_views: dict[str, str] = {}
+
+            def context_view(scope: ContextScope | None) -> str:
+                key = scope.model_dump_json() if scope else ""
+                if key not in context_views:
+                    context_views[key] = self._build_execution_context(
+                        context, brief, cards, run["topic"], context_tree, document_chunks, scope
+                    )
+                return context_views[key]
+
             agent_outputs = {}
             total_tokens = 0
             total_cost = 0.0
@@ -121,6 +134,17 @@ class WorkflowService:
                 tracker.update_run(progress=progress, current_step=agent_name)
                 tracker.info(f"Starting agent: {agent_name}", agent_name=agent_name, step_number=i)
 
+                # Prepare execution context (only the slice this agent's scope asks for)
+                scope = self._parse_context_scope(agent)
+                exec_context = context_view(scope)
+                if scope:
+                    logger.info(
+                        "Agent context scoped",
+                        agent=agent_name,
+                        context_tokens=len(exec_context) // CHARS_PER_TOKEN,
+                        full_context_tokens=len(context_view(None)) // CHARS_PER_TOKEN,
+                    )
+
                 # Execute tools if necessary
                 tool_results = {}
                 for tool_name in agent_tools:
@@ -205,6 +229,7 @@ class WorkflowService:
                     rendered_chars=len(rendered_prompt),
                     exec_context_chars=len(exec_context),
                     archive_chars=len(archive_prompt),
+                    estimated_tokens=len(system_prompt) // CHARS_PER_TOKEN,
                 )
 
                 if tool_results:
@@ -252,6 +277,7 @@ class WorkflowService:
                 tracker.info(
                     f"Agent {agent_name} completed",
                     agent_name=agent_name,
+                    tokens_in=response.tokens_in,
                     tokens_used=response.tokens_in + response.tokens_out,
                     cost_usd=float(response.cost_usd),
                 )
@@ -261,10 +287,6 @@ class WorkflowService:
                     "data": {"agent": agent_name, "tokens": response.tokens_in + response.tokens_out},
                 }
 
-            # Calculate next sequential number for this brief
-            output_repo = OutputRepository(self.db)
-            next_number = output_repo.get_next_number(UUID(brief["id"]))
-
             # Save final output
             final_output = agent_outputs.get(agents[-1]["name"], "")
             last_agent_name = agents[-1].get("name", "AI")
@@ -280,9 +302,9 @@ class WorkflowService:
                 "version": 1,
                 "status": "pending_review",
                 "is_new": True,
-                "number": next_number,
                 "author": last_agent_name,
             }
+            # "number" is assigned atomically by the trg_outputs_assign_number trigger
             output = self.db.table("outputs").insert(output_data).execute().data[0]
 
             # Create archive entry (pending review)
@@ -340,7 +362,24 @@ class WorkflowService:
             "global_instructions": raw.get("global_instructions"),
         }
 
-    def _build_execution_context(self, context, brief, cards, topic, context_items=None) -> str:
+    def _parse_context_scope(self, agent: dict) -> ContextScope | None:
+        """The agent's context_scope from agents_config; None (= full context) if absent or invalid."""
+        raw = agent.get("context_scope")
+        if raw is None:
+            return None
+        try:
+            return ContextScope.model_validate(raw)
+        except ValidationError as e:
+            logger.warning("Invalid context_scope, using full context", agent=agent.get("name"), error=str(e))
+            return None
+
+    def _build_execution_context(
+        self, context, brief, cards, topic, context_tree=None, document_chunks=None, scope: ContextScope | None = None
+    ) -> str:
+        if scope and scope.cards is not None:
+            cards = [c for c in cards if c.get("card_type") in scope.cards]
+        brief_sections = scope.brief if scope and scope.brief is not None else ["answers", "compiled_brief"]
+
         lines = [
             f"## CONTEXT: {context['brand_name']}",
             f"Industry: {context.get('industry', 'N/A')}",
@@ -375,46 +414,53 @@ class WorkflowService:
                     lines.append(str(content))
 
         # Inject hierarchical context items (from CSV import)
-        if context_items:
+        item_scope = tuple(scope.items) if scope and scope.items is not None else None
+        context_data = context_tree.render(item_scope) if context_tree else ""
+        if context_data:
             lines.append("")
             lines.append("## FULL CONTEXT DATA")
-            # Build tree from flat items
-            by_id = {}
-            for item in context_items:
-                by_id[item["id"]] = {**item, "children": []}
-            roots = []
-            for item in context_items:
-                node = by_id[item["id"]]
-                parent_id = item.get("parent_id")
-                if parent_id and parent_id in by_id:
-                    by_id[parent_id]["children"].append(node)
-                else:
-                    roots.append(node)
-
-            def render_tree(nodes, depth=0):
-                for node in nodes:
-                    heading = "#" * min(depth + 3, 6)  # ### → ######
-                    lines.append(f"{heading} {node['name']}")
-                    if node.get("content"):
-                        lines.append(node["content"])
-                        lines.append("")
-                    render_tree(node["children"], depth + 1)
-
-            render_tree(roots)
-
-        lines.extend(
-            [
-                "",
-                "## BRIEF",
-                f"Name: {brief['name']}",
-                f"Answers: {json.dumps(brief.get('answers', {}), indent=2)}",
-                f"Compiled: {brief.get('compiled_brief', '')}",
-                "",
-                f"## TOPIC: {topic}",
-            ]
-        )
+            lines.append(context_data)
+
+        lines.extend(["", "## BRIEF", f"Name: {brief['name']}"])
+        if "answers" in brief_sections:
+            lines.append(f"Answers: {json.dumps(brief.get('answers', {}), indent=2)}")
+        if "compiled_brief" in brief_sections:
+            lines.append(f"Compiled: {brief.get('compiled_brief', '')}")
+        lines.extend(["", f"## TOPIC: {topic}"])
+
+        # Only the document chunks most similar to the topic, not whole files
+        if document_chunks:
+            lines.append("")
+            lines.append("## RELEVANT DOCUMENT EXCERPTS")
+            for chunk in document_chunks:
+                lines.append(f"### {chunk['file_name']} (part {chunk['chunk_index'] + 1})")
+                lines.append(chunk["content"])
+                lines.append("")
+
         return "\n".join(lines)
 
+    async def _embed_topic(self, topic: str) -> list | None:
+        """Topic embedding for relevance ranking; None (= most recent first) if unavailable."""
+        try:
+            return await get_embedding_client().embed_query(topic)
+        except Exception as e:
+            logger.warning("Topic embedding failed, falling back to recency", error=str(e))
+            return None
+
+    def _match_document_chunks(self, topic_embedding: list | None, context_id: UUID, brief_id: UUID) -> list:
+        """Top-k uploaded document chunks for the topic (RAG); empty if unavailable."""
+        if topic_embedding is None:
+            return []
+        try:
+            chunks = DocumentChunkRepository(self.db).match(
+                topic_embedding, context_id, brief_id=brief_id, limit=get_settings().rag_top_k
+            )
+        except Exception as e:
+            logger.warning("Document chunk retrieval failed", error=str(e))
+            return []
+        logger.info("Document chunks loaded", count=len(chunks), files=sorted({c["file_name"] for c in chunks}))
+        return chunks
+
     def _build_archive_prompt(self, references, guardrails) -> str:
         if not references and not guardrails:
             return ""
@@ -434,8 +480,8 @@ class WorkflowService:
                 lines.append(f'- Topic: "{ref["topic"]}"')
                 if ref.get("reference_notes"):
                     lines.append(f"  → Follow this guidance: {ref['reference_notes']}")
-                if ref.get("outputs") and ref["outputs"].get("text_content"):
-                    lines.append(f"  → Example to emulate: {ref['outputs']['text_content'][:300]}...")
+                if ref.get("excerpt"):
+                    lines.append(f"  → Example to emulate: {ref['excerpt']}...")
             lines.append("")
         if guardrails:
             lines.append("### 🚫 CRITICAL GUARDRAILS — NEVER DO THESE")
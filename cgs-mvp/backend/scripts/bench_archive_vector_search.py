@@ -0,0 +1,177 @@
+"""Recall / latency benchmark for the archive HNSW index on synthetic vectors.
+
+Builds a TEMP table (dropped with the session, nothing persistent is
+touched) shaped like archive(context_id, embedding), fills it with random
+unit vectors grouped in clusters, builds the same HNSW index as migration
+0010 and compares, for several hnsw.ef_search values, the top-k of the
+index scan with the exact top-k (sequential scan).
+
+Rows are spread over --contexts tenants plus one small context
+(--small-rows). A second pass runs match_archive's context filter on that
+small context: a post-filtered index scan, an iterative scan
+(pgvector >= 0.8) and the exact scan used below exact_scan_max rows.
+
+Usage (from backend/, needs a Postgres with pgvector, e.g. DATABASE_URL):
+
+    python scripts/bench_archive_vector_search.py --rows 20000 --queries 50 --k 5
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import time
+
+import psycopg2
+
+DIM = 1536
+
+
+def _unit(v: list[float]) -> list[float]:
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [x / norm for x in v]
+
+
+def _literal(v: list[float]) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in v) + "]"
+
+
+def _synthetic(n: int, clusters: int, rng: random.Random) -> list[list[float]]:
+    """Clustered data: real embeddings are far from uniform, which is what makes ANN recall interesting."""
+    centers = [_unit([rng.gauss(0, 1) for _ in range(DIM)]) for _ in range(clusters)]
+    return [_unit([c + rng.gauss(0, 0.35 / math.sqrt(DIM)) for c in rng.choice(centers)]) for _ in range(n)]
+
+
+SMALL_CONTEXT = 0
+
+_FILTERED_SQL = "SELECT id FROM bench_archive WHERE context_id = %s ORDER BY embedding <=> %s::vector LIMIT %s"
+# Same shape as match_archive's exact branch: MATERIALIZED keeps the HNSW index out
+_MATERIALIZED_SQL = """
+    WITH candidates AS MATERIALIZED (
+        SELECT id, embedding <=> %s::vector AS distance FROM bench_archive WHERE context_id = %s
+    )
+    SELECT id FROM candidates ORDER BY distance LIMIT %s
+"""
+
+
+def _top_k(cur, query: str, k: int, context_id: int | None = None) -> tuple[list[int], float]:
+    start = time.perf_counter()
+    if context_id is None:
+        cur.execute("SELECT id FROM bench_archive ORDER BY embedding <=> %s::vector LIMIT %s", (query, k))
+    else:
+        cur.execute(_FILTERED_SQL, (context_id, query, k))
+    ids = [r[0] for r in cur.fetchall()]
+    return ids, (time.perf_counter() - start) * 1000
+
+
+def _report(label: str, results: list[tuple[list[int], float]], exact: list[set[int]], k: int) -> None:
+    hits = sum(len(truth & set(ids)) for (ids, _), truth in zip(results, exact, strict=True))
+    returned = statistics.mean(len(ids) for ids, _ in results)
+    latencies = [ms for _, ms in results]
+    p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+    print(
+        f"{label:<26} recall={hits / (len(results) * k):.3f}  rows={returned:4.1f}/{k}"
+        f"  p50={statistics.median(latencies):7.2f}ms  p95={p95:7.2f}ms"
+    )
+
+
+def _filtered_pass(cur, queries: list[str], k: int, ef: int) -> None:
+    """Top-k inside the small context, as match_archive's context-wide branch filters it."""
+    print(f"\nContext filter (context {SMALL_CONTEXT}, ef_search={ef})")
+    cur.execute("SET enable_indexscan = off")
+    exact = [set(_top_k(cur, q, k, SMALL_CONTEXT)[0]) for q in queries]
+    cur.execute("RESET enable_indexscan")
+
+    cur.execute(f"SET hnsw.ef_search = {ef}")
+    _report("hnsw post-filter", [_top_k(cur, q, k, SMALL_CONTEXT) for q in queries], exact, k)
+    try:
+        cur.execute("SET hnsw.iterative_scan = relaxed_order")
+    except psycopg2.Error:
+        print("hnsw iterative scan         (needs pgvector >= 0.8)")
+    else:
+        _report("hnsw iterative_scan", [_top_k(cur, q, k, SMALL_CONTEXT) for q in queries], exact, k)
+        cur.execute("RESET hnsw.iterative_scan")
+
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        cur.execute(_MATERIALIZED_SQL, (q, SMALL_CONTEXT, k))
+        results.append(([r[0] for r in cur.fetchall()], (time.perf_counter() - start) * 1000))
+    _report("exact (materialized)", results, exact, k)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL", ""))
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--contexts", type=int, default=50, help="tenants sharing the index")
+    parser.add_argument("--small-rows", type=int, default=100, help="rows of the filtered context")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--ef", default="20,40,80,160")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("set DATABASE_URL or pass --dsn")
+
+    rng = random.Random(args.seed)
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+
+    cur.execute(f"CREATE TEMP TABLE bench_archive (id BIGSERIAL PRIMARY KEY, context_id INT, embedding VECTOR({DIM}))")
+    print(f"Loading {args.rows} + {args.small_rows} vectors ({args.clusters} clusters, {args.contexts} contexts)...")
+    rows = _synthetic(args.rows, args.clusters, rng)
+    small_rows = _synthetic(args.small_rows, args.clusters, rng)
+    tagged = [(1 + i % args.contexts, v) for i, v in enumerate(rows)] + [(SMALL_CONTEXT, v) for v in small_rows]
+    batch = 500
+    for i in range(0, len(tagged), batch):
+        args_sql = ",".join(
+            cur.mogrify("(%s, %s::vector)", (ctx, _literal(v))).decode() for ctx, v in tagged[i : i + batch]
+        )
+        cur.execute("INSERT INTO bench_archive (context_id, embedding) VALUES " + args_sql)
+
+    start = time.perf_counter()
+    cur.execute(
+        "CREATE INDEX ON bench_archive USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+    print(f"HNSW build: {time.perf_counter() - start:.1f}s")
+    cur.execute("ANALYZE bench_archive")
+
+    # Queries: perturbed data points, like a topic close to existing content
+    def perturbed(source: list[list[float]]) -> list[str]:
+        return [
+            _literal(_unit([x + rng.gauss(0, 0.1 / math.sqrt(DIM)) for x in rng.choice(source)]))
+            for _ in range(args.queries)
+        ]
+
+    queries = perturbed(rows + small_rows)
+
+    cur.execute("SET enable_indexscan = off")
+    exact, exact_ms = [], []
+    for q in queries:
+        ids, ms = _top_k(cur, q, args.k)
+        exact.append(set(ids))
+        exact_ms.append(ms)
+    cur.execute("RESET enable_indexscan")
+    print(f"\nexact scan     recall=1.000  p50={statistics.median(exact_ms):7.2f}ms")
+
+    for ef in (int(x) for x in args.ef.split(",")):
+        cur.execute(f"SET hnsw.ef_search = {ef}")
+        hits, latencies = 0, []
+        for q, truth in zip(queries, exact, strict=True):
+            ids, ms = _top_k(cur, q, args.k)
+            hits += len(truth & set(ids))
+            latencies.append(ms)
+        recall = hits / (len(queries) * args.k)
+        p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+        print(f"hnsw ef={ef:<5}  recall={recall:.3f}  p50={statistics.median(latencies):7.2f}ms  p95={p95:7.2f}ms")
+
+    _filtered_pass(cur, perturbed(small_rows), args.k, ef=80)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
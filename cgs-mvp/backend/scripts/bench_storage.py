@@ -0,0 +1,94 @@
+"""Sequential vs parallel storage uploads, and how long they stall the event loop.
+
+Runs against the local filesystem backend by default (no bucket needed);
+--backend supabase uses the configured project (.env). A ticker task
+measures the longest gap between event-loop iterations during the uploads:
+with a non-blocking backend it stays near the tick interval.
+
+Usage (from backend/):
+
+    python scripts/bench_storage.py --files 50 --size-kb 512 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.infrastructure.storage.local_storage import LocalStorageBackend  # noqa: E402
+
+TICK_SECONDS = 0.001
+
+
+async def _max_stall(stop: asyncio.Event) -> float:
+    worst = 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(TICK_SECONDS)
+        now = time.perf_counter()
+        worst = max(worst, now - last - TICK_SECONDS)
+        last = now
+    return worst
+
+
+async def _measure(label: str, run) -> None:
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_max_stall(stop))
+    start = time.perf_counter()
+    await run()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    stall = await ticker
+    print(f"{label:<12} {elapsed * 1000:>9.1f} ms   max loop stall {stall * 1000:>7.2f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--backend", choices=["local", "supabase"], default="local")
+    parser.add_argument("--bucket", default="documents")
+    args = parser.parse_args()
+
+    root = None
+    if args.backend == "local":
+        root = tempfile.mkdtemp(prefix="bench-storage-")
+        backend = LocalStorageBackend(root, args.concurrency)
+    else:
+        from app.infrastructure.storage.supabase_backend import SupabaseStorageBackend
+
+        backend = SupabaseStorageBackend(args.concurrency)
+
+    prefix = f"bench/{uuid.uuid4()}"
+    payloads = [(f"{prefix}/{i}.bin", os.urandom(args.size_kb * 1024)) for i in range(args.files)]
+
+    async def sequential():
+        for path, data in payloads:
+            await backend.upload(args.bucket, f"seq-{path}", data, "application/octet-stream")
+
+    async def parallel():
+        await asyncio.gather(
+            *(backend.upload(args.bucket, f"par-{path}", data, "application/octet-stream") for path, data in payloads)
+        )
+
+    print(f"{args.files} files x {args.size_kb} KB, backend={args.backend}, concurrency={args.concurrency}")
+    try:
+        await _measure("sequential", sequential)
+        await _measure("parallel", parallel)
+    finally:
+        paths = [f"{kind}-{path}" for kind in ("seq", "par") for path, _ in payloads]
+        await backend.delete(args.bucket, paths)
+        if root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Latency benchmark for the in-process vector index at 1k / 10k / 100k vectors.
+
+Times top-k search of app.infrastructure.vector.memory_index.VectorIndex
+(NumPy brute force, and hnswlib when installed, with its recall against
+brute force) on synthetic clustered unit vectors. With --dsn the same
+vectors are also loaded into a TEMP table with the migration 0010 HNSW
+index to time pgvector on identical data (includes the network round trip,
+which is what the in-process index saves).
+
+Usage (from backend/, needs numpy; hnswlib and a pgvector DSN optional):
+
+    python scripts/bench_vector_index.py --sizes 1000,10000,100000 --queries 100
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.infrastructure.vector import memory_index  # noqa: E402
+from app.infrastructure.vector.memory_index import VectorIndex  # noqa: E402
+
+DIM = 1536
+
+
+def _synthetic(n: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    data = centers[rng.integers(0, clusters, n)] + rng.normal(0, 0.35 / np.sqrt(DIM), (n, DIM)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def _time(fn, queries) -> tuple[list, float, float]:
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return results, statistics.median(latencies), latencies[int(0.95 * (len(latencies) - 1))]
+
+
+def _pgvector(dsn: str, data: np.ndarray, queries: np.ndarray, k: int, ef: int):
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"CREATE TEMP TABLE bench_vectors (id INT PRIMARY KEY, embedding VECTOR({DIM}))")
+    for start in range(0, len(data), 500):
+        values = ",".join(
+            cur.mogrify("(%s, %s::vector)", (start + i, "[" + ",".join(f"{x:.6f}" for x in v) + "]")).decode()
+            for i, v in enumerate(data[start : start + 500])
+        )
+        cur.execute("INSERT INTO bench_vectors VALUES " + values)
+    cur.execute(
+        "CREATE INDEX ON bench_vectors USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    )
+    cur.execute(f"SET hnsw.ef_search = {ef}")
+
+    def search(q):
+        cur.execute(
+            "SELECT id FROM bench_vectors ORDER BY embedding <=> %s::vector LIMIT %s",
+            ("[" + ",".join(f"{x:.6f}" for x in q) + "]", k),
+        )
+        return [r[0] for r in cur.fetchall()]
+
+    try:
+        return _time(search, queries)
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--ef", type=int, default=80)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DATABASE_URL", ""))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'n':>8}  {'backend':<14} {'build':>8}  {'p50 ms':>8}  {'p95 ms':>8}  {'recall':>6}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        data = _synthetic(n, args.clusters, rng)
+        queries = data[rng.integers(0, n, args.queries)] + rng.normal(0, 0.1 / np.sqrt(DIM), (args.queries, DIM))
+        metadata = [{"id": i} for i in range(n)]
+
+        start = time.perf_counter()
+        brute = VectorIndex(data, metadata, use_hnsw=False)
+        build = time.perf_counter() - start
+        exact, p50, p95 = _time(lambda q, idx=brute: [i for i, _ in idx.search(q, args.k)], queries)
+        print(f"{n:>8}  {'numpy exact':<14} {build:>7.2f}s  {p50:>8.3f}  {p95:>8.3f}  {1.0:>6.3f}")
+
+        def recall(results, exact=exact):
+            hits = sum(len(set(r) & set(e)) for r, e in zip(results, exact, strict=True))
+            return hits / (len(exact) * args.k)
+
+        if memory_index.hnswlib is not None:
+            start = time.perf_counter()
+            graph = VectorIndex(data, metadata, use_hnsw=True)
+            build = time.perf_counter() - start
+            results, p50, p95 = _time(
+                lambda q, idx=graph: [i for i, _ in idx.search(q, args.k, ef_search=args.ef)], queries
+            )
+            print(f"{n:>8}  {'hnswlib':<14} {build:>7.2f}s  {p50:>8.3f}  {p95:>8.3f}  {recall(results):>6.3f}")
+
+        if args.dsn:
+            results, p50, p95 = _pgvector(args.dsn, data, queries, args.k, args.ef)
+            print(f"{n:>8}  {'pgvector hnsw':<14} {'':>8}  {p50:>8.3f}  {p95:>8.3f}  {recall(results):>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
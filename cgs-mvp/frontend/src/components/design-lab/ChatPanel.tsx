@@ -57,7 +57,10 @@ export default function ChatPanel({
 }: ChatPanelProps) {
   const { data: history, isLoading: historyLoading } =
     useChatHistory(outputId);
-  const sendMessage = useSendMessage(outputId);
+  const [streamingText, setStreamingText] = useState("");
+  const sendMessage = useSendMessage(outputId, (delta) =>
+    setStreamingText((text) => text + delta)
+  );
   const [input, setInput] = useState("");
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLTextAreaElement>(null);
@@ -65,7 +68,7 @@ export default function ChatPanel({
   // Auto-scroll to bottom on new messages
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
-  }, [history, sendMessage.isPending]);
+  }, [history, sendMessage.isPending, streamingText]);
 
   // Focus input on mount
   useEffect(() => {
@@ -77,6 +80,7 @@ export default function ChatPanel({
     if (!message || sendMessage.isPending) return;
 
     setInput("");
+    setStreamingText("");
     sendMessage.mutate(message, {
       onSuccess: (data) => {
         if (data.updated_output) {
@@ -168,8 +172,17 @@ export default function ChatPanel({
           </div>
         )}
 
+        {/* Streaming reply */}
+        {sendMessage.isPending && streamingText && (
+          <div className="flex justify-start">
+            <div className="max-w-[85%] rounded-2xl px-4 py-2.5 bg-surface-elevated text-neutral-300">
+              <p className="text-sm whitespace-pre-wrap">{streamingText}</p>
+            </div>
+          </div>
+        )}
+
         {/* Pending indicator */}
-        {sendMessage.isPending && (
+        {sendMessage.isPending && !streamingText && (
           <div className="flex justify-start">
             <div className="bg-surface-elevated rounded-2xl px-4 py-3">
               <div className="flex items-center gap-2">
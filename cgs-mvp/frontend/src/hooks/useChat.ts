@@ -1,6 +1,6 @@
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { apiRequest } from "@/lib/api";
-import type { ChatMessage, ChatResponse } from "@/types/design-lab";
+import { apiRequest, fetchSSE } from "@/lib/api";
+import type { ChatMessage, ChatResponse, ChatStreamEvent } from "@/types/design-lab";
 
 /**
  * Fetch chat history for an output.
@@ -16,18 +16,50 @@ export function useChatHistory(outputId?: string) {
 }
 
 /**
- * Send a chat message to an output.
+ * Stream a chat turn: onDelta receives the assistant message as it is generated.
+ * Resolves with the final response; rejects on an error event.
+ */
+function streamMessage(
+  outputId: string,
+  message: string,
+  onDelta?: (delta: string) => void
+): Promise<ChatResponse> {
+  return new Promise<ChatResponse>((resolve, reject) => {
+    let settled = false;
+    fetchSSE(
+      `/api/v1/chat/outputs/${outputId}/stream`,
+      (raw) => {
+        const event = raw as unknown as ChatStreamEvent;
+        if (event.type === "message_delta") {
+          onDelta?.(event.data.delta);
+        } else if (event.type === "completed") {
+          settled = true;
+          resolve(event.data);
+        } else if (event.type === "error") {
+          settled = true;
+          reject(new Error(event.data.error));
+        }
+      },
+      (error) => {
+        settled = true;
+        reject(error);
+      },
+      { method: "POST", body: { message } }
+    ).then(() => {
+      if (!settled) reject(new Error("Chat stream closed unexpectedly"));
+    });
+  });
+}
+
+/**
+ * Send a chat message to an output (streamed, see streamMessage).
  * Returns the assistant's response + any side effects (edited output, context/brief changes).
  */
-export function useSendMessage(outputId?: string) {
+export function useSendMessage(outputId?: string, onDelta?: (delta: string) => void) {
   const queryClient = useQueryClient();
 
   return useMutation<ChatResponse, Error, string>({
-    mutationFn: (message: string) =>
-      apiRequest<ChatResponse>(`/api/v1/chat/outputs/${outputId}`, {
-        method: "POST",
-        body: { message },
-      }),
+    mutationFn: (message: string) => streamMessage(outputId!, message, onDelta),
     onSuccess: (data) => {
       // Refresh chat history
       queryClient.invalidateQueries({ queryKey: ["chat", outputId] });
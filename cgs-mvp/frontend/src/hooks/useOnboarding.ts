@@ -1,15 +1,46 @@
 import { useState, useCallback } from "react";
 import { useMutation } from "@tanstack/react-query";
-import { apiRequest } from "@/lib/api";
+import { apiRequest, fetchSSE } from "@/lib/api";
 import type {
   StartOnboardingRequest,
   StartOnboardingResponse,
   SubmitAnswersResponse,
   SessionStatusResponse,
+  OnboardingJobResponse,
+  OnboardingEvent,
 } from "@/types/onboarding";
 
 const SESSION_KEY = "fylle_onboarding_session";
 
+/**
+ * Follow a background onboarding phase over SSE until it ends.
+ * Resolves with the final event's data; rejects on an error event.
+ */
+function waitForPhase<T>(sessionId: string, done: OnboardingEvent["type"]): Promise<T> {
+  return new Promise<T>((resolve, reject) => {
+    let settled = false;
+    fetchSSE(
+      `/api/v1/onboarding/${sessionId}/events`,
+      (raw) => {
+        const event = raw as unknown as OnboardingEvent;
+        if (event.type === done) {
+          settled = true;
+          resolve(event.data as T);
+        } else if (event.type === "error") {
+          settled = true;
+          reject(new Error(event.data.error));
+        }
+      },
+      (error) => {
+        settled = true;
+        reject(error);
+      }
+    ).then(() => {
+      if (!settled) reject(new Error("Onboarding progress stream closed unexpectedly"));
+    });
+  });
+}
+
 export function useOnboarding() {
   const [sessionId, setSessionIdState] = useState<string | null>(() => {
     try {
@@ -38,11 +69,11 @@ export function useOnboarding() {
 
   const startOnboarding = useMutation({
     mutationFn: async (data: StartOnboardingRequest) => {
-      const result = await apiRequest<StartOnboardingResponse>(
+      const job = await apiRequest<OnboardingJobResponse>(
         "/api/v1/onboarding/start",
         { method: "POST", body: data }
       );
-      return result;
+      return waitForPhase<StartOnboardingResponse>(job.session_id, "questions_ready");
     },
     onSuccess: (data) => {
       setSessionId(data.session_id);
@@ -57,11 +88,11 @@ export function useOnboarding() {
       sessionId: string;
       answers: Record<string, unknown>;
     }) => {
-      const result = await apiRequest<SubmitAnswersResponse>(
+      await apiRequest<OnboardingJobResponse>(
         `/api/v1/onboarding/${sid}/answers`,
         { method: "POST", body: { answers } }
       );
-      return result;
+      return waitForPhase<SubmitAnswersResponse>(sid, "completed");
     },
   });
 
@@ -2,6 +2,28 @@ import { supabase } from "./supabase";
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL || "";
 
+/**
+ * Readable message for a failed response: the backend `detail` when present.
+ */
+async function errorMessage(response: Response, fallback: string): Promise<string> {
+  const error = await response.json().catch(() => ({ detail: response.statusText }));
+  // Handle FastAPI validation errors (detail is an array)
+  if (Array.isArray(error.detail)) {
+    return error.detail.map((e: { msg?: string; loc?: string[] }) => {
+      const field = e.loc?.slice(-1)[0] || "";
+      return field ? `${field}: ${e.msg}` : e.msg || "Validation error";
+    }).join("; ");
+  }
+  if (typeof error.detail === "string" && error.detail) {
+    return error.detail;
+  }
+  // The rate limiter answers 429 with {error: "Rate limit exceeded: ..."}
+  if (typeof error.error === "string" && error.error) {
+    return error.error;
+  }
+  return `${fallback}: ${response.status}`;
+}
+
 /**
  * Authenticated API request wrapper.
  * Automatically injects the Supabase JWT into the Authorization header.
@@ -50,20 +72,7 @@ export async function apiRequest<T = unknown>(
   }
 
   if (!response.ok) {
-    const error = await response.json().catch(() => ({ detail: response.statusText }));
-    // Handle FastAPI validation errors (detail is an array)
-    let message: string;
-    if (Array.isArray(error.detail)) {
-      message = error.detail.map((e: { msg?: string; loc?: string[] }) => {
-        const field = e.loc?.slice(-1)[0] || "";
-        return field ? `${field}: ${e.msg}` : e.msg || "Validation error";
-      }).join("; ");
-    } else if (typeof error.detail === "string") {
-      message = error.detail;
-    } else {
-      message = `API error: ${response.status}`;
-    }
-    throw new Error(message);
+    throw new Error(await errorMessage(response, "API error"));
   }
 
   // Handle 204 No Content
@@ -76,12 +85,14 @@ export async function apiRequest<T = unknown>(
 
 /**
  * SSE streaming fetch with auth headers.
- * Uses ReadableStream instead of EventSource to support Authorization header.
+ * Uses ReadableStream instead of EventSource to support Authorization header
+ * (and POST bodies, e.g. the streaming chat).
  */
 export async function fetchSSE(
   url: string,
   onEvent: (event: Record<string, unknown>) => void,
-  onError?: (error: Error) => void
+  onError?: (error: Error) => void,
+  options: { method?: string; body?: unknown } = {}
 ) {
   const {
     data: { session },
@@ -89,13 +100,16 @@ export async function fetchSSE(
 
   try {
     const response = await fetch(`${API_BASE}${url}`, {
+      method: options.method || "GET",
       headers: {
         Authorization: `Bearer ${session?.access_token}`,
+        ...(options.body ? { "Content-Type": "application/json" } : {}),
       },
+      body: options.body ? JSON.stringify(options.body) : undefined,
     });
 
     if (!response.ok) {
-      throw new Error(`SSE error: ${response.status}`);
+      throw new Error(await errorMessage(response, "SSE error"));
     }
 
     const reader = response.body!.getReader();
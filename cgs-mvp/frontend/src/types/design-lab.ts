@@ -130,6 +130,12 @@ export interface ChatResponse {
   brief_changes?: Record<string, unknown> | null;
 }
 
+/** Events of POST /api/v1/chat/outputs/{id}/stream */
+export type ChatStreamEvent =
+  | { type: "message_delta"; data: { delta: string } }
+  | { type: "completed"; data: ChatResponse }
+  | { type: "error"; data: { error: string } };
+
 // ── REVIEW ──
 export type ReviewStatus = "approved" | "rejected";
 
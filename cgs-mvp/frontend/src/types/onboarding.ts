@@ -40,6 +40,19 @@ export interface SubmitAnswersResponse {
   cards_count: number;
 }
 
+/** POST /start and /answers: the phase continues in the background */
+export interface OnboardingJobResponse {
+  session_id: string;
+  state: SessionState;
+}
+
+/** Events of GET /api/v1/onboarding/{id}/events */
+export type OnboardingEvent =
+  | { type: "state"; data: { state: SessionState; progress: number; step: string | null } }
+  | { type: "questions_ready"; data: StartOnboardingResponse }
+  | { type: "completed"; data: SubmitAnswersResponse }
+  | { type: "error"; data: { error: string } };
+
 export interface SessionStatusResponse {
   id: string;
   user_id: string;
@@ -4,7 +4,7 @@ Test E2E del Feedback Loop — Fylle Light CGS MVP
 Questo script verifica che il ciclo di feedback (approve/reject) funzioni correttamente:
 1. Trova il contesto Siebert e gli output esistenti
 2. Verifica lo stato dell'archive (references e guardrails)
-3. Testa che get_references() e get_guardrails() restituiscano dati corretti
+3. Testa che get_feedback_examples() restituisca references e guardrails corretti
 4. Testa che _build_archive_prompt() generi il prompt atteso
 5. Simula approve + reject e verifica l'impatto sulla prossima generazione
 
@@ -79,18 +79,16 @@ def main():
         print(f"     reference_notes: {(a.get('reference_notes') or 'none')[:60]}")
         print()
 
-    # ─── Step 3: Testa get_references e get_guardrails ───
+    # ─── Step 3: Testa get_feedback_examples ───
     separator("3. ARCHIVE REPOSITORY — References & Guardrails")
 
     archive_repo = ArchiveRepository(db)
-    references = archive_repo.get_references(UUID(ctx_id))
-    guardrails = archive_repo.get_guardrails(UUID(ctx_id))
+    references, guardrails = archive_repo.get_feedback_examples(UUID(ctx_id))
 
     print(f"\n🌟 References (is_reference=True): {len(references)}")
     for ref in references:
         print(f"   - topic: {ref.get('topic', 'N/A')[:40]}")
-        has_content = bool(ref.get("outputs", {}).get("text_content"))
-        print(f"     has_text_content: {has_content}")
+        print(f"     has_excerpt: {bool(ref.get('excerpt'))}")
         if ref.get("reference_notes"):
             print(f"     notes: {ref['reference_notes'][:80]}")
 
@@ -0,0 +1,102 @@
+"""
+Test di concorrenza della numerazione output — Fylle Light CGS MVP
+
+Verifica che il trigger trg_outputs_assign_number (migration 0003) assegni
+numeri distinti e senza buchi anche con molti completamenti simultanei
+sullo stesso brief:
+1. Sceglie un brief con almeno un workflow run (o quello passato come argomento)
+2. Inserisce N output root in parallelo, ognuno con il proprio client, senza number
+3. Verifica che i numeri assegnati siano distinti e consecutivi
+4. Elimina gli output di test
+
+Eseguire con: python3 test_output_numbering.py [brief_id] [--n 50]
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Change to backend dir so .env is found by pydantic-settings
+backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+os.chdir(backend_dir)
+sys.path.insert(0, backend_dir)
+
+from supabase import create_client
+
+from app.config.settings import get_settings
+from app.config.supabase import get_supabase_admin
+
+
+def separator(title):
+    print(f"\n{'='*60}")
+    print(f"  {title}")
+    print(f"{'='*60}")
+
+
+def insert_output(run: dict, index: int) -> dict:
+    # Un client per thread: richieste davvero concorrenti, nessuna sessione HTTP condivisa
+    s = get_settings()
+    client = create_client(s.supabase_url, s.supabase_service_role_key)
+    return (
+        client.table("outputs")
+        .insert(
+            {
+                "run_id": run["id"],
+                "brief_id": run["brief_id"],
+                "user_id": run["user_id"],
+                "output_type": "text",
+                "mime_type": "text/markdown",
+                "text_content": f"numbering test #{index}",
+                "title": "[test] numbering",
+            }
+        )
+        .execute()
+        .data[0]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("brief_id", nargs="?")
+    parser.add_argument("--n", type=int, default=50, help="inserimenti simultanei")
+    args = parser.parse_args()
+
+    db = get_supabase_admin()
+
+    # ─── Step 1: Brief e run di riferimento ───
+    separator("1. BRIEF")
+    query = db.table("workflow_runs").select("id, brief_id, user_id").not_.is_("brief_id", "null")
+    if args.brief_id:
+        query = query.eq("brief_id", args.brief_id)
+    runs = query.limit(1).execute().data
+    if not runs:
+        print("❌ Nessun workflow run trovato per il brief")
+        sys.exit(1)
+    run = runs[0]
+    print(f"✅ Brief: {run['brief_id']} (run {run['id'][:8]}...)")
+
+    # ─── Step 2: Inserimenti paralleli ───
+    separator(f"2. {args.n} INSERIMENTI PARALLELI")
+    with ThreadPoolExecutor(max_workers=args.n) as pool:
+        created = list(pool.map(lambda i: insert_output(run, i), range(args.n)))
+    ids = [o["id"] for o in created]
+    numbers = [o["number"] for o in created]
+
+    # ─── Step 3: Verifica ───
+    separator("3. VERIFICA")
+    try:
+        assert None not in numbers, "output senza number"
+        numbers.sort()
+        print(f"   Numeri assegnati: {numbers[0]}..{numbers[-1]}")
+        assert len(set(numbers)) == args.n, f"numeri duplicati: {args.n - len(set(numbers))}"
+        assert numbers == list(range(numbers[0], numbers[0] + args.n)), "numerazione con buchi"
+        print(f"✅ {args.n} numeri distinti e consecutivi")
+    finally:
+        # ─── Step 4: Pulizia ───
+        db.table("outputs").delete().in_("id", ids).execute()
+        print(f"\n🧹 {len(ids)} output di test eliminati")
+
+
+if __name__ == "__main__":
+    main()